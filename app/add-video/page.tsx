@@ -61,10 +61,12 @@ export default function AddVideoPage() {
             try {
                 // Call real backend API
                 // Nginx will route /api/videos -> localhost:8000/videos
+                const token = localStorage.getItem("token");
                 const response = await fetch("/api/videos/", {
                     method: "POST",
                     headers: {
                         "Content-Type": "application/json",
+                        "Authorization": `Bearer ${token}`,
                     },
                     body: JSON.stringify({
                         youtube_url: upload.url,
@@ -1,6 +1,6 @@
 "use client";
 
-import { useEffect, useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import { useRouter } from "next/navigation";
 import { Button } from "@/components/ui/button";
 import { Badge } from "@/components/ui/badge";
@@ -41,6 +41,9 @@ interface VideoData {
     created_at: string;
 }
 
+// Matches the API's default page size
+const PAGE_SIZE = 50;
+
 export default function VideosPage() {
     const router = useRouter();
     const [videos, setVideos] = useState<VideoData[]>([]);
@@ -48,6 +51,10 @@ export default function VideosPage() {
     const [searchQuery, setSearchQuery] = useState("");
     const [filterStatus, setFilterStatus] = useState<string>("all");
     const [processingCount, setProcessingCount] = useState(0);
+    const [hasMore, setHasMore] = useState(false);
+    const [loadingMore, setLoadingMore] = useState(false);
+    // Pages loaded so far; refreshes reload all of them
+    const pagesRef = useRef(1);
 
     // Auth Check
     useEffect(() => {
@@ -59,25 +66,58 @@ export default function VideosPage() {
 
     useEffect(() => {
         fetchVideos();
-        const interval = setInterval(fetchVideos, 5000);
+        // Progress of running videos is pushed over SSE; this only picks up new ones
+        const interval = setInterval(fetchVideos, 60000);
         return () => clearInterval(interval);
     }, []);
 
-    const fetchVideos = async () => {
-        try {
-            const token = localStorage.getItem("token");
-            const apiUrl = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000";
-            const res = await fetch(`${apiUrl}/api/videos/`, {
-                headers: {
-                    "Authorization": `Bearer ${token}`
+    const activeIds = videos
+        .filter(v => v.status !== "completed" && v.status !== "failed")
+        .map(v => v.video_id)
+        .join(",");
+
+    useEffect(() => {
+        if (!activeIds) return;
+        const apiUrl = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000";
+        // EventSource cannot send an Authorization header
+        const token = encodeURIComponent(localStorage.getItem("token") || "");
+        const sources = activeIds.split(",").map(id => {
+            const source = new EventSource(`${apiUrl}/api/videos/${id}/events?access_token=${token}`);
+            source.addEventListener("progress", (e) => {
+                const { video_id, status, progress } = JSON.parse((e as MessageEvent).data);
+                setVideos(prev => prev.map(v => v.video_id === video_id ? { ...v, status, progress } : v));
+                if (status === "completed" || status === "failed") {
+                    source.close();
+                    fetchVideos();
                 }
             });
-            if (!res.ok) {
-                if (res.status === 401) router.push("/login");
-                throw new Error("Failed to fetch");
+            return source;
+        });
+        return () => sources.forEach(source => source.close());
+    }, [activeIds]);
+
+    const fetchPage = async (offset: number): Promise<VideoData[]> => {
+        const token = localStorage.getItem("token");
+        const apiUrl = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000";
+        const res = await fetch(`${apiUrl}/api/videos/?limit=${PAGE_SIZE}&offset=${offset}`, {
+            headers: {
+                "Authorization": `Bearer ${token}`
             }
-            const data = await res.json();
-            setVideos(data);
+        });
+        if (!res.ok) {
+            if (res.status === 401) router.push("/login");
+            throw new Error("Failed to fetch");
+        }
+        return res.json();
+    }
+
+    const fetchVideos = async () => {
+        try {
+            const pages = await Promise.all(
+                Array.from({ length: pagesRef.current }, (_, i) => fetchPage(i * PAGE_SIZE))
+            );
+            setVideos(pages.flat());
+            setHasMore(pages[pages.length - 1].length === PAGE_SIZE);
         } catch (error) {
             console.error("Failed to fetch videos:", error);
         } finally {
@@ -85,6 +125,20 @@ export default function VideosPage() {
         }
     }
 
+    const loadMore = async () => {
+        setLoadingMore(true);
+        try {
+            const page = await fetchPage(pagesRef.current * PAGE_SIZE);
+            pagesRef.current += 1;
+            setVideos(prev => [...prev, ...page.filter(v => !prev.some(p => p.video_id === v.video_id))]);
+            setHasMore(page.length === PAGE_SIZE);
+        } catch (error) {
+            console.error("Failed to fetch videos:", error);
+        } finally {
+            setLoadingMore(false);
+        }
+    }
+
     async function deleteVideo(id: number) {
         if (!confirm("Are you sure you want to delete this video?")) return;
 
@@ -334,6 +388,14 @@ export default function VideosPage() {
         </FadeInStagger>
     )
 }
+
+            {hasMore && (
+                <div className="flex justify-center">
+                    <Button onClick={loadMore} variant="outline" disabled={loadingMore}>
+                        {loadingMore ? <Loader2 className="h-4 w-4 animate-spin" /> : "Load more"}
+                    </Button>
+                </div>
+            )}
         </div >
     );
 }
@@ -1,7 +1,7 @@
 """API Dependencies"""
 
 from typing import Generator, Optional
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from pydantic import ValidationError
@@ -12,11 +12,36 @@ from app.db.database import get_db
 
 settings = get_settings()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.api_v1_str if hasattr(settings, 'api_v1_str') else '/api'}/auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(
+    tokenUrl=f"{settings.api_v1_str if hasattr(settings, 'api_v1_str') else '/api'}/auth/login",
+    auto_error=False,
+)
 
 def get_current_user(
     db: Session = Depends(get_db),
     token: str = Depends(oauth2_scheme)
 ) -> User:
+    return _user_from_token(db, token)
+
+def get_stream_user(
+    db: Session = Depends(get_db),
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+    access_token: Optional[str] = Query(None),
+) -> User:
+    """
+    get_current_user for Server-Sent Events: browsers' EventSource cannot
+    set headers, so the token may also come as ?access_token=
+    """
+    token = token or access_token
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return _user_from_token(db, token)
+
+def _user_from_token(db: Session, token: str) -> User:
     try:
         payload = jwt.decode(
             token, settings.secret_key, algorithms=[settings.algorithm]
@@ -45,4 +70,4 @@ def get_current_active_user(
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
-__all__ = ["get_db", "get_current_user", "get_current_active_user"]
+__all__ = ["get_db", "get_current_user", "get_current_active_user", "get_stream_user"]
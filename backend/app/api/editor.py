@@ -76,12 +76,17 @@ async def render_reel(
         from app.core.config import get_settings
         settings = get_settings()
         
-        # Consistent path logic with YouTubeService
-        # storage_base / video_id / video_id.mp4
-        input_path = f"{settings.storage_base_path}/{video.youtube_video_id}/{video.youtube_video_id}.mp4"
+        # Consistent path logic with YouTubeService: the full download, or the
+        # partially downloaded section that covers start_time
+        from app.services.youtube_service import YouTubeService
+        input_path, local_start = YouTubeService().locate_source(
+            video.youtube_video_id,
+            request.start_time,
+            (video.video_metadata or {}).get('sections')
+        )
         
-        if not os.path.exists(input_path):
-             logger.error(f"Source video not found at {input_path}")
+        if not input_path:
+             logger.error(f"Source video not found for {video.youtube_video_id} at {request.start_time}s")
              raise HTTPException(status_code=400, detail=f"Source video file not found. Please re-process the video.")
 
         # 2. Prepare Output Path
@@ -93,7 +98,11 @@ async def render_reel(
         os.makedirs(output_dir, exist_ok=True)
 
         # 3. Call Composer
-        composer = ReelComposer()
+        composer = ReelComposer(
+            optimize_encoding=settings.reel_encode_optimize,
+            ssim_floor=settings.reel_ssim_floor,
+            max_size_bytes=int(settings.reel_max_size_mb * 1024 * 1024)
+        )
         
         # Convert pydantic models to dicts for service
         overlays_dict = [
@@ -108,7 +117,7 @@ async def render_reel(
             text_overlays=overlays_dict,
             has_shadow=request.has_shadow,
             has_overlay=request.has_overlay,
-            start_time=request.start_time,
+            start_time=local_start,
             duration=request.duration
         )
         
@@ -1,6 +1,11 @@
 """Health check router"""
 
+import asyncio
+
 from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core.metrics import get_registry
 
 router = APIRouter(tags=["health"])
 
@@ -22,3 +27,9 @@ async def readiness_check():
         "ready": True,
         "service": "GRAVIXAI Backend"
     }
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Cluster-wide counters and latency histograms (Prometheus text format)"""
+    return await asyncio.to_thread(get_registry().render)
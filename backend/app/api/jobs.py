@@ -0,0 +1,45 @@
+"""Job routes - dead-letter inspection and replay"""
+
+import logging
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from app.api.deps import get_current_user
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+def _visible(entry: dict, user: User) -> bool:
+    return user.is_superuser or entry.get('user_id') == user.id
+
+
+@router.get("/dead-letter")
+async def list_dead_letters(
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    current_user: User = Depends(get_current_user)
+):
+    """Jobs that failed after exhausting their retries, newest first (a user's own, unless superuser)"""
+    from app.workers.rq_worker import dead_letters
+
+    # Filtered by owner before paging, so pages are full and the total is the user's own
+    owner = None if current_user.is_superuser else current_user.id
+    entries = dead_letters.list(limit, offset, user_id=owner)
+    for entry in entries:
+        # The stored call is internal; report only which function it was
+        entry['call'] = (entry.get('call') or {}).get('func')
+    return {'total': dead_letters.count(owner), 'entries': entries}
+
+
+@router.post("/dead-letter/{job_id}/retry", status_code=status.HTTP_202_ACCEPTED)
+async def retry_dead_letter(job_id: int, current_user: User = Depends(get_current_user)):
+    """Re-run a dead-lettered job with a fresh retry budget"""
+    from app.workers.rq_worker import dead_letters, replay_dead_letter
+
+    entry = dead_letters.get(job_id)
+    if entry is None or not _visible(entry, current_user):
+        raise HTTPException(status_code=404, detail="Dead-lettered job not found")
+    if not replay_dead_letter(job_id):
+        raise HTTPException(status_code=409, detail="Job cannot be replayed")
+    return {'job_id': job_id, 'status': 'pending'}
@@ -1,7 +1,6 @@
 """Reels routes"""
 
 import logging
-import uuid
 from fastapi import APIRouter, HTTPException, Depends, Query
 from sqlalchemy.orm import Session
 from typing import List
@@ -176,12 +175,9 @@ async def render_reel_job(reel_id: int, db: Session = Depends(get_db)):
     if not reel:
         raise HTTPException(status_code=404, detail="Reel not found")
     
-    # Generate job ID
-    job_id = str(uuid.uuid4())
-    
-    # TODO: Queue background job to render reel
-    # This would call ReelComposer.compose_reel() with reel's settings
-    # For now, return mock response
+    # Interactive lane: never waits behind bulk ingest
+    from app.workers.rq_worker import render_reel, submit_interactive
+    job_id = submit_interactive(render_reel, reel.id).id
     
     logger.info(f"Queued render job {job_id} for reel {reel_id}")
     
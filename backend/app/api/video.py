@@ -1,18 +1,36 @@
 """Video processing routes"""
 
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+import asyncio
+import json
+import shutil
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from app.db.database import get_db
-from app.models.video import Video, VideoStatus
+from app.api.deps import get_current_user, get_stream_user
+from app.db.database import get_db, SessionLocal
+from app.models.reel import Job, JobStatus
+from app.models.user import User
+from app.models.video import Video, VideoChunk, VideoStatus
 from app.schemas.video import VideoUploadRequest, VideoStatusResponse
 from app.services.video_orchestrator import VideoOrchestrator
-from app.services.youtube_service import YouTubeService
+from app.services.youtube_service import SourceProbeError, YouTubeService
+from app.services.time_ranges import TimeRange, normalize_ranges
+from app.services.progress_events import (
+    VideoProgressTracker, format_sse, user_channel, video_channel, video_progress
+)
+from app.core.config import get_settings
 import logging
 from datetime import datetime
 
 router = APIRouter(prefix="/videos", tags=["Videos"])
 logger = logging.getLogger(__name__)
+settings = get_settings()
+
+SSE_HEARTBEAT_SECONDS = 15.0
+FINISHED_STATUSES = (VideoStatus.COMPLETED.value, VideoStatus.FAILED.value)
 
 async def process_video_background(video_id: int):
     """Background task wrapper"""
@@ -23,7 +41,8 @@ async def process_video_background(video_id: int):
 async def create_video(
     request: VideoUploadRequest, 
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
 ):
     """Submit a YouTube video for processing"""
     
@@ -40,13 +59,44 @@ async def create_video(
         # If failed, allow retry? For now return existing
         return _map_video_response(existing)
         
-    # 3. Create Record
+    # 3. Probe metadata (no media download) and reject unusable sources early
+    try:
+        info = await yt_service.probe_video(str(request.youtube_url), video_id_str)
+    except SourceProbeError:
+        raise HTTPException(
+            status_code=503,
+            detail="Could not reach YouTube, please try again shortly",
+            headers={"Retry-After": "30"},
+        )
+    if info is None:
+        raise HTTPException(status_code=422, detail="Video is unavailable")
+    
+    time_ranges = [TimeRange(r.start, r.end) for r in request.time_ranges or []]
+    rejection = yt_service.check_admission(info, time_ranges)
+    if rejection:
+        raise HTTPException(status_code=422, detail=rejection)
+    
+    if time_ranges:
+        time_ranges = normalize_ranges(time_ranges, info.get('duration'))
+        estimated_reels = yt_service.estimate_reel_count_for_ranges(time_ranges)
+    else:
+        estimated_reels = yt_service.estimate_reel_count(info.get('duration'))
+    
+    # 4. Create Record
     new_video = Video(
         youtube_url=str(request.youtube_url),
         youtube_video_id=video_id_str,
+        user_id=current_user.id,
         status=VideoStatus.UPLOADED,
         custom_caption=request.custom_caption,
-        title=request.title or f"Video {video_id_str}", # Temp title
+        title=request.title or info.get('title') or f"Video {video_id_str}",
+        description=info.get('description'),
+        duration=info.get('duration'),
+        thumbnail_url=info.get('thumbnail'),
+        video_metadata={
+            'estimated_reels': estimated_reels,
+            'time_ranges': [r.to_list() for r in time_ranges] or None,
+        },
         created_at=datetime.utcnow(),
         updated_at=datetime.utcnow()
     )
@@ -54,16 +104,44 @@ async def create_video(
     db.commit()
     db.refresh(new_video)
     
-    # 4. Trigger Background Task
-    background_tasks.add_task(process_video_background, new_video.id)
+    # 5. Trigger Background Task: stage DAG on the RQ workers, otherwise in-process
+    if settings.pipeline_backend == "dag":
+        from app.workers.job_engine import start_video_pipeline
+        media_seconds = sum(r.duration for r in time_ranges) if time_ranges else info.get('duration')
+        start_video_pipeline(new_video.id, current_user.id, media_seconds=media_seconds)
+    else:
+        background_tasks.add_task(process_video_background, new_video.id)
     
     return _map_video_response(new_video)
 
 @router.get("/", response_model=List[VideoStatusResponse])
-async def list_videos(db: Session = Depends(get_db)):
-    """List all videos"""
-    videos = db.query(Video).order_by(Video.created_at.desc()).all()
-    return [_map_video_response(v) for v in videos]
+async def list_videos(
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db)
+):
+    """List videos, newest first (paginated)"""
+    videos = db.query(Video).order_by(Video.created_at.desc()).offset(offset).limit(limit).all()
+    chunk_counts, jobs = _load_video_stats(db, [v.id for v in videos])
+    return [_map_video_response(v, chunk_counts.get(v.id, 0), jobs.get(v.id, [])) for v in videos]
+
+@router.get("/events")
+async def stream_user_events(request: Request, current_user: User = Depends(get_stream_user)):
+    """Server-Sent Events: progress of every video of the current user"""
+    return _sse_response(request, user_channel(current_user.id), follow_video_id=None)
+
+@router.get("/{video_id}/events")
+async def stream_video_events(
+    video_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_stream_user)
+):
+    """Server-Sent Events: progress of one of the current user's videos; the stream ends when it finishes"""
+    # Someone else's video is reported as missing, not as forbidden
+    if not db.query(Video.id).filter(Video.id == video_id, Video.user_id == current_user.id).first():
+        raise HTTPException(status_code=404, detail="Video not found")
+    return _sse_response(request, video_channel(video_id), follow_video_id=video_id)
 
 @router.get("/{video_id}", response_model=VideoStatusResponse)
 async def get_video(video_id: int, db: Session = Depends(get_db)):
@@ -71,22 +149,55 @@ async def get_video(video_id: int, db: Session = Depends(get_db)):
     video = db.query(Video).filter(Video.id == video_id).first()
     if not video:
         raise HTTPException(status_code=404, detail="Video not found")
-    return _map_video_response(video)
+    chunk_counts, jobs = _load_video_stats(db, [video.id])
+    return _map_video_response(video, chunk_counts.get(video.id, 0), jobs.get(video.id, []))
 
 @router.delete("/{video_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_video(video_id: int, db: Session = Depends(get_db)):
-    """Delete a video and its associated data"""
+    """Delete a video and its associated data, stopping any work still running for it"""
     video = db.query(Video).filter(Video.id == video_id).first()
     if not video:
         raise HTTPException(status_code=404, detail="Video not found")
     
-    # Optional: Delete files from disk?
-    # For now, just delete DB record to clear UI
+    # Flags the video first, so in-process (inline) processing stops as well
+    from app.workers.job_engine import cancel_video
+    cancel_video(video.id)
+    
+    youtube_video_id = video.youtube_video_id
     db.delete(video)
     db.commit()
+    
+    # Killed workers remove their own partial outputs; this drops the rest
+    shutil.rmtree(Path(settings.storage_base_path) / youtube_video_id, ignore_errors=True)
     return None
 
-def _map_video_response(video: Video) -> VideoStatusResponse:
+JobRow = Tuple[int, str, str, Optional[float]]  # (job_id, job_type, status, progress)
+
+
+def _load_video_stats(db: Session, video_ids: List[int]) -> Tuple[Dict[int, int], Dict[int, List[JobRow]]]:
+    """Chunk counts and stage jobs for a page of videos, in two queries"""
+    if not video_ids:
+        return {}, {}
+    chunk_counts = dict(
+        db.query(VideoChunk.video_id, func.count(VideoChunk.id))
+        .filter(VideoChunk.video_id.in_(video_ids))
+        .group_by(VideoChunk.video_id)
+        .all()
+    )
+    jobs: Dict[int, List[JobRow]] = {}
+    rows = (
+        db.query(Job.video_id, Job.id, Job.job_type, Job.status, Job.progress)
+        .filter(Job.video_id.in_(video_ids))
+        .all()
+    )
+    for video_id, job_id, job_type, job_status, progress in rows:
+        jobs.setdefault(video_id, []).append((job_id, job_type, job_status, progress))
+    return chunk_counts, jobs
+
+
+def _map_video_response(video: Video, chunk_count: int = 0, jobs: Optional[List[JobRow]] = None) -> VideoStatusResponse:
+    jobs = jobs or []
+    statuses = [getattr(s, 'value', s) for _, _, s, _ in jobs]
     return VideoStatusResponse(
         video_id=video.id,
         youtube_url=video.youtube_url,
@@ -95,12 +206,90 @@ def _map_video_response(video: Video) -> VideoStatusResponse:
         duration=video.duration,
         thumbnail_url=video.thumbnail_url,
         status=video.status,
-        progress=0.0, # TODO: calculate real progress
-        total_jobs=0,
-        completed_jobs=0,
-        failed_jobs=0,
-        reels_created=len(video.chunks) if video.chunks else 0,
+        progress=video_progress(video.status, [(t, s, p) for _, t, s, p in jobs]),
+        total_jobs=len(jobs),
+        completed_jobs=statuses.count(JobStatus.COMPLETED.value),
+        failed_jobs=statuses.count(JobStatus.FAILED.value),
+        reels_created=chunk_count,
+        estimated_reels=(video.video_metadata or {}).get('estimated_reels'),
         error=video.error_message,
         created_at=video.created_at
     )
 
+
+def _load_progress_snapshot(video_ids: List[int]) -> Tuple[List[Tuple[int, str]], Dict[int, List[JobRow]]]:
+    db = SessionLocal()
+    try:
+        videos = db.query(Video.id, Video.status).filter(Video.id.in_(video_ids)).all()
+        _, jobs = _load_video_stats(db, [video_id for video_id, _ in videos])
+    finally:
+        db.close()
+    return videos, jobs
+
+
+async def _seed_tracker(tracker: VideoProgressTracker, video_ids: List[int]):
+    """Seed from the DB in a worker thread, keeping the event loop free"""
+    videos, jobs = await asyncio.to_thread(_load_progress_snapshot, video_ids)
+    for video_id, video_status in videos:
+        tracker.seed(video_id, video_status, jobs.get(video_id, []))
+
+
+def _sse_response(request: Request, channel: str, follow_video_id: Optional[int]) -> StreamingResponse:
+    """
+    Stream a progress channel as SSE.
+    
+    Emits the raw job/video events plus a "progress" event with the video's
+    overall progress, recomputed from per-stream job state (seeded from the
+    DB once per video), so no DB query is made per event.
+    """
+    async def stream():
+        from redis.asyncio import Redis as AsyncRedis
+        client = AsyncRedis.from_url(settings.redis_url)
+        pubsub = client.pubsub()
+        tracker = VideoProgressTracker()
+        try:
+            # Subscribe before reading the snapshot so no event falls in between
+            await pubsub.subscribe(channel)
+            if follow_video_id is not None:
+                await _seed_tracker(tracker, [follow_video_id])
+                yield _progress_frame(tracker, follow_video_id)
+                if tracker.video_status[follow_video_id] in FINISHED_STATUSES:
+                    return
+
+            while not await request.is_disconnected():
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=SSE_HEARTBEAT_SECONDS)
+                if message is None:
+                    yield ": keep-alive\n\n"
+                    continue
+
+                event = json.loads(message['data'])
+                video_id = event.get('video_id')
+                if video_id is not None and not tracker.tracks(video_id):
+                    await _seed_tracker(tracker, [video_id])
+                tracker.apply(event)
+
+                yield format_sse(event, event.get('type', 'message'))
+                if tracker.tracks(video_id):
+                    yield _progress_frame(tracker, video_id)
+
+                finished = event.get('type') == 'video' and event.get('status') in FINISHED_STATUSES
+                if finished and video_id == follow_video_id:
+                    break
+        finally:
+            await pubsub.unsubscribe(channel)
+            await pubsub.close()
+            await client.close()
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _progress_frame(tracker: VideoProgressTracker, video_id: int) -> str:
+    return format_sse({
+        'video_id': video_id,
+        'status': tracker.video_status[video_id],
+        'progress': tracker.progress(video_id),
+    }, "progress")
@@ -23,6 +23,22 @@ class Settings(BaseSettings):
     # Gemini
     gemini_api_key: str = ""
     gemini_model: str = "gemini-1.5-pro"
+    gemini_batch_enabled: bool = True  # One structured prompt per batch of reels
+    gemini_batch_token_budget: int = 8000  # Estimated prompt tokens per batch
+    gemini_batch_max_items: int = 20
+    gemini_max_concurrency: int = 4
+    gemini_timeout: float = 60.0  # Seconds per generate_content call
+    gemini_rpm_per_model: float = 60.0  # Cluster-wide request budget per model
+    gemini_rpm_per_key: float = 60.0  # Cluster-wide request budget per API key
+    gemini_max_retries: int = 4  # In-process retries of quota errors
+    gemini_backoff_base: float = 2.0  # Seconds; doubled per attempt, full jitter
+    gemini_backoff_max: float = 60.0
+    gemini_requeue_base: float = 60.0  # Job re-queue backoff after quota exhaustion
+    gemini_max_requeues: int = 5
+    metadata_mode: str = "gemini"  # gemini, heuristic (local, bulk runs), hybrid (heuristic pre-filter)
+    metadata_llm_min_score: float = 0.6  # hybrid: heuristic score needed for an LLM call
+    ai_cache_enabled: bool = True  # Redis prompt-response cache for AI metadata
+    ai_cache_ttl: int = 30 * 24 * 3600
 
     # Security
     secret_key: str = "dev_secret_key_change_in_prod"
@@ -32,6 +48,41 @@ class Settings(BaseSettings):
 
     # Redis
     redis_url: str = "redis://localhost:6379/0"
+
+    # Job Queue
+    queue_name: str = "default"  # Bulk lane
+    interactive_queue_name: str = "interactive"  # Editor renders; workers check it first
+    fair_queue_depth: int = 4  # Bulk tasks kept ready on RQ (~bulk workers); 0 = plain FIFO
+    fair_queue_quantum: float = 300.0  # Seconds of media credited per user per round
+    worker_timeout: int = 3600  # RQ job timeout in seconds
+    pipeline_backend: str = "inline"  # inline (API background task), dag (stage DAG on RQ workers)
+    job_progress_flush_interval: float = 1.0  # Seconds between batched Job progress writes
+    job_heartbeat_ttl: int = 60  # Seconds without a worker heartbeat before a job counts as stuck
+    reaper_interval: int = 60  # Seconds between stuck-job sweeps
+    dead_letter_max_entries: int = 1000
+
+    # Worker supervisor (python -m app.workers.supervisor): load-aware pool size per node
+    worker_min_processes: int = 1  # Encode pool
+    worker_max_processes: int = 4
+    ingest_min_processes: int = 1  # Download pool (also bounded by download_concurrency)
+    ingest_max_processes: int = 2
+    ai_min_processes: int = 1  # Gemini pool
+    ai_max_processes: int = 4
+    publish_min_processes: int = 1  # Instagram pool
+    publish_max_processes: int = 2
+    worker_cpu_target: float = 0.85  # Add workers only below this CPU utilization
+    worker_cpu_high: float = 0.95  # Retire workers above it
+    worker_iowait_high: float = 0.25
+    worker_memory_reserve_mb: int = 1024  # Free memory never handed to tasks
+    worker_task_memory_mb: int = 768  # Assumed per-task memory until ffmpeg RSS is measured
+    worker_scale_interval: float = 5.0  # Seconds between load samples
+    worker_scale_cooldown: float = 30.0  # Seconds between pool size changes
+    worker_idle_cooldown: float = 120.0  # Seconds idle workers linger with nothing queued
+    encode_nice: int = 10  # CPU priority of encode workers and ffmpeg (0 = unchanged)
+    encode_ionice: str = "best-effort:7"  # "idle", "best-effort[:0-7]" or "" (unchanged)
+    encode_cpus: str = ""  # Cores encodes may use, e.g. "2-7" (empty = all)
+    encode_cgroup: str = ""  # cgroup v2 path under /sys/fs/cgroup, e.g. "gravix.slice/gravix-encode.slice"
+    api_cpus: str = ""  # Cores reserved for the API, e.g. "0-1" (empty = all)
     
     # Logging
     log_level: str = "INFO"
@@ -39,9 +90,39 @@ class Settings(BaseSettings):
     # Storage and Processing
     storage_base_path: str = "./storage"
     temp_path: str = "./storage/temp"
+    source_cache_path: str = "./storage/source_cache"  # Shared by all downloaders (hardlinked out)
     ffmpeg_path: str = "/usr/bin/ffmpeg"
     ffprobe_path: str = "/usr/bin/ffprobe"
     google_application_credentials: str = ""
+    chunk_duration: int = 30  # Reel length in seconds
+    reel_width: int = 1080
+    reel_height: int = 1920
+    min_chunk_duration: int = 10  # Shorter tail chunks are dropped
+    max_source_duration: int = 3 * 60 * 60  # Admission limit for POST /videos
+    source_info_ttl: int = 3600  # Seconds a probed info JSON is reused
+    highlight_top_n: int = 0  # Encode only the N best-scoring windows (0 = every window)
+    highlight_hop: int = 5  # Seconds between candidate window starts
+    pipeline_cut_workers: int = 2  # Chunks of one video cut at once
+    pipeline_buffer: int = 2  # Items queued between pipeline stages
+    download_max_height: int = 720  # Format cap when no format list is known
+    download_range_padding: float = 5.0  # Seconds around partial ranges (>= one keyframe interval)
+    download_concurrency: int = 2  # Host-wide simultaneous downloads
+    download_bandwidth_limit_mbps: float = 0.0  # Aggregate budget shared by active downloads (0 = unlimited)
+    download_slots_path: str = "./storage/download_slots"
+    download_fragment_concurrency: int = 4  # Parallel DASH/HLS fragments per download
+    download_socket_timeout: int = 120
+    download_retries: int = 10
+
+    # Speech-to-Text
+    transcription_backend: str = "google"  # google, offline
+    transcription_language: str = "en-US"
+    transcription_window_seconds: float = 55.0
+    transcription_max_parallel: int = 4
+
+    # Reel Encoding
+    reel_encode_optimize: bool = False  # Per-title CRF search before the final encode
+    reel_ssim_floor: float = 0.96
+    reel_max_size_mb: float = 50.0
 
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -0,0 +1,292 @@
+"""
+Metrics - Counters and latency histograms shared across processes
+
+The API and every job worker record into Redis hashes, so one scrape of
+GET /api/metrics sees the whole cluster - including metrics only ever
+registered by a worker, via a shared catalog. If Redis is unreachable,
+increments stay buffered in-process (and are exported from there) until
+a flush gets them through.
+
+Recording never waits on Redis: increments are summed in memory and a
+background thread writes them in one pipeline per flush interval, so
+metrics can be recorded from the event loop and on request paths.
+
+Exported in the Prometheus text format.
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "metrics:"
+CATALOG_KEY = "_catalog"  # name -> "kind|buckets|description"
+
+# Seconds; sized for network calls from ~100 ms to a slow model response
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class MetricsStore:
+    """Redis-backed hash storage with an in-process fallback"""
+
+    def __init__(self, redis_url: Optional[str] = None, flush_interval: float = 1.0):
+        self.redis_url = redis_url
+        self.flush_interval = flush_interval
+        self._redis = None
+        self._local: Dict[str, Dict[str, float]] = {}
+        self._pending: Dict[str, Dict[str, float]] = {}  # Not yet written to Redis
+        self._catalog: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._flusher_pid: Optional[int] = None
+        # RQ forks a work horse per job: the child needs its own lock and flusher
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._redis = None
+        self._flusher_pid = None
+
+    def _client(self):
+        if self.redis_url is None:
+            return None
+        if self._redis is None:
+            from redis import Redis
+            self._redis = Redis.from_url(self.redis_url, socket_timeout=1)
+        return self._redis
+
+    def incr(self, key: str, updates: Dict[str, float]):
+        """Add to fields of a hash; buffered, never blocks on Redis"""
+        with self._lock:
+            target = self._local if self.redis_url is None else self._pending
+            _add(target.setdefault(key, {}), updates)
+            start_flusher = self.redis_url is not None and self._flusher_pid != os.getpid()
+            if start_flusher:
+                self._flusher_pid = os.getpid()
+        if start_flusher:
+            threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True).start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        """Write buffered increments to Redis in one pipeline (kept pending if that fails)"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        try:
+            pipe = self._client().pipeline(transaction=False)
+            for key, values in pending.items():
+                for field, amount in values.items():
+                    pipe.hincrbyfloat(KEY_PREFIX + key, field, amount)
+            pipe.execute()
+        except Exception as e:
+            logger.debug(f"Metrics write to Redis failed, retrying next flush: {str(e)}")
+            with self._lock:
+                for key, values in pending.items():
+                    _add(self._pending.setdefault(key, {}), values)
+
+    def register(self, name: str, spec: str):
+        """Record a metric in the shared catalog"""
+        client = self._client()
+        if client is not None:
+            try:
+                client.hset(KEY_PREFIX + CATALOG_KEY, name, spec)
+                return
+            except Exception as e:
+                logger.debug(f"Metrics catalog write failed: {str(e)}")
+        with self._lock:
+            self._catalog[name] = spec
+
+    def catalog(self) -> Dict[str, str]:
+        client = self._client()
+        if client is not None:
+            try:
+                raw = client.hgetall(KEY_PREFIX + CATALOG_KEY)
+                return {k.decode(): v.decode() for k, v in raw.items()}
+            except Exception as e:
+                logger.debug(f"Metrics catalog read failed: {str(e)}")
+        with self._lock:
+            return dict(self._catalog)
+
+    def read(self, key: str) -> Dict[str, float]:
+        """Current values, including this process's not yet flushed increments"""
+        client = self._client()
+        if client is not None:
+            try:
+                raw = client.hgetall(KEY_PREFIX + key)
+                values = {k.decode(): float(v) for k, v in raw.items()}
+                with self._lock:
+                    _add(values, self._pending.get(key, {}))
+                return values
+            except Exception as e:
+                logger.debug(f"Metrics read from Redis failed: {str(e)}")
+        with self._lock:
+            values = dict(self._local.get(key, {}))
+            _add(values, self._pending.get(key, {}))
+            return values
+
+
+def _add(values: Dict[str, float], updates: Dict[str, float]):
+    for field, amount in updates.items():
+        values[field] = values.get(field, 0.0) + amount
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _encode_labels(labels: LabelKey) -> str:
+    return ",".join(f'{k}="{v}"' for k, v in labels)
+
+
+def _decode_labels(encoded: str) -> LabelKey:
+    if not encoded:
+        return ()
+    pairs = []
+    for part in encoded.split('",'):
+        k, v = part.split('="', 1)
+        pairs.append((k, v.rstrip('"')))
+    return tuple(pairs)
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, store: "MetricsStore"):
+        self.name = name
+        self.description = description
+        self.store = store
+
+    def inc(self, amount: float = 1, **labels):
+        self.store.incr(self.name, {_encode_labels(_label_key(labels)): amount})
+
+    def value(self, **labels) -> float:
+        return self.store.read(self.name).get(_encode_labels(_label_key(labels)), 0.0)
+
+    def render(self) -> List[str]:
+        lines = []
+        for encoded, value in sorted(self.store.read(self.name).items()):
+            lines.append(f"{self.name}{{{encoded}}} {value:g}" if encoded else f"{self.name} {value:g}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus semantics)"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, store: "MetricsStore", buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.store = store
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        encoded = _encode_labels(_label_key(labels))
+        # Stored per bucket (non-cumulative); rendering accumulates
+        bucket = next((b for b in self.buckets if value <= b), "+Inf")
+        self.store.incr(self.name, {
+            f"{encoded}|bucket|{bucket}": 1,
+            f"{encoded}|sum": value,
+            f"{encoded}|count": 1,
+        })
+
+    def summary(self, **labels) -> Dict[str, float]:
+        """count, sum and mean for one label set"""
+        encoded = _encode_labels(_label_key(labels))
+        values = self.store.read(self.name)
+        count = values.get(f"{encoded}|count", 0.0)
+        total = values.get(f"{encoded}|sum", 0.0)
+        return {"count": count, "sum": total, "mean": total / count if count else 0.0}
+
+    def render(self) -> List[str]:
+        series: Dict[str, Dict[str, float]] = {}
+        for field, value in self.store.read(self.name).items():
+            encoded, _, rest = field.partition("|")
+            series.setdefault(encoded, {})[rest] = value
+
+        lines = []
+        for encoded, values in sorted(series.items()):
+            labels = list(_decode_labels(encoded))
+            cumulative = 0.0
+            for bound in [*self.buckets, "+Inf"]:
+                cumulative += values.get(f"bucket|{bound}", 0.0)
+                le = _encode_labels(tuple(labels + [("le", str(bound))]))
+                lines.append(f"{self.name}_bucket{{{le}}} {cumulative:g}")
+            suffix = f"{{{encoded}}}" if encoded else ""
+            lines.append(f"{self.name}_sum{suffix} {values.get('sum', 0.0):g}")
+            lines.append(f"{self.name}_count{suffix} {values.get('count', 0.0):g}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named metrics sharing one store"""
+
+    def __init__(self, store: Optional[MetricsStore] = None):
+        self.store = store or MetricsStore()
+        self._metrics: Dict[str, object] = {}
+
+    def counter(self, name: str, description: str) -> Counter:
+        if name not in self._metrics:
+            self._metrics[name] = Counter(name, description, self.store)
+            self.store.register(name, f"counter||{description}")
+        return self._metrics[name]
+
+    def histogram(self, name: str, description: str, buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        if name not in self._metrics:
+            self._metrics[name] = Histogram(name, description, self.store, buckets)
+            self.store.register(name, f"histogram|{','.join(str(b) for b in buckets)}|{description}")
+        return self._metrics[name]
+
+    def metrics(self) -> Iterable:
+        """Local metrics plus any registered elsewhere in the cluster"""
+        for name, spec in sorted(self.store.catalog().items()):
+            if name in self._metrics:
+                continue
+            kind, buckets, description = spec.split("|", 2)
+            if kind == "counter":
+                self._metrics[name] = Counter(name, description, self.store)
+            elif kind == "histogram":
+                bounds = [float(b) for b in buckets.split(",") if b] or LATENCY_BUCKETS
+                self._metrics[name] = Histogram(name, description, self.store, bounds)
+        return [self._metrics[name] for name in sorted(self._metrics)]
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self.metrics():
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+_registry: Optional[MetricsRegistry] = None
+
+
+def get_registry() -> MetricsRegistry:
+    """Process-wide registry backed by the configured Redis"""
+    global _registry
+    if _registry is None:
+        from app.core.config import get_settings
+        _registry = MetricsRegistry(MetricsStore(get_settings().redis_url))
+        atexit.register(_registry.store.flush)
+    return _registry
+
+
+def flush_metrics():
+    """Write buffered metrics now (RQ work horses exit without running atexit)"""
+    if _registry is not None:
+        _registry.store.flush()
@@ -37,6 +37,7 @@ class Video(Base, IDMixin, TimestampMixin):
     video_file_path = Column(String(500), nullable=True)
     audio_file_path = Column(String(500), nullable=True)
     transcript = Column(Text, nullable=True)
+    transcript_segments = Column(JSON, nullable=True)  # TranscriptIndex.to_dict(): timed segments
     transcript_source = Column(String(50), nullable=True)  # youtube, google_speech
     
     # Metadata
@@ -1,15 +1,22 @@
 """Video processing schemas"""
 
-from pydantic import BaseModel, HttpUrl
+from pydantic import BaseModel, Field, HttpUrl
 from typing import Optional, List
 from datetime import datetime
 
 
+class TimeRangeRequest(BaseModel):
+    """Span of the source to make reels from (seconds)"""
+    start: float = Field(..., ge=0)
+    end: float = Field(..., gt=0)
+
+
 class VideoUploadRequest(BaseModel):
     """YouTube video upload request"""
     youtube_url: HttpUrl
     custom_caption: Optional[str] = None
     title: Optional[str] = None
+    time_ranges: Optional[List[TimeRangeRequest]] = None  # Only download these spans
 
 
 class VideoStatusResponse(BaseModel):
@@ -26,6 +33,7 @@ class VideoStatusResponse(BaseModel):
     completed_jobs: int
     failed_jobs: int
     reels_created: int
+    estimated_reels: Optional[int] = None
     error: Optional[str] = None
     created_at: datetime
 
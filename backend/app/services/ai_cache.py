@@ -0,0 +1,121 @@
+"""
+AI Cache - Persistent prompt-response cache for model calls
+
+Entries are keyed by a hash of (model, prompt template version, normalized
+inputs) and stored in Redis with a TTL, so re-running a video, retrying a
+job or regenerating the same transcript slice never reaches the network.
+Bump the template version whenever a prompt changes meaning.
+
+Hits, misses and the latency / prompt tokens saved by hits are exported
+as counters.
+"""
+
+import hashlib
+import json
+import logging
+import re
+from typing import Any, Dict, Optional
+
+from app.core.metrics import MetricsRegistry, get_registry
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "ai_cache:"
+
+
+def _normalize(value: Any) -> Any:
+    """Collapse whitespace and round floats so equivalent inputs hash alike"""
+    if isinstance(value, str):
+        return re.sub(r"\s+", " ", value).strip()
+    if isinstance(value, float):
+        return round(value, 1)
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def cache_key(model: str, template_version: str, **inputs) -> str:
+    """Stable hash of the model, prompt template and normalized inputs"""
+    payload = json.dumps(
+        {"model": model, "template": template_version, "inputs": _normalize(inputs)},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class PromptCache:
+    """Redis-backed response cache; lookups fail open (a Redis error is a miss)"""
+
+    def __init__(self, redis_client, ttl: int, namespace: str = "default", registry: Optional[MetricsRegistry] = None):
+        self.redis = redis_client
+        self.ttl = ttl
+        self.namespace = namespace
+
+        registry = registry or get_registry()
+        self.requests = registry.counter("ai_cache_requests_total", "AI prompt cache lookups by result")
+        self.saved_seconds = registry.counter("ai_cache_saved_seconds_total", "Model latency avoided by cache hits")
+        self.saved_tokens = registry.counter("ai_cache_saved_tokens_total", "Estimated prompt tokens avoided by cache hits")
+
+    def _key(self, key: str) -> str:
+        return f"{KEY_PREFIX}{self.namespace}:{key}"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            raw = self.redis.get(self._key(key))
+        except Exception as e:
+            logger.warning(f"AI cache read failed: {str(e)}")
+            raw = None
+
+        entry = None
+        if raw is not None:
+            try:
+                entry = json.loads(raw)
+                value = entry["value"]
+            except (ValueError, KeyError, TypeError) as e:
+                # Corrupt or old-format entry: a miss, and dropped so it is rewritten
+                logger.warning(f"Discarding unreadable AI cache entry {key}: {str(e)}")
+                entry = None
+                self._delete(key)
+
+        if entry is None:
+            self.requests.inc(namespace=self.namespace, result="miss")
+            return None
+
+        self.requests.inc(namespace=self.namespace, result="hit")
+        self.saved_seconds.inc(entry.get("latency", 0.0), namespace=self.namespace)
+        self.saved_tokens.inc(entry.get("prompt_tokens", 0), namespace=self.namespace)
+        return value
+
+    def _delete(self, key: str):
+        try:
+            self.redis.delete(self._key(key))
+        except Exception as e:
+            logger.warning(f"AI cache delete failed: {str(e)}")
+
+    def set(self, key: str, value: Dict[str, Any], latency: float = 0.0, prompt_tokens: int = 0):
+        """Store a response with what it cost to produce"""
+        entry = {"value": value, "latency": round(latency, 3), "prompt_tokens": prompt_tokens}
+        try:
+            self.redis.set(self._key(key), json.dumps(entry), ex=self.ttl)
+        except Exception as e:
+            logger.warning(f"AI cache write failed: {str(e)}")
+
+
+_caches: Dict[str, Optional[PromptCache]] = {}
+
+
+def get_prompt_cache(namespace: str) -> Optional[PromptCache]:
+    """Process-wide cache for a namespace, or None when disabled"""
+    if namespace not in _caches:
+        from app.core.config import get_settings
+        settings = get_settings()
+        if settings.ai_cache_enabled:
+            from redis import Redis
+            client = Redis.from_url(settings.redis_url, socket_timeout=2)
+            _caches[namespace] = PromptCache(client, settings.ai_cache_ttl, namespace)
+        else:
+            _caches[namespace] = None
+    return _caches[namespace]
@@ -0,0 +1,246 @@
+"""
+Encode Optimizer - Per-title CRF selection
+
+Runs quick sample encodes over a few short windows of the source, measures
+SSIM against the reference frames with NumPy and picks the highest CRF that
+stays above the quality floor. A per-reel size cap is enforced with capped
+CRF (VBV maxrate/bufsize) so dense scenes can never exceed it.
+"""
+
+import os
+import subprocess
+import tempfile
+import logging
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from app.workers.isolation import wrap_command
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class EncodeDecision:
+    """Chosen encoder settings for a single reel"""
+    crf: int
+    ssim: float
+    estimated_size: int  # in bytes
+    maxrate_kbps: Optional[int] = None
+
+    def ffmpeg_args(self) -> List[str]:
+        """x264 rate-control arguments for this decision"""
+        args = ["-crf", str(self.crf)]
+        if self.maxrate_kbps:
+            args.extend([
+                "-maxrate", f"{self.maxrate_kbps}k",
+                "-bufsize", f"{self.maxrate_kbps * 2}k",
+            ])
+        return args
+
+
+def compute_ssim(reference: np.ndarray, distorted: np.ndarray, window: int = 8) -> float:
+    """
+    Mean SSIM over a stack of luma frames.
+
+    Both arrays are shaped (frames, height, width). Local statistics use a
+    box window computed from integral images so the whole stack is processed
+    in a handful of vectorized passes.
+    """
+    x = reference.astype(np.float64)
+    y = distorted.astype(np.float64)
+
+    c1 = (0.01 * 255) ** 2
+    c2 = (0.03 * 255) ** 2
+
+    mu_x = _box_mean(x, window)
+    mu_y = _box_mean(y, window)
+    sigma_x = _box_mean(x * x, window) - mu_x ** 2
+    sigma_y = _box_mean(y * y, window) - mu_y ** 2
+    sigma_xy = _box_mean(x * y, window) - mu_x * mu_y
+
+    numerator = (2 * mu_x * mu_y + c1) * (2 * sigma_xy + c2)
+    denominator = (mu_x ** 2 + mu_y ** 2 + c1) * (sigma_x + sigma_y + c2)
+
+    return float(np.mean(numerator / denominator))
+
+
+def _box_mean(frames: np.ndarray, window: int) -> np.ndarray:
+    """Mean over every window x window block (valid region only)"""
+    integral = frames.cumsum(axis=1).cumsum(axis=2)
+    integral = np.pad(integral, ((0, 0), (1, 0), (1, 0)))
+    total = (
+        integral[:, window:, window:]
+        - integral[:, :-window, window:]
+        - integral[:, window:, :-window]
+        + integral[:, :-window, :-window]
+    )
+    return total / (window * window)
+
+
+class EncodeOptimizer:
+    """Pick the cheapest CRF that keeps visual quality above a floor"""
+
+    # Ascending: each step trades quality for size
+    CRF_CANDIDATES = (23, 25, 27, 29, 31)
+    BASELINE_CRF = 23
+
+    # Luma-only analysis resolution (16:9 band of the reel)
+    ANALYSIS_WIDTH = 480
+    ANALYSIS_HEIGHT = 270
+    ANALYSIS_FPS = 5
+
+    def __init__(
+        self,
+        ffmpeg_path: str = "ffmpeg",
+        reel_width: int = 1080,
+        ssim_floor: float = 0.96,
+        max_size_bytes: Optional[int] = None,
+        audio_bitrate_kbps: int = 128,
+        sample_count: int = 3,
+        sample_duration: float = 2.0,
+        crf_candidates: Sequence[int] = CRF_CANDIDATES
+    ):
+        self.ffmpeg_path = ffmpeg_path
+        self.reel_width = reel_width
+        self.ssim_floor = ssim_floor
+        self.max_size_bytes = max_size_bytes
+        self.audio_bitrate_kbps = audio_bitrate_kbps
+        self.sample_count = sample_count
+        self.sample_duration = sample_duration
+        self.crf_candidates = tuple(sorted(crf_candidates))
+
+    def optimize(self, input_path: str, start_time: float, duration: float) -> EncodeDecision:
+        """
+        Choose encoder settings for the [start_time, start_time + duration) range.
+
+        Falls back to the baseline CRF (still size-capped) if sampling fails.
+        """
+        try:
+            windows = self._sample_windows(start_time, duration)
+            if not windows:
+                return self._baseline(duration)
+
+            with tempfile.TemporaryDirectory(prefix="encode_opt_") as tmp_dir:
+                references = [self._decode_luma(input_path, t, self.sample_duration) for t in windows]
+
+                chosen: Optional[EncodeDecision] = None
+                for crf in self.crf_candidates:
+                    scores = []
+                    sampled_bytes = 0
+                    for i, t in enumerate(windows):
+                        sample_path = os.path.join(tmp_dir, f"sample_{crf}_{i}.mp4")
+                        self._encode_sample(input_path, sample_path, t, crf)
+                        sampled_bytes += os.path.getsize(sample_path)
+
+                        distorted = self._decode_luma(sample_path, 0.0, self.sample_duration)
+                        frames = min(len(references[i]), len(distorted))
+                        if frames:
+                            scores.append(compute_ssim(references[i][:frames], distorted[:frames]))
+
+                    if not scores:
+                        break
+
+                    ssim = float(np.mean(scores))
+                    bytes_per_second = sampled_bytes / (len(windows) * self.sample_duration)
+                    estimated = int(bytes_per_second * duration + self.audio_bitrate_kbps * 125 * duration)
+                    logger.debug(f"CRF {crf}: SSIM={ssim:.4f}, est={estimated} bytes")
+
+                    if ssim < self.ssim_floor and chosen is not None:
+                        break
+                    chosen = EncodeDecision(crf=crf, ssim=ssim, estimated_size=estimated)
+                    if ssim < self.ssim_floor:
+                        # Even the best candidate misses the floor; keep it
+                        break
+
+            decision = chosen or EncodeDecision(self.BASELINE_CRF, 1.0, 0)
+            decision = self._capped(decision, duration)
+            logger.info(
+                f"Per-title encode: CRF {decision.crf} (SSIM {decision.ssim:.4f}, "
+                f"~{decision.estimated_size} bytes, maxrate={decision.maxrate_kbps}k)"
+            )
+            return decision
+
+        except Exception as e:
+            logger.error(f"Encode optimization failed, using CRF {self.BASELINE_CRF}: {str(e)}")
+            return self._baseline(duration)
+
+    def _sample_windows(self, start_time: float, duration: float) -> List[float]:
+        """Evenly spaced sample start times inside the range"""
+        usable = duration - self.sample_duration
+        if usable <= 0 or self.sample_count <= 0:
+            return []
+        step = usable / (self.sample_count + 1)
+        return [start_time + step * (i + 1) for i in range(self.sample_count)]
+
+    def _baseline(self, duration: float) -> EncodeDecision:
+        """Baseline CRF, size-capped when the cap is achievable (never raises)"""
+        decision = EncodeDecision(self.BASELINE_CRF, 1.0, 0)
+        try:
+            return self._capped(decision, duration)
+        except ValueError as e:
+            logger.warning(f"Ignoring size cap for CRF {self.BASELINE_CRF} fallback: {str(e)}")
+            return decision
+
+    def _capped(self, decision: EncodeDecision, duration: float) -> EncodeDecision:
+        """Apply the per-reel size cap as a VBV ceiling"""
+        if not self.max_size_bytes or duration <= 0:
+            return decision
+
+        # Leave 5% headroom for container overhead
+        total_kbps = self.max_size_bytes * 8 * 0.95 / 1000 / duration
+        video_kbps = int(total_kbps - self.audio_bitrate_kbps)
+        if video_kbps <= 0:
+            raise ValueError(f"Size cap {self.max_size_bytes} bytes is too small for {duration}s")
+
+        decision.maxrate_kbps = video_kbps
+        decision.estimated_size = min(decision.estimated_size or self.max_size_bytes, self.max_size_bytes)
+        return decision
+
+    def _encode_sample(self, input_path: str, output_path: str, start: float, crf: int):
+        """Encode one sample window at the given CRF"""
+        cmd = [
+            self.ffmpeg_path,
+            "-ss", str(start),
+            "-t", str(self.sample_duration),
+            "-i", input_path,
+            "-vf", f"scale={self.reel_width}:-2",
+            "-an",
+            "-c:v", "libx264",
+            "-preset", "medium",
+            "-crf", str(crf),
+            "-pix_fmt", "yuv420p",
+            "-y",
+            output_path
+        ]
+        result = subprocess.run(wrap_command(cmd), capture_output=True, text=True, timeout=120)
+        if result.returncode != 0:
+            raise Exception(f"Sample encode failed: {result.stderr}")
+
+    def _decode_luma(self, path: str, start: float, duration: float) -> np.ndarray:
+        """Decode a window to low-resolution grayscale frames"""
+        cmd = [
+            self.ffmpeg_path,
+            "-v", "error",
+            "-ss", str(start),
+            "-t", str(duration),
+            "-i", path,
+            "-vf", (
+                f"scale={self.reel_width}:-2,"
+                f"scale={self.ANALYSIS_WIDTH}:{self.ANALYSIS_HEIGHT},"
+                f"fps={self.ANALYSIS_FPS}"
+            ),
+            "-pix_fmt", "gray",
+            "-f", "rawvideo",
+            "-"
+        ]
+        result = subprocess.run(wrap_command(cmd), capture_output=True, timeout=120)
+        if result.returncode != 0:
+            raise Exception(f"Frame decode failed: {result.stderr.decode(errors='ignore')}")
+
+        frame_size = self.ANALYSIS_WIDTH * self.ANALYSIS_HEIGHT
+        usable = len(result.stdout) - len(result.stdout) % frame_size
+        return np.frombuffer(result.stdout[:usable], dtype=np.uint8).reshape(
+            -1, self.ANALYSIS_HEIGHT, self.ANALYSIS_WIDTH
+        )
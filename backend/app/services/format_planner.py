@@ -0,0 +1,178 @@
+"""
+Format Planner - Cost-aware stream selection for downloads
+
+Every reel is rendered into a 1080px-wide band, so anything above the
+smallest resolution tier that covers the band is wasted bandwidth, disk and
+decode time. The planner ranks the formats yt-dlp reports by:
+
+1. Smallest height tier that still covers the output band
+2. Decode cost (H.264 decodes far faster than VP9/AV1 in software)
+3. Expected bytes
+
+and reports the expected bytes and decode cost for each choice.
+"""
+
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Optional
+
+# Relative software decode cost per pixel, H.264 = 1.0
+CODEC_DECODE_COST = {
+    "avc1": 1.0,
+    "h264": 1.0,
+    "hev1": 2.0,
+    "hvc1": 2.0,
+    "vp8": 1.5,
+    "vp9": 2.5,
+    "vp09": 2.5,
+    "av01": 4.0,
+}
+UNKNOWN_CODEC_COST = 3.0
+
+# Audio codecs that mux into MP4 without re-encoding
+MP4_AUDIO_CODECS = ("mp4a", "aac")
+
+
+@dataclass
+class FormatPlan:
+    """A chosen (video, audio) stream pair and its expected cost"""
+    format_selector: str  # Passed to yt-dlp as 'format'
+    video_format_id: Optional[str] = None
+    audio_format_id: Optional[str] = None
+    height: Optional[int] = None
+    vcodec: Optional[str] = None
+    expected_bytes: Optional[int] = None
+    decode_cost: Optional[float] = None  # Codec-weighted megapixel-seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def codec_family(vcodec: Optional[str]) -> str:
+    """Normalise 'avc1.640028' / 'vp09.00.40.08' to the codec family"""
+    return (vcodec or "").split(".")[0].lower()
+
+
+def decode_cost_factor(vcodec: Optional[str]) -> float:
+    return CODEC_DECODE_COST.get(codec_family(vcodec), UNKNOWN_CODEC_COST)
+
+
+class FormatPlanner:
+    """Pick the cheapest streams that satisfy the output spec"""
+
+    def __init__(self, target_height: int = 608, fallback_max_height: int = 720, min_audio_kbps: float = 96.0):
+        self.target_height = target_height
+        self.fallback_max_height = fallback_max_height
+        self.min_audio_kbps = min_audio_kbps
+
+    def fallback_selector(self) -> str:
+        """Selector for when no format list is available yet"""
+        h = self.fallback_max_height
+        return (
+            f"bestvideo[height<={h}][vcodec^=avc1]+bestaudio[ext=m4a]/"
+            f"bestvideo[height<={h}]+bestaudio/"
+            f"best[height<={h}]/best"
+        )
+
+    def rank(self, info: Dict[str, Any]) -> List[FormatPlan]:
+        """All viable plans for this source, cheapest first"""
+        duration = float(info.get("duration") or 0)
+        formats = info.get("formats") or []
+
+        video_only = [f for f in formats if self._has_video(f) and not self._has_audio(f)]
+        progressive = [f for f in formats if self._has_video(f) and self._has_audio(f)]
+        audio = self._pick_audio(formats, duration)
+
+        plans = []
+        if audio:
+            audio_bytes = self._expected_bytes(audio, duration) or 0
+            for video in video_only:
+                plans.append(self._make_plan(video, audio, duration, audio_bytes))
+        for video in progressive:
+            plans.append(self._make_plan(video, None, duration, 0))
+
+        tier = self._height_tier([p.height for p in plans if p.height])
+        return sorted(plans, key=lambda p: self._sort_key(p, tier))
+
+    def plan(self, info: Optional[Dict[str, Any]]) -> FormatPlan:
+        """Best plan for this source, or the generic fallback"""
+        if info:
+            ranked = self.rank(info)
+            if ranked:
+                return ranked[0]
+        return FormatPlan(format_selector=self.fallback_selector())
+
+    def _height_tier(self, heights: List[int]) -> Optional[int]:
+        """Smallest available height covering the target, else the largest"""
+        if not heights:
+            return None
+        covering = [h for h in heights if h >= self.target_height]
+        return min(covering) if covering else max(heights)
+
+    def _sort_key(self, plan: FormatPlan, tier: Optional[int]):
+        height = plan.height or 0
+        if tier is None:
+            tier_distance = 0
+        elif height == tier:
+            tier_distance = 0
+        elif height > tier:
+            tier_distance = 1  # Wasteful but acceptable
+        else:
+            tier_distance = 2  # Would upscale
+        return (
+            tier_distance,
+            height if height > (tier or 0) else -height,
+            decode_cost_factor(plan.vcodec),
+            plan.expected_bytes if plan.expected_bytes is not None else float("inf"),
+        )
+
+    def _make_plan(self, video: Dict, audio: Optional[Dict], duration: float, audio_bytes: int) -> FormatPlan:
+        video_bytes = self._expected_bytes(video, duration)
+        expected = video_bytes + audio_bytes if video_bytes is not None else None
+
+        width = video.get("width") or 0
+        height = video.get("height") or 0
+        fps = video.get("fps") or 30
+        decode_cost = width * height * fps * duration / 1e6 * decode_cost_factor(video.get("vcodec"))
+
+        selector = video["format_id"] if audio is None else f"{video['format_id']}+{audio['format_id']}"
+        return FormatPlan(
+            format_selector=selector,
+            video_format_id=video["format_id"],
+            audio_format_id=audio["format_id"] if audio else None,
+            height=height or None,
+            vcodec=video.get("vcodec"),
+            expected_bytes=expected,
+            decode_cost=round(decode_cost, 1),
+        )
+
+    def _pick_audio(self, formats: List[Dict], duration: float) -> Optional[Dict]:
+        """Smallest MP4-compatible audio stream at or above the bitrate floor"""
+        audio_only = [f for f in formats if self._has_audio(f) and not self._has_video(f)]
+        if not audio_only:
+            return None
+
+        def key(f):
+            mp4_friendly = codec_family(f.get("acodec")) in MP4_AUDIO_CODECS or f.get("ext") == "m4a"
+            abr = f.get("abr") or f.get("tbr") or 0
+            below_floor = abr < self.min_audio_kbps
+            return (not mp4_friendly, below_floor, abr if not below_floor else -abr)
+
+        return sorted(audio_only, key=key)[0]
+
+    @staticmethod
+    def _expected_bytes(fmt: Dict, duration: float) -> Optional[int]:
+        size = fmt.get("filesize") or fmt.get("filesize_approx")
+        if size:
+            return int(size)
+        tbr = fmt.get("tbr")
+        if tbr and duration:
+            return int(tbr * 1000 / 8 * duration)
+        return None
+
+    @staticmethod
+    def _has_video(fmt: Dict) -> bool:
+        return fmt.get("vcodec") not in (None, "none") and bool(fmt.get("format_id"))
+
+    @staticmethod
+    def _has_audio(fmt: Dict) -> bool:
+        return fmt.get("acodec") not in (None, "none") and bool(fmt.get("format_id"))
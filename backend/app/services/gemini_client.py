@@ -1,79 +1,165 @@
+"""
+Gemini Client - Shared, non-blocking access to the Gemini API
+
+One client per process. Model objects (and the SDK's underlying gRPC
+channel) are created once and reused. Calls go through the SDK's async API
+with a per-call timeout, so they never block the event loop or a job
+worker, and every call's latency is recorded in a histogram.
+
+Every call first takes a token from two cluster-wide buckets - one per
+model and one per API key. Quota errors (429 / RESOURCE_EXHAUSTED) are
+retried in-process with jittered exponential backoff; if they persist,
+GeminiQuotaExceeded is raised so the job can be re-queued instead of
+storing placeholder metadata.
+"""
+
+import asyncio
+import hashlib
 import logging
-from typing import Dict, List
+import threading
+import time
+from typing import Dict, Optional
+
 import google.generativeai as genai
 
+from app.core.config import get_settings
+from app.core.metrics import get_registry
+from app.services.rate_limiter import TokenBucketLimiter, acquire_all, backoff_delay
+
 logger = logging.getLogger(__name__)
+settings = get_settings()
+
+GEMINI_LATENCY = get_registry().histogram(
+    "gemini_request_seconds", "Gemini generate_content latency by model and outcome"
+)
+GEMINI_QUOTA_ERRORS = get_registry().counter(
+    "gemini_quota_errors_total", "Gemini quota (429) responses by model"
+)
+
+
+class GeminiNotConfigured(Exception):
+    """No API key is configured"""
+
+
+class GeminiQuotaExceeded(Exception):
+    """Quota errors persisted through every in-process retry"""
+
+
+def is_quota_error(error: Exception) -> bool:
+    """429 / RESOURCE_EXHAUSTED from the SDK"""
+    try:
+        from google.api_core import exceptions as api_exceptions
+        if isinstance(error, (api_exceptions.ResourceExhausted, api_exceptions.TooManyRequests)):
+            return True
+    except ImportError:
+        pass
+    return "429" in str(error) or "RESOURCE_EXHAUSTED" in str(error).upper()
+
+
+def _build_limiters(rpm_per_model: float, rpm_per_key: float):
+    """Per-model and per-key limiters on the shared Redis"""
+    try:
+        from redis import Redis
+        client = Redis.from_url(settings.redis_url, socket_timeout=2)
+    except Exception as e:
+        logger.warning(f"Rate limiter falling back to in-process buckets: {str(e)}")
+        client = None
+    return (
+        TokenBucketLimiter(client, rate=rpm_per_model / 60.0),
+        TokenBucketLimiter(client, rate=rpm_per_key / 60.0),
+    )
 
 
 class GeminiClient:
-    """Gemini AI for metadata generation"""
-    
-    def __init__(self, api_key: str, model: str = "gemini-1.5-pro"):
+    """Async Gemini client with reused model objects and per-call timeouts"""
+
+    def __init__(self, api_key: str, model: str = "gemini-1.5-pro", timeout: float = 60.0):
         self.api_key = api_key
         self.model = model
-        
+        self.timeout = timeout
+        self._models: Dict[str, genai.GenerativeModel] = {}
+        self._lock = threading.Lock()
+        self.model_limiter, self.key_limiter = _build_limiters(
+            settings.gemini_rpm_per_model, settings.gemini_rpm_per_key
+        )
+        # Bucket name for the key without putting the key itself in Redis
+        self.key_bucket = "gemini:key:" + hashlib.sha256(api_key.encode()).hexdigest()[:16]
+
         if api_key:
             genai.configure(api_key=api_key)
         else:
             logger.warning("Gemini API key not configured")
-    
-    def generate_reel_metadata(self, 
-                              transcript: str,
-                              video_title: str = "",
-                              video_description: str = "") -> Dict:
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.api_key)
+
+    def get_model(self, name: Optional[str] = None) -> genai.GenerativeModel:
+        """Cached GenerativeModel for this model name"""
+        name = name or self.model
+        with self._lock:
+            if name not in self._models:
+                self._models[name] = genai.GenerativeModel(name)
+            return self._models[name]
+
+    async def generate(self, prompt: str, model: Optional[str] = None, timeout: Optional[float] = None) -> str:
         """
-        Generate title, caption, hashtags, and topics for a reel
+        Run one generate_content call and return the response text.
+
+        Waits for the model and key rate limits, and retries quota errors
+        with backoff. Raises GeminiQuotaExceeded when retries run out,
+        asyncio.TimeoutError after `timeout` seconds, and re-raises other
+        SDK errors; callers decide on fallbacks.
         """
-        try:
-            if not self.api_key:
-                logger.warning("Gemini not configured - returning defaults")
-                return self._get_default_metadata()
-            
-            prompt = f"""Analyze this video content and generate Instagram Reel metadata.
-
-Video Title: {video_title}
-Video Description: {video_description}
-
-Transcript/Content:
-{transcript[:2000]}  # Limit to 2000 chars
-
-Generate a JSON response with:
-- title: catchy reel title (max 100 chars)
-- caption: engaging caption (max 300 chars)
-- hashtags: 10-15 relevant hashtags (as string, space-separated)
-- topics: 3-5 topic labels (as comma-separated string)
-- quality_score: content quality 0-100
-
-Return ONLY valid JSON, no markdown."""
-            
-            model = genai.GenerativeModel(self.model)
-            response = model.generate_content(prompt)
-            
-            # Parse response
-            import json
+        if not self.configured:
+            raise GeminiNotConfigured("Gemini API key not configured")
+
+        model_name = model or self.model
+        for attempt in range(settings.gemini_max_retries + 1):
+            await acquire_all([
+                (self.model_limiter, f"gemini:model:{model_name}"),
+                (self.key_limiter, self.key_bucket),
+            ])
             try:
-                result = json.loads(response.text)
-                return {
-                    "title": result.get("title", "Check this out!"),
-                    "caption": result.get("caption", "Amazing content"),
-                    "hashtags": result.get("hashtags", "#viral #content #shorts"),
-                    "topics": result.get("topics", "Entertainment,Creative,Trending"),
-                    "quality_score": float(result.get("quality_score", 75))
-                }
-            except json.JSONDecodeError:
-                logger.warning("Failed to parse Gemini response")
-                return self._get_default_metadata()
-        
+                return await self._generate_once(prompt, model_name, timeout or self.timeout)
+            except Exception as e:
+                if not is_quota_error(e):
+                    raise
+                GEMINI_QUOTA_ERRORS.inc(model=model_name)
+                if attempt == settings.gemini_max_retries:
+                    raise GeminiQuotaExceeded(f"Gemini quota exhausted for {model_name}: {str(e)}") from e
+                delay = backoff_delay(attempt, settings.gemini_backoff_base, settings.gemini_backoff_max)
+                logger.warning(f"Gemini quota error ({model_name}), retry {attempt + 1} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def _generate_once(self, prompt: str, model_name: str, timeout: float) -> str:
+        started = time.monotonic()
+        outcome = "error"
+        try:
+            response = await asyncio.wait_for(
+                self.get_model(model_name).generate_content_async(
+                    prompt, request_options={"timeout": timeout}
+                ),
+                timeout=timeout
+            )
+            outcome = "ok"
+            return response.text
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            raise
         except Exception as e:
-            logger.error(f"Gemini error: {str(e)}")
-            return self._get_default_metadata()
-    
-    def _get_default_metadata(self) -> Dict:
-        """Return default metadata when Gemini is not available"""
-        return {
-            "title": "Check this out!",
-            "caption": "Amazing content you'll love! 🔥",
-            "hashtags": "#viral #content #shorts #trending",
-            "topics": "Entertainment,Creative,Trending",
-            "quality_score": 75.0
-        }
+            outcome = "quota" if is_quota_error(e) else "error"
+            raise
+        finally:
+            GEMINI_LATENCY.observe(time.monotonic() - started, model=model_name, outcome=outcome)
+
+
+_client: Optional[GeminiClient] = None
+
+
+def get_gemini_client() -> GeminiClient:
+    """Process-wide Gemini client"""
+    global _client
+    if _client is None:
+        _client = GeminiClient(settings.gemini_api_key, settings.gemini_model, settings.gemini_timeout)
+    return _client
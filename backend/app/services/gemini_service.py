@@ -1,27 +1,38 @@
 """Gemini AI service for generating reel metadata"""
 
+import asyncio
 import json
 import logging
-from typing import Dict, Optional
-import google.generativeai as genai
+import time
+from typing import Any, Dict, List, Optional
 from app.core.config import get_settings
+from app.services.ai_cache import cache_key, get_prompt_cache
+from app.services.gemini_client import GeminiQuotaExceeded, get_gemini_client
+from app.services.heuristic_metadata import HeuristicMetadataEngine, generate_batch as heuristic_batch
+from app.services.prompt_batching import estimate_tokens, pack_batches
 from app.utils.helpers import get_logger
+from app.workers.cancellation import check_cancelled
 
 logger = get_logger(__name__)
 settings = get_settings()
 
+REQUIRED_FIELDS = ['title', 'caption', 'hashtags', 'topics', 'quality_score']
+
+# Bump when the metadata prompts change meaning; invalidates cached responses
+METADATA_PROMPT_VERSION = "reel-metadata-v1"
+METADATA_CACHE_NAMESPACE = "reel_metadata"
+
+METADATA_MODES = ("gemini", "heuristic", "hybrid")
+
 
 class GeminiAIService:
     """Service for generating AI metadata using Google Gemini API"""
     
     def __init__(self):
-        self.api_key = settings.gemini_api_key
-        self.model_name = settings.gemini_model
-        
-        if self.api_key:
-            genai.configure(api_key=self.api_key)
-        else:
-            logger.warning("Gemini API key not configured")
+        self.client = get_gemini_client()
+        self.api_key = self.client.api_key
+        self.model_name = self.client.model
+        self.cache = get_prompt_cache(METADATA_CACHE_NAMESPACE)
     
     async def generate_reel_metadata(self, 
                                     transcript: Optional[str],
@@ -38,32 +49,259 @@ class GeminiAIService:
         - quality_score: 0.0-1.0
         """
         try:
+            key = self._metadata_cache_key(transcript, duration, title)
+            cached = await self._cache_get(key)
+            if cached:
+                return cached
+            
             if not self.api_key:
                 logger.warning("Gemini API key not configured, returning default metadata")
-                return self._get_default_metadata()
+                return self._fallback_metadata(transcript, duration)
             
             # Prepare prompt
             prompt = self._build_prompt(transcript, duration, title)
             
             logger.info(f"Generating AI metadata for reel (duration: {duration}s)")
             
-            # Call Gemini API
-            model = genai.GenerativeModel(self.model_name)
-            response = model.generate_content(prompt)
+            # Call Gemini API (async, shared model, per-call timeout)
+            started = time.monotonic()
+            response_text = await self.client.generate(prompt)
             
-            if not response.text:
+            if not response_text:
                 logger.warning("Empty response from Gemini API")
-                return self._get_default_metadata()
+                return self._fallback_metadata(transcript, duration)
             
-            # Parse response
-            metadata = self._parse_gemini_response(response.text)
+            # Parse response; only real responses are cached, never the defaults
+            metadata = self._parse_gemini_response(response_text)
+            if metadata is None:
+                return self._fallback_metadata(transcript, duration)
+            await self._cache_set(key, metadata, time.monotonic() - started, estimate_tokens(prompt))
             
             logger.info(f"Generated metadata: {json.dumps(metadata, indent=2)}")
             return metadata
         
+        except GeminiQuotaExceeded:
+            # Not a content problem: the caller re-queues instead of storing defaults
+            raise
+        
         except Exception as e:
             logger.error(f"Error generating AI metadata: {str(e)}", exc_info=True)
-            return self._get_default_metadata()
+            return self._fallback_metadata(transcript, duration)
+    
+    async def generate_metadata(
+        self,
+        items: List[Dict],
+        title: Optional[str] = None,
+        context: Optional[str] = None,
+        mode: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Metadata for all reels of one video in the given mode.
+        
+        - gemini: every reel goes to the model (batched if enabled)
+        - heuristic: local key-phrase engine only, no network
+        - hybrid: heuristic for every reel; only reels scoring at least
+          metadata_llm_min_score are sent to the model
+        """
+        mode = mode or settings.metadata_mode
+        if mode not in METADATA_MODES:
+            raise ValueError(f"Unknown metadata mode: {mode}")
+        
+        if mode == "heuristic":
+            return heuristic_batch([i.get('transcript') for i in items], [i.get('duration') for i in items])
+        
+        if mode == "gemini":
+            if settings.gemini_batch_enabled:
+                return await self.generate_batch_metadata(items, title=title, context=context)
+            return [
+                await self.generate_reel_metadata(i.get('transcript'), i.get('duration'), title=title)
+                for i in items
+            ]
+        
+        results = heuristic_batch([i.get('transcript') for i in items], [i.get('duration') for i in items])
+        selected = [n for n, r in enumerate(results) if r['quality_score'] >= settings.metadata_llm_min_score]
+        logger.info(f"Hybrid metadata: {len(selected)} of {len(items)} reels worth an LLM call")
+        if selected:
+            llm_results = await self.generate_batch_metadata([items[n] for n in selected], title=title, context=context)
+            for n, metadata in zip(selected, llm_results):
+                results[n] = metadata
+        return results
+    
+    async def generate_batch_metadata(
+        self,
+        items: List[Dict],
+        title: Optional[str] = None,
+        context: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Generate metadata for many reels of one video in few requests.
+        
+        items: [{"transcript": str | None, "duration": float}, ...]
+        context: shared video-level text (e.g. transcript opening), sent
+                 once per batch instead of once per reel
+        
+        Items are packed into batches under gemini_batch_token_budget and
+        batches run with bounded concurrency. A batch that fails, or items
+        missing/invalid in its JSON array, are retried one reel at a time.
+        GeminiQuotaExceeded propagates so the job can be re-queued.
+        
+        Returns metadata dicts in the same order as items
+        """
+        keys = [self._metadata_cache_key(item.get('transcript'), item.get('duration'), title) for item in items]
+        
+        # Cache hits never reach the network
+        results: List[Optional[Dict]] = await self._cache_get_many(keys)
+        indexed = []
+        for index, item in enumerate(items):
+            if results[index] is None:
+                indexed.append((index, item))
+        if not indexed:
+            return results
+        
+        if not self.api_key:
+            logger.warning("Gemini API key not configured, returning default metadata")
+            return [r or self._fallback_metadata(item.get('transcript'), item.get('duration')) for r, item in zip(results, items)]
+        
+        header_tokens = estimate_tokens(self._build_batch_prompt([], title, context))
+        batches = pack_batches(
+            indexed,
+            cost=lambda item: estimate_tokens(self._batch_item_block(*item)),
+            budget=max(1, settings.gemini_batch_token_budget - header_tokens),
+            max_items=settings.gemini_batch_max_items,
+        )
+        logger.info(
+            f"Generating AI metadata for {len(indexed)} reels in {len(batches)} batches "
+            f"({len(items) - len(indexed)} cached)"
+        )
+        
+        slots = asyncio.Semaphore(max(1, settings.gemini_max_concurrency))
+        
+        async def run_batch(batch):
+            async with slots:
+                # A cancelled job stops spending quota on its remaining batches
+                check_cancelled()
+                started = time.monotonic()
+                parsed = await self._request_batch(batch, title, context)
+                elapsed = time.monotonic() - started
+            
+            for index, item in batch:
+                metadata = parsed.get(index)
+                if metadata is not None:
+                    # Attribute an equal share of the batch's cost to each item
+                    await self._cache_set(
+                        keys[index], metadata, elapsed / len(batch),
+                        estimate_tokens(self._batch_item_block(index, item))
+                    )
+                else:
+                    # Item missing from the batch response: fall back to its own request
+                    async with slots:
+                        metadata = await self.generate_reel_metadata(
+                            transcript=item.get('transcript'),
+                            duration=item.get('duration'),
+                            title=title,
+                        )
+                results[index] = metadata
+        
+        await asyncio.gather(*(run_batch(batch) for batch in batches))
+        return results
+    
+    async def _request_batch(self, batch: List, title: Optional[str], context: Optional[str]) -> Dict[int, Dict]:
+        """One structured request for a batch; returns valid items by index"""
+        try:
+            prompt = self._build_batch_prompt(batch, title, context)
+            response_text = await self.client.generate(prompt)
+            return self._parse_batch_response(response_text, {index for index, _ in batch})
+        except GeminiQuotaExceeded:
+            raise
+        except Exception as e:
+            logger.error(f"Batch metadata request failed ({len(batch)} reels): {str(e)}")
+            return {}
+    
+    def _metadata_cache_key(self, transcript: Optional[str], duration: Optional[float], title: Optional[str]) -> str:
+        return cache_key(
+            self.model_name,
+            METADATA_PROMPT_VERSION,
+            transcript=transcript or "",
+            duration=float(duration or 0),
+            title=title or "",
+        )
+    
+    # The cache client is synchronous: lookups run off the event loop
+    async def _cache_get(self, key: str) -> Optional[Dict]:
+        return await asyncio.to_thread(self.cache.get, key) if self.cache else None
+    
+    async def _cache_get_many(self, keys: List[str]) -> List[Optional[Dict]]:
+        if not self.cache:
+            return [None] * len(keys)
+        return await asyncio.to_thread(lambda: [self.cache.get(key) for key in keys])
+    
+    async def _cache_set(self, key: str, metadata: Dict, latency: float, prompt_tokens: int):
+        if self.cache:
+            await asyncio.to_thread(self.cache.set, key, metadata, latency=latency, prompt_tokens=prompt_tokens)
+    
+    def _batch_item_block(self, index: int, item: Dict) -> str:
+        transcript = (item.get('transcript') or '')[:1000]
+        return f"Reel {index} ({item.get('duration')}s): {transcript or '(no transcript)'}\n"
+    
+    def _build_batch_prompt(self, batch: List, title: Optional[str], context: Optional[str]) -> str:
+        """Build one prompt covering every reel in the batch"""
+        shared = ""
+        if title:
+            shared += f"Video Title: {title}\n"
+        if context:
+            shared += f"Video Context: {context[:1500]}\n"
+        
+        reels = "".join(self._batch_item_block(index, item) for index, item in batch)
+        
+        return f"""You are an Instagram content expert. The reels below are consecutive clips of one video.
+
+{shared}
+Reels (id, duration, transcript):
+{reels}
+For EACH reel, generate metadata. Return a JSON array with one object per reel:
+[
+    {{
+        "id": 0,
+        "title": "A short, engaging title (max 50 chars)",
+        "caption": "An engaging Instagram caption with call-to-action (max 150 chars)",
+        "hashtags": ["#tag1", "#tag2", "#tag3", "#tag4", "#tag5"],
+        "topics": ["topic1", "topic2", "topic3"],
+        "quality_score": 0.85
+    }}
+]
+
+Important:
+- "id" must match the reel id given above
+- Each reel gets its own title and caption based on its own transcript
+- Quality score: 0.0-1.0, where 1.0 is perfect viral potential
+- Return ONLY valid JSON, no extra text"""
+    
+    def _parse_batch_response(self, response_text: str, expected_ids: set) -> Dict[int, Dict]:
+        """Validate each array element on its own; bad elements are dropped"""
+        try:
+            items = json.loads(self._strip_code_fence(response_text))
+        except (json.JSONDecodeError, TypeError) as e:
+            logger.error(f"Batch JSON parsing error: {str(e)}")
+            return {}
+        if not isinstance(items, list):
+            return {}
+        
+        parsed = {}
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            try:
+                index = int(item.get('id'))
+            except (TypeError, ValueError):
+                continue
+            metadata = self._validate_metadata(item)
+            if index in expected_ids and metadata is not None:
+                parsed[index] = metadata
+        
+        missing = len(expected_ids) - len(parsed)
+        if missing:
+            logger.warning(f"Batch response missing or invalid for {missing} of {len(expected_ids)} reels")
+        return parsed
     
     def _build_prompt(self, transcript: Optional[str], duration: float, title: Optional[str] = None) -> str:
         """Build prompt for Gemini API"""
@@ -102,42 +340,50 @@ Important:
         
         return prompt
     
-    def _parse_gemini_response(self, response_text: str) -> Dict:
-        """Parse JSON response from Gemini"""
+    def _parse_gemini_response(self, response_text: str) -> Optional[Dict]:
+        """Parse JSON response from Gemini; None if it is not valid metadata"""
         try:
-            # Extract JSON from response
-            json_str = response_text.strip()
-            
-            # If wrapped in markdown code blocks, extract
-            if json_str.startswith("```"):
-                json_str = json_str.split("```")[1]
-                if json_str.startswith("json"):
-                    json_str = json_str[4:]
-            
-            json_str = json_str.strip()
-            
-            metadata = json.loads(json_str)
-            
-            # Validate required fields
-            required_fields = ['title', 'caption', 'hashtags', 'topics', 'quality_score']
-            for field in required_fields:
-                if field not in metadata:
-                    logger.warning(f"Missing field in Gemini response: {field}")
-                    return self._get_default_metadata()
-            
-            # Ensure quality_score is between 0 and 1
-            metadata['quality_score'] = max(0.0, min(1.0, float(metadata['quality_score'])))
-            
-            return metadata
+            metadata = json.loads(self._strip_code_fence(response_text))
+            return self._validate_metadata(metadata)
         
         except json.JSONDecodeError as e:
             logger.error(f"JSON parsing error: {str(e)}")
             logger.error(f"Response text: {response_text}")
-            return self._get_default_metadata()
+            return None
         
         except Exception as e:
             logger.error(f"Error parsing Gemini response: {str(e)}")
+            return None
+    
+    def _strip_code_fence(self, response_text: str) -> str:
+        """Extract the JSON body if wrapped in markdown code blocks"""
+        json_str = response_text.strip()
+        if json_str.startswith("```"):
+            json_str = json_str.split("```")[1]
+            if json_str.startswith("json"):
+                json_str = json_str[4:]
+        return json_str.strip()
+    
+    def _validate_metadata(self, metadata: Any) -> Optional[Dict]:
+        """Check required fields and clamp quality_score; None if invalid"""
+        if not isinstance(metadata, dict):
+            return None
+        for field in REQUIRED_FIELDS:
+            if field not in metadata:
+                logger.warning(f"Missing field in Gemini response: {field}")
+                return None
+        try:
+            # Ensure quality_score is between 0 and 1
+            metadata['quality_score'] = max(0.0, min(1.0, float(metadata['quality_score'])))
+        except (TypeError, ValueError):
+            return None
+        return {field: metadata[field] for field in REQUIRED_FIELDS}
+    
+    def _fallback_metadata(self, transcript: Optional[str], duration: Optional[float]) -> Dict:
+        """Local heuristic metadata when there is a transcript to work from"""
+        if not transcript:
             return self._get_default_metadata()
+        return HeuristicMetadataEngine().generate(transcript, duration)
     
     def _get_default_metadata(self) -> Dict:
         """Return default metadata when AI generation fails"""
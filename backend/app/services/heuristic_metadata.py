@@ -0,0 +1,218 @@
+"""
+Heuristic Metadata - Local title/caption/hashtag generation from transcripts
+
+Produces the same metadata shape as GeminiAIService in milliseconds, with
+no network call:
+
+1. Key phrases: RAKE candidates (runs of non-stopwords), scored by the
+   TF-IDF weight of their words across all reels of the video, so words
+   that appear in every reel (the show's name, filler) rank low
+2. Hashtags: key words mapped through a topic vocabulary, then the top
+   key words themselves
+3. quality_score: speech density, key-phrase strength and hooks
+   (questions, exclamations, numbers)
+
+Used as the bulk mode, as the fallback when Gemini is unavailable or
+rate-limited, and as the pre-filter deciding which reels get an LLM call.
+"""
+
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+WORD_RE = re.compile(r"[A-Za-z][A-Za-z'\-]*|\d+")
+PHRASE_SPLIT_RE = re.compile(r"[.,!?;:()\[\]\"\n]+")
+
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are aren't as at be because been before being
+below between both but by can can't cannot could couldn't did didn't do does doesn't doing don't down
+during each few for from further had hadn't has hasn't have haven't having he he'd he'll he's her here
+here's hers herself him himself his how how's i i'd i'll i'm i've if in into is isn't it it's its itself
+just let's like me more most mustn't my myself no nor not of off on once only or other ought our ours
+ourselves out over own really right same say said she she'd she'll she's should shouldn't so some such
+than that that's the their theirs them themselves then there there's these they they'd they'll they're
+they've this those through to too under until up very was wasn't we we'd we'll we're we've were weren't
+what what's when when's where where's which while who who's whom why why's will with won't would
+wouldn't you you'd you'll you're you've your yours yourself yourselves yeah okay ok um uh gonna gotta
+wanna know think thing things going get got go actually basically literally kind sort lot mean
+""".split())
+
+# Topic -> trigger words and the hashtags it contributes
+HASHTAG_VOCABULARY: Dict[str, Tuple[Sequence[str], Sequence[str]]] = {
+    "business": (("money", "business", "startup", "company", "sales", "market", "revenue", "invest", "investing"),
+                 ("#business", "#entrepreneur", "#startup")),
+    "finance": (("stock", "stocks", "crypto", "bitcoin", "finance", "budget", "savings", "debt"),
+                ("#finance", "#investing", "#money")),
+    "fitness": (("workout", "gym", "muscle", "fitness", "training", "exercise", "protein", "cardio"),
+                ("#fitness", "#workout", "#gym")),
+    "health": (("health", "sleep", "diet", "doctor", "brain", "stress", "mental", "nutrition"),
+               ("#health", "#wellness", "#mentalhealth")),
+    "tech": (("ai", "software", "code", "coding", "app", "computer", "tech", "technology", "data", "robot"),
+             ("#tech", "#technology", "#ai")),
+    "gaming": (("game", "games", "gaming", "player", "level", "boss", "console"),
+               ("#gaming", "#gamer")),
+    "food": (("food", "recipe", "cook", "cooking", "eat", "kitchen", "chef", "taste"),
+             ("#food", "#recipe", "#foodie")),
+    "travel": (("travel", "trip", "city", "country", "flight", "hotel", "beach"),
+               ("#travel", "#wanderlust")),
+    "education": (("learn", "learning", "study", "school", "teacher", "lesson", "science", "history"),
+                  ("#learning", "#education", "#didyouknow")),
+    "motivation": (("success", "goal", "goals", "dream", "motivation", "discipline", "mindset", "habit", "habits"),
+                   ("#motivation", "#mindset", "#success")),
+    "comedy": (("funny", "joke", "laugh", "hilarious", "prank"),
+               ("#comedy", "#funny")),
+    "music": (("song", "music", "album", "beat", "guitar", "sing", "singer"),
+              ("#music", "#musician")),
+    "sports": (("team", "goal", "match", "coach", "season", "football", "basketball", "soccer"),
+               ("#sports", "#athlete")),
+}
+
+GENERIC_HASHTAGS = ("#reels", "#viral", "#explore")
+
+# Speaking rate of engaging short-form speech, words per second
+TARGET_WORDS_PER_SECOND = 2.5
+
+
+def tokenize(text: str) -> List[str]:
+    return [w.lower() for w in WORD_RE.findall(text or "")]
+
+
+def rake_candidates(text: str) -> List[List[str]]:
+    """Runs of non-stopword words within phrase boundaries"""
+    candidates = []
+    for fragment in PHRASE_SPLIT_RE.split(text or ""):
+        current: List[str] = []
+        for word in tokenize(fragment):
+            if word in STOPWORDS or word.isdigit() or len(word) < 3:
+                if current:
+                    candidates.append(current)
+                current = []
+            else:
+                current.append(word)
+        if current:
+            candidates.append(current)
+    # Very long runs are usually missing punctuation, not phrases
+    return [c[:4] for c in candidates]
+
+
+class HeuristicMetadataEngine:
+    """TF-IDF weighted RAKE key phrases -> reel metadata"""
+
+    def __init__(self, vocabulary: Optional[Dict] = None, max_hashtags: int = 5):
+        self.vocabulary = vocabulary or HASHTAG_VOCABULARY
+        self.max_hashtags = max_hashtags
+        self.document_frequency: Counter = Counter()
+        self.documents = 0
+
+        self._trigger_to_topic = {}
+        for topic, (triggers, _) in self.vocabulary.items():
+            for trigger in triggers:
+                self._trigger_to_topic.setdefault(trigger, topic)
+
+    def fit(self, documents: Iterable[str]) -> "HeuristicMetadataEngine":
+        """Learn document frequencies from all reel transcripts of a video"""
+        for document in documents:
+            self.document_frequency.update(set(tokenize(document)))
+            self.documents += 1
+        return self
+
+    def idf(self, word: str) -> float:
+        return math.log((1 + self.documents) / (1 + self.document_frequency[word])) + 1.0
+
+    def key_phrases(self, text: str, limit: int = 5) -> List[Tuple[str, float]]:
+        """Top RAKE phrases scored by summed TF-IDF of their words"""
+        words = [w for w in tokenize(text) if w not in STOPWORDS and len(w) >= 3 and not w.isdigit()]
+        if not words:
+            return []
+        tf = Counter(words)
+        weight = {w: (count / len(words)) * self.idf(w) for w, count in tf.items()}
+
+        scored: Dict[str, float] = {}
+        for candidate in rake_candidates(text):
+            phrase = " ".join(candidate)
+            score = sum(weight.get(w, 0.0) for w in candidate)
+            scored[phrase] = max(scored.get(phrase, 0.0), score)
+        return sorted(scored.items(), key=lambda item: -item[1])[:limit]
+
+    def generate(self, transcript: Optional[str], duration: Optional[float]) -> Dict:
+        """Metadata in the GeminiAIService shape"""
+        phrases = self.key_phrases(transcript or "")
+        key_words = []
+        for phrase, _ in phrases:
+            for word in phrase.split():
+                if word not in key_words:
+                    key_words.append(word)
+
+        topics = self._topics(tokenize(transcript or ""))
+        return {
+            "title": self._title(phrases),
+            "caption": self._caption(phrases, transcript),
+            "hashtags": self._hashtags(topics, key_words),
+            "topics": topics or [w for w in key_words[:3]] or ["entertainment"],
+            "quality_score": self.quality_score(transcript, duration, phrases),
+        }
+
+    def quality_score(
+        self,
+        transcript: Optional[str],
+        duration: Optional[float],
+        phrases: Optional[List[Tuple[str, float]]] = None
+    ) -> float:
+        """0.0-1.0 engagement estimate from speech density, key phrases and hooks"""
+        words = tokenize(transcript or "")
+        if not words or not duration:
+            return 0.3
+
+        rate = len(words) / duration
+        density = max(0.0, 1.0 - abs(rate - TARGET_WORDS_PER_SECOND) / TARGET_WORDS_PER_SECOND)
+
+        phrases = phrases if phrases is not None else self.key_phrases(transcript)
+        strength = min(1.0, sum(score for _, score in phrases[:3]) * 2) if phrases else 0.0
+
+        text = transcript or ""
+        hooks = min(1.0, 0.4 * ("?" in text) + 0.3 * ("!" in text) + 0.3 * bool(re.search(r"\d", text)))
+
+        score = 0.25 + 0.35 * density + 0.25 * strength + 0.15 * hooks
+        return round(max(0.0, min(1.0, score)), 2)
+
+    def _topics(self, words: List[str]) -> List[str]:
+        hits = Counter(self._trigger_to_topic[w] for w in words if w in self._trigger_to_topic)
+        return [topic for topic, _ in hits.most_common(3)]
+
+    def _hashtags(self, topics: List[str], key_words: List[str]) -> List[str]:
+        tags: List[str] = []
+        for topic in topics:
+            tags.extend(t for t in self.vocabulary[topic][1] if t not in tags)
+        for word in key_words:
+            tag = "#" + re.sub(r"[^a-z0-9]", "", word)
+            if len(tag) > 1 and tag not in tags:
+                tags.append(tag)
+        tags.extend(t for t in GENERIC_HASHTAGS if t not in tags)
+        return tags[:self.max_hashtags]
+
+    @staticmethod
+    def _title(phrases: List[Tuple[str, float]]) -> str:
+        if not phrases:
+            return "Check this out!"
+        return phrases[0][0].title()[:50]
+
+    @staticmethod
+    def _caption(phrases: List[Tuple[str, float]], transcript: Optional[str]) -> str:
+        """Lead with the transcript's strongest sentence, end with a call to action"""
+        sentences = [s.strip() for s in re.split(r"(?<=[.!?])\s+", transcript or "") if len(s.split()) >= 4]
+        if phrases and sentences:
+            top = phrases[0][0].split()[0]
+            lead = next((s for s in sentences if top in s.lower()), sentences[0])
+        elif sentences:
+            lead = sentences[0]
+        else:
+            lead = "You need to see this"
+        cta = " Follow for more!"
+        return lead[:150 - len(cta)].rstrip() + cta
+
+
+def generate_batch(transcripts: Sequence[Optional[str]], durations: Sequence[Optional[float]]) -> List[Dict]:
+    """Metadata for all reels of one video, IDF fitted on those reels"""
+    engine = HeuristicMetadataEngine().fit(t or "" for t in transcripts)
+    return [engine.generate(t, d) for t, d in zip(transcripts, durations)]
@@ -0,0 +1,177 @@
+"""
+Highlight Ranker - Score candidate reel windows before encoding
+
+Cheap per-second signals are extracted once for the whole source:
+
+- Audio: RMS loudness (dB) from an 8 kHz mono decode, read from the pipe
+  one second at a time; its variance inside a window captures laughter,
+  emphasis and reactions versus monotone talk
+- Motion: mean absolute frame difference of a 32x18 grayscale decode at
+  2 fps
+- Speech: density of meaningful (non-stopword) transcript words
+
+Sliding windows of the reel length are scored with NumPy (z-scored signals,
+weighted sum) and the top-N non-overlapping windows are returned, so only
+those get encoded and sent for AI metadata.
+"""
+
+import logging
+import subprocess
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from app.services.heuristic_metadata import STOPWORDS, tokenize
+from app.services.transcript_index import TranscriptIndex
+from app.workers.cancellation import run_process, stream_process
+
+logger = logging.getLogger(__name__)
+
+AUDIO_RATE = 8000
+MOTION_FPS = 2
+MOTION_SIZE = (32, 18)
+
+DEFAULT_WEIGHTS = {"loudness": 0.35, "motion": 0.25, "speech": 0.40}
+
+
+@dataclass
+class Highlight:
+    """A candidate window and its score"""
+    start: float
+    end: float
+    score: float
+    loudness: float
+    motion: float
+    speech: float
+
+    def to_dict(self) -> Dict[str, float]:
+        return {k: round(v, 3) for k, v in asdict(self).items()}
+
+
+def _decode(cmd: List[str], timeout: int) -> bytes:
+    result = run_process(cmd, timeout=timeout, text=False, isolate=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.decode(errors="replace")[-500:])
+    return result.stdout
+
+
+def loudness_per_second(video_path: str, ffmpeg_path: str = "ffmpeg") -> np.ndarray:
+    """RMS loudness in dBFS for each second of audio (a trailing partial second is dropped)"""
+    block_size = AUDIO_RATE * 2  # One second of s16le mono
+    cmd = [
+        ffmpeg_path, "-v", "error", "-i", video_path,
+        "-vn", "-ac", "1", "-ar", str(AUDIO_RATE), "-f", "s16le", "-"
+    ]
+    rms: List[float] = []
+    try:
+        for block in stream_process(cmd, block_size, timeout=1800, isolate=True):
+            if len(block) < block_size:
+                continue
+            samples = np.frombuffer(block, dtype=np.int16).astype(np.float32) / 32768.0
+            rms.append(float(np.sqrt(np.mean(samples ** 2))))
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(e.stderr.decode(errors="replace")[-500:])
+    return 20 * np.log10(np.maximum(np.array(rms), 1e-5))
+
+
+def motion_per_second(video_path: str, ffmpeg_path: str = "ffmpeg") -> np.ndarray:
+    """Mean absolute frame difference, averaged per second"""
+    width, height = MOTION_SIZE
+    raw = _decode([
+        ffmpeg_path, "-v", "error", "-i", video_path,
+        "-an", "-vf", f"fps={MOTION_FPS},scale={width}:{height},format=gray",
+        "-f", "rawvideo", "-"
+    ], timeout=1800)
+    frames = np.frombuffer(raw, dtype=np.uint8)
+    count = len(frames) // (width * height)
+    if count < 2:
+        return np.zeros(0)
+    frames = frames[:count * width * height].reshape(count, height, width).astype(np.float32)
+    diffs = np.concatenate([[0.0], np.abs(np.diff(frames, axis=0)).mean(axis=(1, 2))])
+    seconds = count // MOTION_FPS
+    return diffs[:seconds * MOTION_FPS].reshape(seconds, MOTION_FPS).mean(axis=1)
+
+
+def speech_per_second(transcript: Optional[TranscriptIndex], seconds: int) -> np.ndarray:
+    """Meaningful transcript words per second (segment words spread evenly)"""
+    density = np.zeros(seconds)
+    if transcript is None or seconds == 0:
+        return density
+    for start, end, text in transcript.segments():
+        words = [w for w in tokenize(text) if w not in STOPWORDS and len(w) >= 3]
+        first, last = int(start), min(seconds, max(int(start) + 1, int(np.ceil(end))))
+        if words and first < seconds:
+            density[first:last] += len(words) / (last - first)
+    return density
+
+
+def _zscore(values: np.ndarray) -> np.ndarray:
+    std = values.std()
+    return (values - values.mean()) / std if std > 0 else np.zeros_like(values)
+
+
+class HighlightRanker:
+    """Rank sliding windows of a source by highlight potential"""
+
+    def __init__(
+        self,
+        window: int = 30,
+        hop: int = 5,
+        weights: Optional[Dict[str, float]] = None,
+        ffmpeg_path: str = "ffmpeg"
+    ):
+        self.window = window
+        self.hop = max(1, hop)
+        self.weights = weights or DEFAULT_WEIGHTS
+        self.ffmpeg_path = ffmpeg_path
+
+    def score_windows(self, loudness: np.ndarray, motion: np.ndarray, speech: np.ndarray) -> List[Highlight]:
+        """Score every window start on the hop grid"""
+        seconds = min(len(loudness), len(speech), len(motion) if len(motion) else len(loudness))
+        if seconds < self.window:
+            return []
+        if len(motion) < seconds:
+            motion = np.zeros(seconds)
+
+        starts = np.arange(0, seconds - self.window + 1, self.hop)
+        loud_var = sliding_window_view(loudness[:seconds], self.window)[starts].std(axis=1)
+        motion_mean = sliding_window_view(motion[:seconds], self.window)[starts].mean(axis=1)
+        speech_mean = sliding_window_view(speech[:seconds], self.window)[starts].mean(axis=1)
+
+        scores = (
+            self.weights["loudness"] * _zscore(loud_var)
+            + self.weights["motion"] * _zscore(motion_mean)
+            + self.weights["speech"] * _zscore(speech_mean)
+        )
+        return [
+            Highlight(float(s), float(s + self.window), float(sc), float(l), float(m), float(sp))
+            for s, sc, l, m, sp in zip(starts, scores, loud_var, motion_mean, speech_mean)
+        ]
+
+    def top_windows(self, highlights: List[Highlight], n: int) -> List[Highlight]:
+        """Greedy best-first selection of non-overlapping windows, in time order"""
+        chosen: List[Highlight] = []
+        for h in sorted(highlights, key=lambda h: -h.score):
+            if len(chosen) >= n:
+                break
+            if all(h.end <= c.start or h.start >= c.end for c in chosen):
+                chosen.append(h)
+        return sorted(chosen, key=lambda h: h.start)
+
+    def rank(self, video_path: str, transcript: Optional[TranscriptIndex], n: int) -> List[Highlight]:
+        """Extract signals from the source and return its top-n windows"""
+        loudness = loudness_per_second(video_path, self.ffmpeg_path)
+        try:
+            motion = motion_per_second(video_path, self.ffmpeg_path)
+        except Exception as e:
+            # Audio and speech are still informative on their own
+            logger.warning(f"Motion decode failed, ranking without it: {str(e)}")
+            motion = np.zeros(0)
+        speech = speech_per_second(transcript, len(loudness))
+
+        highlights = self.score_windows(loudness, motion, speech)
+        top = self.top_windows(highlights, n)
+        logger.info(f"Highlight ranking: {len(highlights)} candidate windows, kept {len(top)}")
+        return top
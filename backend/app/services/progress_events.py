@@ -0,0 +1,161 @@
+"""
+Progress Events - Job/video progress over Redis pub/sub
+
+Workers publish an event for every job status or progress change (and for
+video status changes) to a per-video and a per-user channel. The API
+streams those channels to clients as Server-Sent Events, so the frontend
+no longer has to poll GET /videos/.
+
+Overall video progress is derived from job state: each stage's job type
+has a weight, fan-out stages contribute the mean progress of their tasks,
+and videos processed without Job rows fall back to their status.
+"""
+
+import json
+import logging
+from typing import Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "progress:"
+
+# Share of overall video progress per stage (job_type)
+STAGE_WEIGHTS = {
+    "youtube_download": 30.0,
+    "cutting": 10.0,
+    "vertical_conversion": 30.0,
+    "ai_generation": 25.0,
+    "instagram_upload": 5.0,
+}
+OPTIONAL_STAGES = ("instagram_upload",)
+
+# Videos without stage jobs (in-process orchestrator)
+STATUS_PROGRESS = {
+    "uploaded": 0.0,
+    "downloading": 10.0,
+    "downloaded": 40.0,
+    "processing": 60.0,
+    "completed": 100.0,
+}
+
+JobState = Tuple[str, str, Optional[float]]  # (job_type, status, progress)
+
+
+def video_channel(video_id: int) -> str:
+    return f"{CHANNEL_PREFIX}video:{video_id}"
+
+
+def user_channel(user_id: int) -> str:
+    return f"{CHANNEL_PREFIX}user:{user_id}"
+
+
+def publish_event(redis_client, event: Dict, video_id: Optional[int] = None, user_id: Optional[int] = None):
+    """Publish to the video and user channels; progress events are best effort"""
+    channels = []
+    if video_id is not None:
+        channels.append(video_channel(video_id))
+    if user_id is not None:
+        channels.append(user_channel(user_id))
+    if not channels:
+        return
+    try:
+        payload = json.dumps(event, default=str)
+        pipe = redis_client.pipeline(transaction=False)
+        for channel in channels:
+            pipe.publish(channel, payload)
+        pipe.execute()
+    except Exception as e:
+        logger.debug(f"Progress event publish failed: {str(e)}")
+
+
+def format_sse(event: Dict, event_type: str) -> str:
+    """One Server-Sent Events frame"""
+    return f"event: {event_type}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+def _value(status) -> str:
+    return getattr(status, "value", status)
+
+
+def video_progress(video_status: str, jobs: Iterable[JobState]) -> float:
+    """0-100 overall progress of a video from its stage jobs"""
+    video_status = _value(video_status)
+    if video_status == "completed":
+        return 100.0
+
+    per_type: Dict[str, list] = {}
+    for job_type, status, progress in jobs:
+        if job_type not in STAGE_WEIGHTS:
+            continue
+        done = _value(status) == "completed"
+        per_type.setdefault(job_type, []).append(100.0 if done else float(progress or 0.0))
+
+    if not per_type:
+        return STATUS_PROGRESS.get(video_status, 0.0)
+
+    total_weight = sum(
+        weight for job_type, weight in STAGE_WEIGHTS.items()
+        if job_type not in OPTIONAL_STAGES or job_type in per_type
+    )
+    achieved = sum(
+        STAGE_WEIGHTS[job_type] * (sum(values) / len(values)) / 100.0
+        for job_type, values in per_type.items()
+    )
+    return round(min(100.0, achieved * 100.0 / total_weight), 1)
+
+
+class VideoProgressTracker:
+    """Per-stream job state of one or more videos, updated from events"""
+
+    def __init__(self):
+        self.video_status: Dict[int, str] = {}
+        self.jobs: Dict[int, Dict[int, JobState]] = {}
+
+    def seed(self, video_id: int, video_status: str, jobs: Iterable[Tuple[int, str, str, Optional[float]]]):
+        """Initial state from the DB: jobs as (job_id, job_type, status, progress)"""
+        self.video_status[video_id] = _value(video_status)
+        self.jobs[video_id] = {job_id: (job_type, _value(status), progress) for job_id, job_type, status, progress in jobs}
+
+    def tracks(self, video_id: int) -> bool:
+        return video_id in self.video_status
+
+    def apply(self, event: Dict) -> Optional[float]:
+        """Fold a published event in; returns the video's new overall progress"""
+        video_id = event.get("video_id")
+        if video_id is None or not self.tracks(video_id):
+            return None
+        if event.get("type") == "video":
+            self.video_status[video_id] = event["status"]
+        elif event.get("type") == "job":
+            previous = self.jobs[video_id].get(event["job_id"])
+            progress = event.get("progress")
+            if progress is None and previous:
+                progress = previous[2]
+            self.jobs[video_id][event["job_id"]] = (event["job_type"], event["status"], progress)
+        return self.progress(video_id)
+
+    def progress(self, video_id: int) -> float:
+        return video_progress(self.video_status[video_id], self.jobs[video_id].values())
+
+
+_event_client = None
+
+
+def get_event_client():
+    """Shared Redis connection for publishing from the API process"""
+    global _event_client
+    if _event_client is None:
+        from redis import Redis
+        from app.core.config import get_settings
+        _event_client = Redis.from_url(get_settings().redis_url, socket_timeout=1)
+    return _event_client
+
+
+def publish_video_status(video, redis_client=None):
+    """Publish a Video row's current status"""
+    publish_event(
+        redis_client or get_event_client(),
+        {'type': 'video', 'video_id': video.id, 'status': _value(video.status), 'error': video.error_message},
+        video_id=video.id,
+        user_id=video.user_id,
+    )
@@ -0,0 +1,52 @@
+"""
+Prompt Batching - Pack many small model requests into few large ones
+
+Items are packed greedily, in order, into batches whose estimated prompt
+size stays under a token budget. Token counts are estimated from character
+length (about 4 characters per token for English), which is close enough
+for sizing and needs no tokenizer.
+"""
+
+from typing import Callable, List, Sequence, TypeVar
+
+T = TypeVar("T")
+
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for budget sizing"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def pack_batches(
+    items: Sequence[T],
+    cost: Callable[[T], int],
+    budget: int,
+    max_items: int = 0
+) -> List[List[T]]:
+    """
+    Split items into consecutive batches of total cost <= budget.
+
+    An item that alone exceeds the budget gets a batch of its own rather
+    than being dropped. max_items (0 = unlimited) caps the batch length,
+    which bounds how much one malformed response can invalidate.
+    """
+    batches: List[List[T]] = []
+    current: List[T] = []
+    current_cost = 0
+
+    for item in items:
+        item_cost = cost(item)
+        full = current and (
+            current_cost + item_cost > budget or (max_items and len(current) >= max_items)
+        )
+        if full:
+            batches.append(current)
+            current, current_cost = [], 0
+        current.append(item)
+        current_cost += item_cost
+
+    if current:
+        batches.append(current)
+    return batches
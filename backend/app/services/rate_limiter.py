@@ -0,0 +1,114 @@
+"""
+Rate Limiter - Cluster-wide token buckets and retry backoff
+
+Buckets live in Redis and are refilled/taken atomically by a Lua script
+using the Redis server clock, so every API process and job worker shares
+one budget per bucket. If Redis is unreachable, an in-process bucket with
+the same parameters takes over (fail open, but still smoothed locally).
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Dict, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "ratelimit:"
+
+# KEYS[1] bucket; ARGV: rate (tokens/s), capacity, cost
+# Returns seconds to wait (0 = tokens taken)
+TOKEN_BUCKET_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    wait = (cost - tokens) / rate
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) * 2 + 1)
+return tostring(wait)
+"""
+
+
+def backoff_delay(attempt: int, base: float, cap: float, rng: Optional[random.Random] = None) -> float:
+    """Full-jitter exponential backoff: uniform(0, min(cap, base * 2**attempt))"""
+    rng = rng or random
+    return rng.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class LocalTokenBucket:
+    """In-process token bucket (fallback when Redis is unreachable)"""
+
+    def __init__(self, rate: float, capacity: float, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.ts = clock()
+        self._lock = threading.Lock()
+
+    def take(self, cost: float = 1.0) -> float:
+        """Take tokens if available; returns seconds to wait otherwise"""
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.ts) * self.rate)
+            self.ts = now
+            if self.tokens >= cost:
+                self.tokens -= cost
+                return 0.0
+            return (cost - self.tokens) / self.rate
+
+
+class TokenBucketLimiter:
+    """Named token buckets shared through Redis"""
+
+    def __init__(self, redis_client, rate: float, capacity: Optional[float] = None):
+        self.redis = redis_client
+        self.rate = rate  # tokens per second
+        self.capacity = capacity or max(1.0, rate)
+        self._script = redis_client.register_script(TOKEN_BUCKET_SCRIPT) if redis_client is not None else None
+        self._local: Dict[str, LocalTokenBucket] = {}
+
+    def take(self, bucket: str, cost: float = 1.0) -> float:
+        """Try to take tokens from a bucket; returns seconds to wait (0 = taken)"""
+        if self._script is not None:
+            try:
+                return float(self._script(keys=[KEY_PREFIX + bucket], args=[self.rate, self.capacity, cost]))
+            except Exception as e:
+                logger.warning(f"Rate limiter Redis error, using local bucket: {str(e)}")
+
+        if bucket not in self._local:
+            self._local[bucket] = LocalTokenBucket(self.rate, self.capacity)
+        return self._local[bucket].take(cost)
+
+    async def acquire(self, bucket: str, cost: float = 1.0):
+        """Wait until the bucket grants the tokens (the Redis round trip runs off the event loop)"""
+        while True:
+            if self._script is not None:
+                wait = await asyncio.to_thread(self.take, bucket, cost)
+            else:
+                wait = self.take(bucket, cost)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+
+async def acquire_all(limiters: Sequence[tuple], cost: float = 1.0):
+    """Acquire from several (limiter, bucket) pairs in order"""
+    for limiter, bucket in limiters:
+        await limiter.acquire(bucket, cost)
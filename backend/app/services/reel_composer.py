@@ -18,6 +18,8 @@ from pathlib import Path
 
 from app.config.frames import FrameConfig, get_frame_config, FrameType
 from app.services.text_layout_calculator import TextLayout, calculate_text_for_frame
+from app.services.encode_optimizer import EncodeOptimizer
+from app.workers.isolation import wrap_command
 
 logger = logging.getLogger(__name__)
 
@@ -31,13 +33,24 @@ class ReelComposer:
         ffprobe_path: str = "ffprobe",
         reel_width: int = 1080,
         reel_height: int = 1920,
-        fps: int = 30
+        fps: int = 30,
+        optimize_encoding: bool = False,
+        ssim_floor: float = 0.96,
+        max_size_bytes: Optional[int] = None
     ):
         self.ffmpeg_path = ffmpeg_path
         self.ffprobe_path = ffprobe_path
         self.reel_width = reel_width
         self.reel_height = reel_height
         self.fps = fps
+        self.optimize_encoding = optimize_encoding
+        self.max_size_bytes = max_size_bytes
+        self.encode_optimizer = EncodeOptimizer(
+            ffmpeg_path=ffmpeg_path,
+            reel_width=reel_width,
+            ssim_floor=ssim_floor,
+            max_size_bytes=max_size_bytes
+        )
     
     def compose_reel(
         self,
@@ -64,6 +77,8 @@ class ReelComposer:
             shadow_intensity: Shadow opacity (0.0-1.0)
             has_overlay: Add subtle color overlay
             overlay_opacity: Overlay opacity (0.0-1.0)
+            start_time: Trim start in the source (seconds)
+            duration: Trim length (seconds), None for the rest of the source
         
         Returns:
             Path to composed reel
@@ -84,6 +99,9 @@ class ReelComposer:
                 overlay_opacity=overlay_opacity
             )
             
+            # Pick rate control (fixed CRF 23 unless per-title optimization is on)
+            rate_control = self._rate_control_args(input_video_path, start_time, duration)
+            
             # Build FFmpeg command
             cmd = [self.ffmpeg_path]
             
@@ -100,7 +118,7 @@ class ReelComposer:
                 "-map", "0:a?",         # Copy audio if exists
                 "-c:v", "libx264",      # H.264 video codec
                 "-preset", "medium",     # Encoding speed/quality
-                "-crf", "23",           # Quality (lower = better, 18-28 range)
+                *rate_control,          # CRF (+ VBV cap when size-limited)
                 "-pix_fmt", "yuv420p",  # Pixel format for compatibility
                 "-r", str(self.fps),    # Frame rate
                 "-c:a", "aac",          # AAC audio codec
@@ -115,7 +133,7 @@ class ReelComposer:
             
             # Execute FFmpeg
             result = subprocess.run(
-                cmd,
+                wrap_command(cmd),  # Encode priority, even when rendered inline by the API
                 capture_output=True,
                 text=True,
                 timeout=600  # 10 minute timeout
@@ -136,6 +154,29 @@ class ReelComposer:
             logger.error(f"Reel composition error: {str(e)}")
             raise
     
+    def _rate_control_args(
+        self,
+        input_video_path: str,
+        start_time: float,
+        duration: Optional[float]
+    ) -> List[str]:
+        """
+        x264 rate-control arguments for this reel.
+        
+        With optimization enabled, sample encodes pick the highest CRF that
+        meets the SSIM floor and the size cap becomes a VBV ceiling.
+        """
+        if not self.optimize_encoding:
+            return ["-crf", "23"]
+        
+        if not duration or duration <= 0:
+            info = self.get_video_info(input_video_path)
+            total = float(info.get("format", {}).get("duration", 0) or 0)
+            duration = max(total - start_time, 0.0)
+        
+        decision = self.encode_optimizer.optimize(input_video_path, start_time, duration)
+        return decision.ffmpeg_args()
+    
     def _build_filter_chain(
         self,
         frame_config: FrameConfig,
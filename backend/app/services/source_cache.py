@@ -0,0 +1,173 @@
+"""
+Source Cache - Single-flight cache of downloaded source videos
+
+Shared by YouTubeService and YouTubeDownloader. Entries are keyed by
+YouTube id and format selector. A per-entry file lock (flock) makes
+concurrent requests - from any thread or worker process on the host -
+wait for one download instead of racing. Hits are served by hardlink into
+the caller's directory, so no bytes are copied.
+
+Layout:
+    <root>/<youtube_id>/<format_key>/source.mp4   cached media
+    <root>/<youtube_id>/<format_key>/verified     marker: media passed verification
+    <root>/<youtube_id>/<format_key>/work/        in-progress download
+    <root>/<youtube_id>/sidecars/                  subtitles, info JSON
+    <root>/<youtube_id>/<format_key>.lock
+"""
+
+import errno
+import fcntl
+import logging
+import os
+import re
+import shutil
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_ROOT = "./storage/source_cache"
+
+# Downloader callback: fetch into the given work dir, return the media path
+DownloadFn = Callable[[Path], Path]
+
+
+class SourceCacheTimeout(Exception):
+    """Another process held the download lock for too long"""
+
+
+class SourceCache:
+    """Cross-process, single-flight cache of source media"""
+
+    def __init__(self, root: str = DEFAULT_CACHE_ROOT, lock_timeout: float = 3600.0):
+        self.root = Path(root)
+        self.lock_timeout = lock_timeout
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def format_key(format_selector: str) -> str:
+        """Filesystem-safe key for a format selector"""
+        return re.sub(r"[^A-Za-z0-9_.@-]+", "_", format_selector)[:120] or "default"
+
+    def entry_dir(self, youtube_id: str, format_selector: str) -> Path:
+        return self.root / youtube_id / self.format_key(format_selector)
+
+    def entry_path(self, youtube_id: str, format_selector: str) -> Path:
+        return self.entry_dir(youtube_id, format_selector) / "source.mp4"
+
+    def sidecar_dir(self, youtube_id: str) -> Path:
+        return self.root / youtube_id / "sidecars"
+
+    def work_dir(self, youtube_id: str, format_selector: str) -> Path:
+        """Download scratch dir; kept across crashes so .part files can resume"""
+        return self.entry_dir(youtube_id, format_selector) / "work"
+
+    def fetch(self, youtube_id: str, format_selector: str, dest: Path, download: DownloadFn) -> Tuple[Path, bool]:
+        """
+        Materialize the source at dest, downloading it at most once.
+
+        Returns: (dest, cache_hit)
+        """
+        dest = Path(dest)
+        entry = self.entry_path(youtube_id, format_selector)
+
+        if entry.exists():
+            self._materialize(youtube_id, entry, dest)
+            return dest, True
+
+        with self._locked(youtube_id, format_selector):
+            # Another request may have finished while we waited
+            if entry.exists():
+                logger.info(f"Source cache: {youtube_id} completed by a concurrent download")
+                self._materialize(youtube_id, entry, dest)
+                return dest, True
+
+            work_dir = self.work_dir(youtube_id, format_selector)
+            work_dir.mkdir(parents=True, exist_ok=True)
+
+            produced = Path(download(work_dir))
+            if not produced.exists():
+                raise FileNotFoundError(f"Download did not produce {produced}")
+
+            os.replace(produced, entry)
+            self._collect_sidecars(youtube_id, work_dir)
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+            logger.info(f"Source cache: stored {youtube_id} ({entry.stat().st_size} bytes)")
+            self._materialize(youtube_id, entry, dest)
+            return dest, False
+
+    def mark_verified(self, youtube_id: str, format_selector: str):
+        """Record that the cached media passed integrity checks"""
+        (self.entry_dir(youtube_id, format_selector) / "verified").touch()
+
+    def is_verified(self, youtube_id: str, format_selector: str) -> bool:
+        return (self.entry_dir(youtube_id, format_selector) / "verified").exists()
+
+    def invalidate(self, youtube_id: str, format_selector: str):
+        """Drop a cached entry (e.g. after it failed verification)"""
+        (self.entry_dir(youtube_id, format_selector) / "verified").unlink(missing_ok=True)
+        entry = self.entry_path(youtube_id, format_selector)
+        if entry.exists():
+            entry.unlink()
+
+    @contextmanager
+    def _locked(self, youtube_id: str, format_selector: str):
+        """Exclusive flock on the entry, polled until lock_timeout"""
+        lock_path = self.root / youtube_id / f"{self.format_key(format_selector)}.lock"
+        lock_path.parent.mkdir(parents=True, exist_ok=True)
+
+        with open(lock_path, "a") as lock_file:
+            deadline = time.monotonic() + self.lock_timeout
+            waited = False
+            while True:
+                try:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except OSError as e:
+                    if e.errno not in (errno.EAGAIN, errno.EACCES):
+                        raise
+                    if time.monotonic() > deadline:
+                        raise SourceCacheTimeout(f"Timed out waiting for download of {youtube_id}")
+                    if not waited:
+                        logger.info(f"Source cache: waiting for in-flight download of {youtube_id}")
+                        waited = True
+                    time.sleep(0.5)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _collect_sidecars(self, youtube_id: str, work_dir: Path):
+        """Keep subtitles / info JSON written next to the download"""
+        sidecars = self.sidecar_dir(youtube_id)
+        sidecars.mkdir(parents=True, exist_ok=True)
+        for path in work_dir.iterdir():
+            if path.is_file() and path.suffix in (".vtt", ".json"):
+                os.replace(path, sidecars / path.name)
+
+    def _materialize(self, youtube_id: str, entry: Path, dest: Path):
+        """Hardlink the entry and its sidecars into dest's directory"""
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        self._link(entry, dest)
+
+        sidecars = self.sidecar_dir(youtube_id)
+        if sidecars.exists():
+            for path in sidecars.iterdir():
+                self._link(path, dest.parent / path.name)
+
+    @staticmethod
+    def _link(src: Path, dest: Path):
+        if dest.exists():
+            if os.path.samefile(src, dest):
+                return
+            dest.unlink()
+        try:
+            os.link(src, dest)
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK):
+                raise
+            # Different filesystem: fall back to a copy
+            shutil.copy2(src, dest)
@@ -0,0 +1,76 @@
+"""
+Stage Pipeline - Producer/consumer stages joined by bounded asyncio queues
+
+Items flow through the stages one at a time instead of each stage running
+over the whole batch before the next starts: while item k is in the second
+stage, item k+1 is already in the first. Each stage runs its own number of
+workers, and the queue in front of it holds at most `buffer` items, so a
+fast stage cannot run ahead of a slow one (finished chunks do not pile up
+on disk or in memory). Wall-clock time approaches that of the slowest stage
+rather than the sum of all of them.
+
+The first error raised by any stage cancels the remaining workers and is
+re-raised to the caller unchanged. Cancelling a worker does not stop a
+thread its handler is waiting on (asyncio.to_thread); such handlers stop
+and wait for their own threads (see VideoOrchestrator.cut_chunks).
+"""
+
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Iterable, List, Sequence
+
+_DONE = object()
+
+
+@dataclass(frozen=True)
+class PipelineStage:
+    name: str
+    handler: Callable[[Any], Awaitable[Any]]  # One item in, one item out
+    workers: int = 1
+
+
+async def run_pipeline(items: Iterable, stages: Sequence[PipelineStage], buffer: int = 2) -> List:
+    """
+    Push items through the stages in order.
+
+    Returns the outputs of the last stage, in completion order (with
+    several workers per stage that is not the input order).
+    """
+    queues = [asyncio.Queue(maxsize=max(1, buffer)) for _ in stages]
+    results: List = []
+
+    async def feed():
+        for item in items:
+            await queues[0].put(item)
+        for _ in range(stages[0].workers):
+            await queues[0].put(_DONE)
+
+    async def work(index: int):
+        stage = stages[index]
+        while True:
+            item = await queues[index].get()
+            if item is _DONE:
+                return
+            output = await stage.handler(item)
+            if index + 1 < len(stages):
+                await queues[index + 1].put(output)
+            else:
+                results.append(output)
+
+    async def run_stage(index: int):
+        await asyncio.gather(*(work(index) for _ in range(stages[index].workers)))
+        if index + 1 < len(stages):
+            for _ in range(stages[index + 1].workers):
+                await queues[index + 1].put(_DONE)
+
+    tasks = [asyncio.create_task(feed())] + [asyncio.create_task(run_stage(i)) for i in range(len(stages))]
+    try:
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in done:
+            if task.exception() is not None:
+                raise task.exception()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    return results
@@ -0,0 +1,80 @@
+"""
+Time Ranges - Source segments selected for partial downloads
+
+Ranges are in source seconds. Downloads are padded by at least one keyframe
+interval on each side: without forced keyframes yt-dlp/FFmpeg cut on the
+nearest keyframe, so padding guarantees the requested span is fully inside
+the downloaded section and the precise trim happens at chunking time.
+"""
+
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+
+@dataclass(frozen=True)
+class TimeRange:
+    """Half-open [start, end) span of the source in seconds"""
+    start: float
+    end: float
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+    def to_list(self) -> List[float]:
+        return [self.start, self.end]
+
+
+def parse_ranges(raw: Optional[Iterable[Sequence[float]]]) -> List[TimeRange]:
+    """Build ranges from stored [start, end] pairs"""
+    return [TimeRange(float(start), float(end)) for start, end in (raw or [])]
+
+
+def normalize_ranges(ranges: Iterable[TimeRange], duration: Optional[float] = None) -> List[TimeRange]:
+    """Clamp to the source, drop empty ranges, sort and merge overlaps"""
+    clamped = []
+    for r in ranges:
+        start = max(0.0, r.start)
+        end = min(r.end, duration) if duration else r.end
+        if end > start:
+            clamped.append(TimeRange(start, end))
+
+    merged: List[TimeRange] = []
+    for r in sorted(clamped, key=lambda r: r.start):
+        if merged and r.start <= merged[-1].end:
+            merged[-1] = TimeRange(merged[-1].start, max(merged[-1].end, r.end))
+        else:
+            merged.append(r)
+    return merged
+
+
+def pad_ranges(
+    ranges: Iterable[TimeRange],
+    padding: float,
+    duration: Optional[float] = None
+) -> List[Tuple[TimeRange, List[TimeRange]]]:
+    """
+    Pad ranges for keyframe-aligned downloading.
+
+    Returns (padded section, requested ranges inside it) pairs. Ranges whose
+    padded spans overlap share one download section, so no part of the
+    source is fetched twice.
+    """
+    sections: List[Tuple[TimeRange, List[TimeRange]]] = []
+    for r in normalize_ranges(ranges, duration):
+        padded_end = r.end + padding
+        if duration:
+            padded_end = min(padded_end, duration)
+        padded = TimeRange(max(0.0, r.start - padding), padded_end)
+
+        if sections and padded.start <= sections[-1][0].end:
+            previous, requested = sections[-1]
+            sections[-1] = (TimeRange(previous.start, max(previous.end, padded.end)), requested + [r])
+        else:
+            sections.append((padded, [r]))
+
+    return sections
+
+
+def total_duration(ranges: Iterable[TimeRange]) -> float:
+    return sum(r.duration for r in ranges)
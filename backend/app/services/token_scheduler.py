@@ -49,6 +49,7 @@ async def schedule_token_refresh():
                 job_id = enqueue_job(
                     job_type="token_refresh",
                     user_id=token.user_id,
+                    instagram_token_id=token.id,
                 )
                 
                 if job_id:
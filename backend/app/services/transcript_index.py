@@ -0,0 +1,106 @@
+"""
+Transcript Index - Timed transcript segments with O(log n) slicing
+
+All segment text lives in one string; segment boundaries are kept as
+compact typed arrays (start/end times and character offsets into the text),
+so a reel's transcript is one bisect plus one string slice.
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, Optional, Tuple
+
+Segment = Tuple[float, float, str]
+
+
+class TranscriptIndex:
+    """Array-backed index of (start, end, text) transcript segments"""
+
+    SEPARATOR = " "
+
+    def __init__(self):
+        self.text = ""
+        self.starts = array("d")
+        self.ends = array("d")      # Running max of cue ends, so bisect stays valid
+        self.offsets = array("L", [0])  # Segment i is text[offsets[i]:offsets[i + 1]]
+
+    @classmethod
+    def from_segments(cls, segments: Iterable[Segment]) -> "TranscriptIndex":
+        """Build an index from segments (sorted by start time if needed)"""
+        index = cls()
+        parts: List[str] = []
+        position = 0
+        last_end = 0.0
+
+        for start, end, text in sorted(segments, key=lambda s: s[0]):
+            text = text.strip()
+            if not text:
+                continue
+            last_end = max(last_end, float(end))
+            index.starts.append(float(start))
+            index.ends.append(last_end)
+            parts.append(text + cls.SEPARATOR)
+            position += len(text) + len(cls.SEPARATOR)
+            index.offsets.append(position)
+
+        index.text = "".join(parts)
+        return index
+
+    @classmethod
+    def from_text(cls, text: Optional[str], duration: float = 0.0) -> "TranscriptIndex":
+        """Wrap an untimed transcript as a single segment"""
+        return cls.from_segments([(0.0, duration, text or "")])
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict]) -> "TranscriptIndex":
+        """Restore an index stored with to_dict()"""
+        index = cls()
+        if not data:
+            return index
+        index.text = data.get("text", "")
+        index.starts = array("d", data.get("starts", []))
+        index.ends = array("d", data.get("ends", []))
+        index.offsets = array("L", data.get("offsets", [0]))
+        return index
+
+    def to_dict(self) -> Dict:
+        """JSON-serialisable form (stored in Video.transcript_segments)"""
+        return {
+            "text": self.text,
+            "starts": self.starts.tolist(),
+            "ends": self.ends.tolist(),
+            "offsets": self.offsets.tolist(),
+        }
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    @property
+    def plain_text(self) -> str:
+        """Full transcript as a single string"""
+        return self.text.strip()
+
+    def segment(self, i: int) -> Segment:
+        """Return segment i as (start, end, text)"""
+        return (
+            self.starts[i],
+            self.ends[i],
+            self.text[self.offsets[i]:self.offsets[i + 1]].strip(),
+        )
+
+    def segments(self) -> List[Segment]:
+        """All segments in time order"""
+        return [self.segment(i) for i in range(len(self))]
+
+    def span(self, start: float, end: float) -> Tuple[int, int]:
+        """Index range [first, last) of segments overlapping [start, end)"""
+        first = bisect_right(self.ends, start)
+        last = bisect_left(self.starts, end)
+        return first, max(first, last)
+
+    def slice(self, start: float, end: float) -> str:
+        """Transcript text spoken between start and end (seconds)"""
+        first, last = self.span(start, end)
+        if first >= last:
+            return ""
+        return self.text[self.offsets[first]:self.offsets[last]].strip()
@@ -0,0 +1,227 @@
+"""
+Transcription - Streaming, windowed speech-to-text
+
+FFmpeg decodes the audio to 16 kHz mono LINEAR16 PCM on a pipe, which is
+read in fixed windows. Windows are transcribed concurrently with bounded
+parallelism, so only `max_parallel` windows are ever held in memory no
+matter how long the video is. Backends are pluggable:
+
+- google: Google Cloud Speech-to-Text (synchronous recognize per window)
+- offline: local energy-based stand-in for tests and offline development
+"""
+
+import asyncio
+import logging
+import math
+import subprocess
+from abc import ABC, abstractmethod
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple, Type
+
+from app.services.transcript_index import Segment, TranscriptIndex
+from app.workers.cancellation import stream_process
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+BYTES_PER_SAMPLE = 2  # s16le
+
+Window = Tuple[float, bytes]  # (offset in seconds, PCM bytes)
+
+
+class TranscriptionBackend(ABC):
+    """Transcribe one window of 16 kHz mono LINEAR16 PCM"""
+
+    name = "base"
+
+    @abstractmethod
+    def transcribe(self, pcm: bytes, sample_rate: int = SAMPLE_RATE) -> List[Segment]:
+        """Return (start, end, text) segments relative to the window start"""
+
+
+class GoogleSpeechBackend(TranscriptionBackend):
+    """Google Cloud Speech-to-Text, one synchronous request per window"""
+
+    name = "google"
+
+    # Synchronous recognize accepts at most ~60 s of audio
+    MAX_WINDOW_SECONDS = 59.0
+
+    def __init__(self, language_code: str = "en-US"):
+        from google.cloud import speech_v1
+
+        self.speech = speech_v1
+        self.client = speech_v1.SpeechClient()
+        self.language_code = language_code
+
+    def transcribe(self, pcm: bytes, sample_rate: int = SAMPLE_RATE) -> List[Segment]:
+        config = self.speech.RecognitionConfig(
+            encoding=self.speech.RecognitionConfig.AudioEncoding.LINEAR16,
+            sample_rate_hertz=sample_rate,
+            language_code=self.language_code,
+            enable_automatic_punctuation=True,
+            enable_word_time_offsets=True,
+        )
+        audio = self.speech.RecognitionAudio(content=pcm)
+        response = self.client.recognize(config=config, audio=audio)
+
+        window_length = len(pcm) / (sample_rate * BYTES_PER_SAMPLE)
+        segments = []
+        for result in response.results:
+            if not result.alternatives:
+                continue
+            alternative = result.alternatives[0]
+            words = list(alternative.words)
+            if words:
+                start = words[0].start_time.total_seconds()
+                end = words[-1].end_time.total_seconds()
+            else:
+                start, end = 0.0, window_length
+            segments.append((start, end, alternative.transcript))
+        return segments
+
+
+class OfflineBackend(TranscriptionBackend):
+    """
+    Local stand-in backend with no network or model dependency.
+
+    Detects voiced regions by frame RMS energy and emits a placeholder label
+    for each, which exercises the full windowing and timing path.
+    """
+
+    name = "offline"
+
+    def __init__(self, frame_ms: int = 30, threshold: float = 500.0, label: str = "[speech]"):
+        self.frame_ms = frame_ms
+        self.threshold = threshold
+        self.label = label
+
+    def transcribe(self, pcm: bytes, sample_rate: int = SAMPLE_RATE) -> List[Segment]:
+        samples = array("h")
+        samples.frombytes(pcm[:len(pcm) - len(pcm) % BYTES_PER_SAMPLE])
+
+        frame_len = max(1, sample_rate * self.frame_ms // 1000)
+        segments = []
+        voiced_start: Optional[float] = None
+
+        for i in range(0, len(samples), frame_len):
+            frame = samples[i:i + frame_len]
+            rms = math.sqrt(sum(s * s for s in frame) / len(frame))
+            t = i / sample_rate
+            if rms >= self.threshold and voiced_start is None:
+                voiced_start = t
+            elif rms < self.threshold and voiced_start is not None:
+                segments.append((voiced_start, t, self.label))
+                voiced_start = None
+
+        if voiced_start is not None:
+            segments.append((voiced_start, len(samples) / sample_rate, self.label))
+        return segments
+
+
+BACKENDS: Dict[str, Type[TranscriptionBackend]] = {
+    GoogleSpeechBackend.name: GoogleSpeechBackend,
+    OfflineBackend.name: OfflineBackend,
+}
+
+
+def register_backend(name: str, backend_cls: Type[TranscriptionBackend]):
+    """Register an additional transcription backend"""
+    BACKENDS[name] = backend_cls
+
+
+def get_backend(name: str, **kwargs) -> TranscriptionBackend:
+    """Instantiate a backend by name"""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown transcription backend: {name}")
+    return BACKENDS[name](**kwargs)
+
+
+def iter_pcm_windows(audio_path: str, ffmpeg_path: str = "ffmpeg", window_seconds: float = 55.0) -> Iterator[Window]:
+    """
+    Stream 16 kHz mono PCM from FFmpeg in fixed windows.
+
+    Only one window is buffered here; FFmpeg blocks on the pipe until the
+    consumer asks for the next one. Closing the generator early kills
+    FFmpeg; a failed decode raises RuntimeError with its stderr.
+    """
+    cmd = [
+        ffmpeg_path,
+        "-v", "error",
+        "-i", audio_path,
+        "-vn",
+        "-ac", "1",
+        "-ar", str(SAMPLE_RATE),
+        "-f", "s16le",
+        "-"
+    ]
+    window_bytes = int(window_seconds * SAMPLE_RATE) * BYTES_PER_SAMPLE
+    offset = 0.0
+    try:
+        for pcm in stream_process(cmd, window_bytes):
+            yield offset, pcm
+            offset += len(pcm) / (SAMPLE_RATE * BYTES_PER_SAMPLE)
+    except subprocess.CalledProcessError as e:
+        # A missing file, no audio stream or a broken codec is an error, not an empty transcript
+        raise RuntimeError(f"Audio decode failed: {e.stderr.decode(errors='replace')[-500:]}")
+
+
+class StreamingTranscriber:
+    """Transcribe audio window by window with bounded parallelism"""
+
+    def __init__(
+        self,
+        backend: TranscriptionBackend,
+        ffmpeg_path: str = "ffmpeg",
+        window_seconds: float = 55.0,
+        max_parallel: int = 4
+    ):
+        self.backend = backend
+        self.ffmpeg_path = ffmpeg_path
+        self.window_seconds = min(window_seconds, getattr(backend, "MAX_WINDOW_SECONDS", window_seconds))
+        self.max_parallel = max(1, max_parallel)
+
+    async def transcribe_file(self, audio_path: str) -> TranscriptIndex:
+        """Transcribe an audio/video file into a timed transcript index"""
+        windows = iter_pcm_windows(audio_path, self.ffmpeg_path, self.window_seconds)
+        try:
+            return await self.transcribe_windows(windows)
+        finally:
+            windows.close()
+
+    async def transcribe_windows(self, windows: Iterator[Window]) -> TranscriptIndex:
+        """
+        Transcribe (offset, pcm) windows concurrently.
+
+        A window is only pulled from the source once a slot is free, so at
+        most `max_parallel` windows are in memory at a time. A failed window
+        is logged and skipped rather than losing the whole transcript.
+        """
+        slots = asyncio.Semaphore(self.max_parallel)
+        segments: List[Segment] = []
+        tasks = set()
+
+        async def run(offset: float, pcm: bytes):
+            try:
+                window_segments = await asyncio.to_thread(self.backend.transcribe, pcm, SAMPLE_RATE)
+                segments.extend((offset + start, offset + end, text) for start, end, text in window_segments)
+            except Exception as e:
+                logger.error(f"Transcription failed for window at {offset:.1f}s: {str(e)}")
+            finally:
+                slots.release()
+
+        while True:
+            await slots.acquire()
+            window = await asyncio.to_thread(next, windows, None)
+            if window is None:
+                slots.release()
+                break
+            task = asyncio.create_task(run(*window))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        if tasks:
+            await asyncio.gather(*tasks)
+
+        logger.info(f"Transcription complete ({self.backend.name}): {len(segments)} segments")
+        return TranscriptIndex.from_segments(segments)
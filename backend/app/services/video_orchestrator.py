@@ -1,32 +1,107 @@
 import logging
 import asyncio
 from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
 from sqlalchemy.orm import Session
 from app.models.video import Video, VideoChunk, VideoStatus
 from app.services.youtube_service import YouTubeService
 from app.services.video_processor import VideoProcessor
+from app.services.highlight_ranker import HighlightRanker
+from app.services.progress_events import get_event_client, publish_video_status
+from app.services.stage_pipeline import PipelineStage, run_pipeline
+from app.services.time_ranges import parse_ranges
+from app.services.transcript_index import TranscriptIndex
+from app.core.config import get_settings
 from app.core.database import SessionLocal
+from app.workers.cancellation import CancelToken, JobCancelled, cancel_scope, current_token
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+def apply_download_result(video: Video, result: Dict):
+    """Copy a download result onto the Video row (caller commits)"""
+    video.status = VideoStatus.DOWNLOADED
+    video.title = result.get('title')
+    video.description = result.get('description')
+    video.duration = result.get('duration')
+    video.thumbnail_url = result.get('thumbnail_url')
+    video.video_file_path = result.get('video_path')
+    video.audio_file_path = result.get('audio_path')
+    video.video_metadata = {
+        **(video.video_metadata or {}),
+        'format_plan': result.get('format_plan'),
+        'sections': result.get('sections'),
+        'download_metrics': result.get('download_metrics'),
+    }
+    # Timed transcript: flat text for display, segments for per-reel slicing
+    transcript_index = result.get('transcript')
+    if transcript_index:
+        video.transcript = transcript_index.plain_text
+        video.transcript_segments = transcript_index.to_dict()
+        video.transcript_source = result.get('transcript_source')
+
+
+def save_chunks(session: Session, video: Video, chunks: List[Tuple[str, int, float, float]]) -> List[VideoChunk]:
+    """Insert VideoChunk rows for cut chunks; flushed so ids are assigned"""
+    records = []
+    for chunk_path, index, start, end in chunks:
+        chunk_record = VideoChunk(
+            video_id=video.id,
+            chunk_number=index + 1,
+            start_time=start,
+            end_time=end,
+            duration=end - start,
+            file_path=chunk_path,
+            file_size=0, # Optional: os.path.getsize(chunk_path)
+            created_at=datetime.utcnow(),
+            updated_at=datetime.utcnow()
+        )
+        session.add(chunk_record)
+        records.append(chunk_record)
+    session.flush()
+    return records
+
+
+# (source_path, chunk_index, start, end, time_offset): one window to cut, in file time
+ChunkCut = Tuple[str, int, float, float, float]
+
 
 class VideoOrchestrator:
     """
     Orchestrates the entire video processing pipeline:
     1. Download YouTube Video
-    2. Split into Chunks
-    3. Save Chunks to DB
+    2. Plan chunk windows (or only the top-ranked highlight windows)
+    3. Cut them, several at a time
+    4. Save each chunk to the DB as soon as it is cut
+    
+    Steps 3-4 run as a pipeline with bounded queues between them (see
+    app.services.stage_pipeline): cuts overlap each other and the saving
+    of earlier chunks, and the event loop is never blocked by ffmpeg.
     """
     
     def __init__(self, db: Session = None):
         self.youtube_service = YouTubeService()
-        self.video_processor = VideoProcessor()
+        self.video_processor = VideoProcessor(
+            chunk_duration=settings.chunk_duration,
+            min_chunk_duration=settings.min_chunk_duration
+        )
+        self.highlight_ranker = HighlightRanker(
+            window=settings.chunk_duration,
+            hop=settings.highlight_hop,
+            ffmpeg_path=settings.ffmpeg_path
+        )
         self.db = db if db else SessionLocal()
 
     async def process_video(self, video_id: int):
         """
         Main entry point for processing a video.
-        Should be called as a background task.
+        Should be called as a background task; deleting the video cancels it.
         """
+        with cancel_scope(CancelToken.for_job(get_event_client(), video_id=video_id)):
+            await self._process_video(video_id)
+
+    async def _process_video(self, video_id: int):
         # Create a new DB session for the background task if strictly needed,
         # but sharing the one passed in __init__ is risky if it closes.
         # Ideally, use a context manager or dependency injection pattern for background tasks.
@@ -47,61 +122,48 @@ class VideoOrchestrator:
             # 1. Update Status: DOWNLOADING
             video.status = VideoStatus.DOWNLOADING
             session.commit()
+            publish_video_status(video)
 
-            # 2. Download
-            success, result = await self.youtube_service.download_video(video.youtube_url, video.youtube_video_id)
+            # 2. Download (only the requested spans, if any)
+            time_ranges = parse_ranges((video.video_metadata or {}).get('time_ranges'))
+            success, result = await self.youtube_service.download_video(
+                video.youtube_url, video.youtube_video_id, time_ranges=time_ranges or None,
+                source_duration=video.duration
+            )
             
             if not success or not result:
                 raise Exception("Download failed")
             
             # Update Video Metadata
-            video.status = VideoStatus.DOWNLOADED
-            video.title = result.get('title')
-            video.description = result.get('description')
-            video.duration = result.get('duration')
-            video.thumbnail_url = result.get('thumbnail_url')
-            video.video_file_path = result.get('video_path')
-            video.audio_file_path = result.get('audio_path')
-            # Handle transcript - it might be a tuple or None
-            transcript_result = result.get('transcript')
-            if isinstance(transcript_result, tuple):
-                video.transcript = transcript_result[0] if transcript_result else None
-            else:
-                video.transcript = transcript_result
+            apply_download_result(video, result)
+            transcript_index = result.get('transcript')
             
             session.commit()
+            publish_video_status(video)
             
             # 3. Update Status: PROCESSING (Splitting)
             video.status = VideoStatus.PROCESSING
             session.commit()
+            publish_video_status(video)
             
-            # 4. Split Video
-            # Define chunk directory
-            chunk_base_dir = result.get('video_path').rsplit('/', 1)[0] + "/chunks"
-            chunks = self.video_processor.cut_video_into_chunks(video.video_file_path, chunk_base_dir)
-            
-            # 5. Save Chunks to DB
-            for chunk_path, index, start, end in chunks:
-                chunk_record = VideoChunk(
-                    video_id=video.id,
-                    chunk_number=index + 1,
-                    start_time=start,
-                    end_time=end,
-                    duration=end - start,
-                    file_path=chunk_path,
-                    file_size=0, # Optional: os.path.getsize(chunk_path)
-                    created_at=datetime.utcnow(),
-                    updated_at=datetime.utcnow()
-                )
-                session.add(chunk_record)
+            # 4-5. Split Video, saving each chunk as it lands (visible before the last is cut)
+            async def save_chunk(chunk):
+                save_chunks(session, video, [chunk])
+                session.commit()
+                return chunk
+
+            chunks = await self.cut_chunks(session, video, result, transcript_index, on_chunk=save_chunk)
             
             # 6. Complete
             video.status = VideoStatus.COMPLETED
             video.error_message = None
             session.commit()
+            publish_video_status(video)
             
             logger.info(f"Video {video.youtube_video_id} processing complete. {len(chunks)} chunks created.")
 
+        except JobCancelled:
+            logger.info(f"Processing of video {video_id} cancelled")
         except Exception as e:
             logger.error(f"Error processing video {video_id}: {str(e)}")
             # Fail safely
@@ -111,7 +173,116 @@ class VideoOrchestrator:
                     video.status = VideoStatus.FAILED
                     video.error_message = str(e)
                     session.commit()
+                    publish_video_status(video)
             except:
                 pass
         finally:
             session.close()
+
+    async def cut_chunks(
+        self,
+        session: Session,
+        video: Video,
+        result: Dict,
+        transcript_index: Optional[TranscriptIndex],
+        on_chunk: Optional[Callable[[Tuple[str, int, int, int]], Awaitable]] = None
+    ) -> List[Tuple[str, int, float, float]]:
+        """
+        Cut the downloaded source into reel chunks.
+        
+        PIPELINE_CUT_WORKERS chunks are cut at once; `on_chunk` (a further
+        pipeline stage) receives each chunk as soon as it is cut.
+        Returns: List of (chunk_path, chunk_index, start_time, end_time), by index
+        """
+        chunk_base_dir = result.get('video_path').rsplit('/', 1)[0] + "/chunks"
+        cuts = await self.plan_cuts(session, video, result, transcript_index)
+
+        # Cuts run in threads, which cancelling their task does not stop: on
+        # an error (or cancellation) the cut token kills their ffmpeg, and
+        # the threads are waited for so no chunk is written after we return
+        parent = current_token()
+        cut_token = parent.child() if parent else CancelToken(None, ())
+        threads: Set[asyncio.Future] = set()
+
+        async def cut(item: ChunkCut):
+            source_path, chunk_index, start, end, time_offset = item
+            # to_thread copies the context: the cut token reaches ffmpeg
+            thread = asyncio.ensure_future(asyncio.to_thread(
+                self.video_processor.cut_chunk, source_path, chunk_base_dir, chunk_index, start, end, time_offset
+            ))
+            threads.add(thread)
+            thread.add_done_callback(threads.discard)
+            return await asyncio.shield(thread)
+
+        stages = [PipelineStage("cut", cut, workers=max(1, settings.pipeline_cut_workers))]
+        if on_chunk:
+            stages.append(PipelineStage("save", on_chunk))
+        try:
+            with cancel_scope(cut_token):
+                chunks = await run_pipeline(cuts, stages, buffer=settings.pipeline_buffer)
+        except BaseException:
+            cut_token.cancel()
+            await asyncio.gather(*threads, return_exceptions=True)
+            raise
+        logger.info(f"Total chunks created: {len(chunks)}")
+        return sorted(chunks, key=lambda chunk: chunk[1])
+
+    async def plan_cuts(
+        self,
+        session: Session,
+        video: Video,
+        result: Dict,
+        transcript_index: Optional[TranscriptIndex]
+    ) -> List[ChunkCut]:
+        """
+        Chunk windows to cut.
+        
+        Partial downloads are chunked per requested span; otherwise either the
+        top-ranked highlight windows or every fixed window is cut (also the
+        fallback when ranking fails or finds no window).
+        """
+        processor = self.video_processor
+        cuts: List[ChunkCut] = []
+        if result.get('sections'):
+            # Partial download: chunk only the requested spans of each section
+            for section in result['sections']:
+                for start, end in section['ranges']:
+                    windows = processor.plan_range(
+                        start - section['file_start'], end - section['file_start'], index_offset=len(cuts)
+                    )
+                    cuts.extend((section['path'], *window, section['file_start']) for window in windows)
+            return cuts
+
+        if settings.highlight_top_n > 0:
+            # Encode only the best-scoring windows instead of every fixed window
+            try:
+                highlights = await asyncio.to_thread(
+                    self.highlight_ranker.rank,
+                    video.video_file_path,
+                    transcript_index,
+                    settings.highlight_top_n
+                )
+            except JobCancelled:
+                raise
+            except Exception as e:
+                # e.g. a source without an audio stream
+                logger.warning(f"Highlight ranking failed for video {video.id}, cutting fixed windows: {str(e)}")
+                highlights = None
+            
+            if highlights:
+                video.video_metadata = {
+                    **(video.video_metadata or {}),
+                    'highlights': [h.to_dict() for h in highlights],
+                }
+                session.commit()
+                
+                for highlight in highlights:
+                    windows = processor.plan_range(highlight.start, highlight.end, index_offset=len(cuts))
+                    cuts.extend((video.video_file_path, *window, 0.0) for window in windows)
+                return cuts
+            if highlights is not None:
+                logger.info(f"No highlight windows for video {video.id} (shorter than a reel?), cutting fixed windows")
+
+        total_duration = await asyncio.to_thread(processor.get_video_duration, video.video_file_path)
+        logger.info(f"Video duration: {total_duration}s")
+        return [(video.video_file_path, *window, 0.0) for window in processor.plan_range(0, total_duration)]
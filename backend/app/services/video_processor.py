@@ -3,6 +3,7 @@ import subprocess
 import logging
 from typing import List, Tuple
 from pathlib import Path
+from app.workers.cancellation import run_process
 
 logger = logging.getLogger(__name__)
 
@@ -10,10 +11,11 @@ logger = logging.getLogger(__name__)
 class VideoProcessor:
     """Cut videos into sequential 35-second chunks"""
     
-    def __init__(self, ffmpeg_path: str = "ffmpeg", ffprobe_path: str = "ffprobe", chunk_duration: int = 30):
+    def __init__(self, ffmpeg_path: str = "ffmpeg", ffprobe_path: str = "ffprobe", chunk_duration: int = 30, min_chunk_duration: int = 10):
         self.ffmpeg_path = ffmpeg_path
         self.ffprobe_path = ffprobe_path
         self.chunk_duration = chunk_duration
+        self.min_chunk_duration = min_chunk_duration
     
     def get_video_duration(self, video_path: str) -> float:
         """Get total video duration in seconds"""
@@ -43,58 +45,104 @@ class VideoProcessor:
         Returns: List of (chunk_path, chunk_index, start_time, end_time)
         """
         try:
-            os.makedirs(chunk_dir, exist_ok=True)
-            
             # Get total duration
             total_duration = self.get_video_duration(video_path)
             logger.info(f"Video duration: {total_duration}s")
             
-            chunks = []
-            chunk_index = 0
-            start_time = 0
-            
-            # Cut into sequential chunks
-            while start_time < total_duration:
-                end_time = min(start_time + self.chunk_duration, total_duration)
-                duration = end_time - start_time
-                
-                # Only create chunk if it's at least 10 seconds
-                if duration < 10:
-                    logger.info(f"Skipping final chunk < 10s: {duration}s")
-                    break
-                
-                chunk_path = os.path.join(chunk_dir, f"chunk_{chunk_index:03d}.mp4")
-                
-                # FFmpeg command to cut chunk AND convert to 9:16
-                # Filter: Scale to fit 1080x1920 box, decrease if needed, then pad with black bars to fill 1080x1920
-                filter_complex = "scale=1080:1920:force_original_aspect_ratio=decrease,pad=1080:1920:(ow-iw)/2:(oh-ih)/2"
-                
-                cmd = [
-                    self.ffmpeg_path,
-                    "-i", video_path,
-                    "-ss", str(start_time),
-                    "-t", str(duration),
-                    "-c:v", "libx264",
-                    "-c:a", "aac",
-                    "-vf", filter_complex,
-                    "-crf", "23",            # Good quality
-                    "-preset", "fast",       # Reasonable speed
-                    "-y",                    # Overwrite
-                    chunk_path
-                ]
-                
-                result = subprocess.run(cmd, capture_output=True, text=True, timeout=600)
-                
-                if result.returncode != 0:
-                    logger.error(f"Chunk cutting error: {result.stderr}")
-                    raise Exception(f"Failed to cut chunk {chunk_index}: {result.stderr}")
-                
-                chunks.append((chunk_path, chunk_index, int(start_time), int(end_time)))
-                logger.info(f"Created chunk {chunk_index}: {start_time}s - {end_time}s")
-                
-                chunk_index += 1
-                start_time = end_time
-            
+            return self.cut_range_into_chunks(video_path, chunk_dir, 0, total_duration)
+        
+        except Exception as e:
+            logger.error(f"Video cutting error: {str(e)}")
+            raise
+    
+    def plan_range(self, range_start: float, range_end: float, index_offset: int = 0) -> List[Tuple[int, float, float]]:
+        """
+        Split [range_start, range_end) into sequential chunk windows.
+        Returns: List of (chunk_index, start_time, end_time) in file time
+        """
+        windows = []
+        chunk_index = index_offset
+        start_time = range_start
+        while start_time < range_end:
+            end_time = min(start_time + self.chunk_duration, range_end)
+            duration = end_time - start_time
+
+            # Only create chunk if it's long enough to be a reel
+            if duration < self.min_chunk_duration:
+                logger.info(f"Skipping final chunk < {self.min_chunk_duration}s: {duration}s")
+                break
+
+            windows.append((chunk_index, start_time, end_time))
+            chunk_index += 1
+            start_time = end_time
+        return windows
+
+    def cut_chunk(
+        self,
+        video_path: str,
+        chunk_dir: str,
+        chunk_index: int,
+        start_time: float,
+        end_time: float,
+        time_offset: float = 0.0
+    ) -> Tuple[str, int, int, int]:
+        """
+        Cut one chunk window of a file (see plan_range).
+        Returns: (chunk_path, chunk_index, start_time, end_time) in source time
+        """
+        os.makedirs(chunk_dir, exist_ok=True)
+        chunk_path = os.path.join(chunk_dir, f"chunk_{chunk_index:03d}.mp4")
+
+        # FFmpeg command to cut chunk AND convert to 9:16
+        # Filter: Scale to fit 1080x1920 box, decrease if needed, then pad with black bars to fill 1080x1920
+        filter_complex = "scale=1080:1920:force_original_aspect_ratio=decrease,pad=1080:1920:(ow-iw)/2:(oh-ih)/2"
+
+        cmd = [
+            self.ffmpeg_path,
+            "-i", video_path,
+            "-ss", str(start_time),
+            "-t", str(end_time - start_time),
+            "-c:v", "libx264",
+            "-c:a", "aac",
+            "-vf", filter_complex,
+            "-crf", "23",            # Good quality
+            "-preset", "fast",       # Reasonable speed
+            "-y",                    # Overwrite
+            chunk_path
+        ]
+
+        result = run_process(cmd, timeout=600, cleanup=[chunk_path], isolate=True)
+
+        if result.returncode != 0:
+            logger.error(f"Chunk cutting error: {result.stderr}")
+            raise Exception(f"Failed to cut chunk {chunk_index}: {result.stderr}")
+
+        source_start = start_time + time_offset
+        source_end = end_time + time_offset
+        logger.info(f"Created chunk {chunk_index}: {source_start}s - {source_end}s")
+        return chunk_path, chunk_index, int(source_start), int(source_end)
+
+    def cut_range_into_chunks(
+        self,
+        video_path: str,
+        chunk_dir: str,
+        range_start: float,
+        range_end: float,
+        time_offset: float = 0.0,
+        index_offset: int = 0
+    ) -> List[Tuple[str, int, int, int]]:
+        """
+        Cut [range_start, range_end) of a file into sequential chunks.
+        
+        time_offset is the source time at which the file begins (non-zero for
+        partially downloaded sections), so returned times are source times.
+        Returns: List of (chunk_path, chunk_index, start_time, end_time)
+        """
+        try:
+            chunks = [
+                self.cut_chunk(video_path, chunk_dir, chunk_index, start_time, end_time, time_offset)
+                for chunk_index, start_time, end_time in self.plan_range(range_start, range_end, index_offset)
+            ]
             logger.info(f"Total chunks created: {len(chunks)}")
             return chunks
         
@@ -1,5 +1,6 @@
 """Video cutting and vertical reel conversion service"""
 
+import shutil
 import subprocess
 import os
 from pathlib import Path
@@ -7,6 +8,7 @@ from typing import List, Dict, Optional, Tuple
 import logging
 from app.core.config import get_settings
 from app.utils.helpers import get_logger
+from app.workers.cancellation import JobCancelled, run_process
 
 logger = get_logger(__name__)
 settings = get_settings()
@@ -75,6 +77,8 @@ class VideoProcessingService:
             logger.info(f"Video cutting complete. Created {len(chunks_list)} chunks")
             return True, chunks_list
         
+        except JobCancelled:
+            raise
         except Exception as e:
             logger.error(f"Error cutting video into chunks: {str(e)}", exc_info=True)
             return False, []
@@ -95,7 +99,7 @@ class VideoProcessingService:
                 '-y'  # Overwrite output
             ]
             
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=600)
+            result = run_process(cmd, timeout=600, cleanup=[output_path], isolate=True)
             
             if result.returncode == 0:
                 return True
@@ -103,6 +107,8 @@ class VideoProcessingService:
                 logger.error(f"FFmpeg cut error: {result.stderr}")
                 return False
         
+        except JobCancelled:
+            raise
         except Exception as e:
             logger.error(f"Error in _cut_video: {str(e)}")
             return False
@@ -142,6 +148,8 @@ class VideoProcessingService:
                         'chunk_number': chunk_number,
                         'file_path': str(reel_path),
                         'file_size': file_size,
+                        'start_time': chunk['start_time'],
+                        'end_time': chunk['end_time'],
                         'duration': chunk['duration'],
                         'width': self.reel_width,
                         'height': self.reel_height,
@@ -154,6 +162,8 @@ class VideoProcessingService:
             logger.info(f"Vertical reel conversion complete. Created {len(reels_list)} reels")
             return True, reels_list
         
+        except JobCancelled:
+            raise
         except Exception as e:
             logger.error(f"Error converting to vertical reels: {str(e)}", exc_info=True)
             return False, []
@@ -177,7 +187,18 @@ class VideoProcessingService:
             
             width, height = dimensions
             logger.info(f"Input video dimensions: {width}x{height}")
-            
+
+            if (width, height) == (self.reel_width, self.reel_height):
+                # Already a reel (e.g. chunks cut by VideoProcessor): skip the re-encode
+                if os.path.exists(output_path):
+                    os.remove(output_path)
+                try:
+                    os.link(input_path, output_path)
+                except OSError:
+                    shutil.copyfile(input_path, output_path)
+                logger.info(f"Input already {width}x{height}, reused as {output_path}")
+                return True
+
             # Calculate scaling to fit 1080x1920
             # If video is wider, scale to 1080 width
             if width / height > self.reel_width / self.reel_height:
@@ -212,7 +233,7 @@ class VideoProcessingService:
             ]
             
             logger.info(f"FFmpeg command: {' '.join(cmd)}")
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=600)
+            result = run_process(cmd, timeout=600, cleanup=[output_path], isolate=True)
             
             if result.returncode == 0:
                 logger.info(f"Vertical reel created: {output_path}")
@@ -221,6 +242,8 @@ class VideoProcessingService:
                 logger.error(f"FFmpeg vertical conversion error: {result.stderr}")
                 return False
         
+        except JobCancelled:
+            raise
         except Exception as e:
             logger.error(f"Error in _convert_to_vertical: {str(e)}")
             return False
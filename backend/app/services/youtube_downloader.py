@@ -1,4 +1,5 @@
 import os
+import re
 import subprocess
 import json
 import logging
@@ -6,15 +7,30 @@ from typing import Dict, List, Tuple
 from datetime import datetime
 from pathlib import Path
 
+from app.core.config import get_settings
+from app.services.format_planner import FormatPlanner
+from app.services.source_cache import SourceCache
+from app.services.transcript_index import TranscriptIndex
+
 logger = logging.getLogger(__name__)
+settings = get_settings()
 
 
 class YouTubeDownloader:
     """Download videos from YouTube with transcripts"""
     
-    def __init__(self, yt_dlp_path: str = "yt-dlp", videos_dir: str = "./videos"):
+    def __init__(
+        self,
+        yt_dlp_path: str = "yt-dlp",
+        videos_dir: str = "./videos",
+        format_planner: FormatPlanner = None,
+        source_cache: SourceCache = None
+    ):
         self.yt_dlp_path = yt_dlp_path
         self.videos_dir = videos_dir
+        self.format_planner = format_planner or FormatPlanner()
+        # Same cache root (and locks) as the download pool, so each source is fetched once per host
+        self.source_cache = source_cache or SourceCache(settings.source_cache_path)
         os.makedirs(videos_dir, exist_ok=True)
     
     def extract_video_id(self, url: str) -> str:
@@ -35,47 +51,69 @@ class YouTubeDownloader:
         os.makedirs(video_dir, exist_ok=True)
         
         try:
-            # Download video with metadata
-            cmd = [
-                self.yt_dlp_path,
-                "-f", "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best",
-                "-o", os.path.join(video_dir, "video.mp4"),
-                "--write-info-json",
-                "--write-auto-sub",
-                "--sub-lang", "en",
-                "--skip-download" if os.path.exists(os.path.join(video_dir, "video.mp4")) else "",
-                url
-            ]
-            cmd = [c for c in cmd if c]  # Remove empty strings
+            # Plan formats from a previous info JSON if we have one
+            cached_info = self._read_info_json(video_dir)
+            format_plan = self.format_planner.plan(cached_info or None)
+            logger.info(
+                f"Format plan: {format_plan.format_selector} "
+                f"(~{format_plan.expected_bytes} bytes, decode cost={format_plan.decode_cost})"
+            )
             
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=600)
+            def download(work_dir) -> str:
+                """Source-cache callback: download video + metadata into work_dir"""
+                cmd = [
+                    self.yt_dlp_path,
+                    "-f", format_plan.format_selector,
+                    "--merge-output-format", "mp4",
+                    "-o", os.path.join(work_dir, "video.mp4"),
+                    "--write-info-json",
+                    "--write-auto-sub",
+                    "--sub-lang", "en",
+                    url
+                ]
+                
+                result = subprocess.run(cmd, capture_output=True, text=True, timeout=600)
+                
+                if result.returncode != 0:
+                    logger.error(f"yt-dlp error: {result.stderr}")
+                    raise Exception(f"Download failed: {result.stderr}")
+                return os.path.join(work_dir, "video.mp4")
             
-            if result.returncode != 0:
-                logger.error(f"yt-dlp error: {result.stderr}")
-                raise Exception(f"Download failed: {result.stderr}")
+            # Single-flight: concurrent requests for this id/format share one download
+            video_path, cache_hit = self.source_cache.fetch(
+                video_id,
+                format_plan.format_selector,
+                Path(video_dir) / "video.mp4",
+                download
+            )
+            if cache_hit:
+                logger.info(f"Source cache hit for {video_id}")
             
             # Read metadata
-            info_file = os.path.join(video_dir, "video.info.json")
-            metadata = {}
-            if os.path.exists(info_file):
-                with open(info_file, 'r') as f:
-                    metadata = json.load(f)
-            
-            video_path = os.path.join(video_dir, "video.mp4")
+            metadata = self._read_info_json(video_dir)
             
-            return video_path, {
+            return str(video_path), {
                 "title": metadata.get("title", ""),
                 "description": metadata.get("description", ""),
                 "thumbnail_url": metadata.get("thumbnail", ""),
                 "duration": metadata.get("duration", 0),
                 "video_id": video_id,
-                "video_dir": video_dir
+                "video_dir": video_dir,
+                "format_plan": format_plan.to_dict()
             }
         
         except Exception as e:
             logger.error(f"Download error: {str(e)}")
             raise
     
+    def _read_info_json(self, video_dir: str) -> Dict:
+        """Load the yt-dlp info JSON next to the video, if any"""
+        for name in sorted(os.listdir(video_dir)):
+            if name.endswith(".info.json"):
+                with open(os.path.join(video_dir, name), 'r') as f:
+                    return json.load(f)
+        return {}
+    
     def download_audio(self, url: str, video_dir: str) -> str:
         """Download audio for speech-to-text"""
         try:
@@ -108,6 +146,10 @@ class TranscriptExtractor:
     
     def get_auto_transcript(self, video_dir: str) -> str:
         """Get auto-generated transcript from yt-dlp"""
+        return self.get_transcript_index(video_dir).plain_text
+    
+    def get_transcript_index(self, video_dir: str) -> TranscriptIndex:
+        """Get the auto-generated transcript as timed segments"""
         try:
             # Look for .vtt subtitle file
             vtt_files = []
@@ -117,34 +159,77 @@ class TranscriptExtractor:
                         vtt_files.append(os.path.join(root, f))
             
             if vtt_files:
-                transcript = self._parse_vtt(vtt_files[0])
-                if transcript.strip():
-                    return transcript
+                return TranscriptIndex.from_segments(self._parse_vtt(vtt_files[0]))
             
-            return ""
+            return TranscriptIndex()
         
         except Exception as e:
             logger.error(f"Transcript extraction error: {str(e)}")
-            return ""
+            return TranscriptIndex()
     
-    def _parse_vtt(self, vtt_file: str) -> str:
-        """Parse WebVTT subtitle file"""
+    TIMING_RE = re.compile(r"((?:\d+:)?\d{1,2}:\d{2}\.\d{3})\s+-->\s+((?:\d+:)?\d{1,2}:\d{2}\.\d{3})")
+    TAG_RE = re.compile(r"<[^>]+>")
+    
+    def _parse_vtt(self, vtt_file: str) -> List[Tuple[float, float, str]]:
+        """
+        Parse WebVTT subtitle file into (start, end, text) segments.
+        
+        YouTube auto-captions roll: each cue repeats the previous line above
+        the new one, and short transition cues repeat it again. Lines equal to
+        the last emitted line are dropped so every phrase appears once.
+        """
         try:
             with open(vtt_file, 'r', encoding='utf-8') as f:
                 lines = f.readlines()
             
-            transcript = []
-            for line in lines:
-                line = line.strip()
-                # Skip VTT header, timing lines, and empty lines
-                if line and not line.startswith("WEBVTT") and "-->" not in line:
-                    transcript.append(line)
+            segments = []
+            last_line = None
+            cue_start = cue_end = None
+            cue_lines: List[str] = []
             
-            return " ".join(transcript)
+            def flush():
+                nonlocal last_line
+                new_lines = []
+                for text in cue_lines:
+                    if text == last_line:
+                        continue
+                    new_lines.append(text)
+                    last_line = text
+                if new_lines and cue_start is not None:
+                    segments.append((cue_start, cue_end, " ".join(new_lines)))
+            
+            for raw in lines:
+                raw = raw.rstrip("\r\n")
+                timing = self.TIMING_RE.search(raw)
+                if timing:
+                    flush()
+                    cue_start = self._parse_timestamp(timing.group(1))
+                    cue_end = self._parse_timestamp(timing.group(2))
+                    cue_lines = []
+                elif not raw:
+                    # Blank line ends the cue (whitespace-only lines are cue padding)
+                    flush()
+                    cue_start = None
+                    cue_lines = []
+                elif cue_start is not None:
+                    text = self.TAG_RE.sub("", raw).strip()
+                    if text:
+                        cue_lines.append(text)
+            flush()
+            
+            return segments
         
         except Exception as e:
             logger.error(f"VTT parsing error: {str(e)}")
-            return ""
+            return []
+    
+    @staticmethod
+    def _parse_timestamp(value: str) -> float:
+        """Convert HH:MM:SS.mmm or MM:SS.mmm to seconds"""
+        seconds = 0.0
+        for part in value.split(":"):
+            seconds = seconds * 60 + float(part)
+        return seconds
     
     def get_stt_fallback(self, audio_path: str) -> str:
         """Use Google Speech-to-Text as fallback (not implemented - returns placeholder)"""
@@ -4,18 +4,84 @@ import asyncio
 import os
 import subprocess
 import json
-from typing import Optional, Dict, Any, Tuple
+import threading
+import time
+from typing import Optional, Dict, Any, List, Tuple
 from pathlib import Path
 import logging
 from datetime import datetime
 import yt_dlp
-from google.cloud import speech_v1
+from yt_dlp.networking.exceptions import HTTPError, network_exceptions
 from app.core.config import get_settings
-from app.utils.helpers import get_logger
+from app.config.frames import list_all_frames
+from app.services.format_planner import FormatPlanner
+from app.services.time_ranges import TimeRange, normalize_ranges, pad_ranges, total_duration
+from app.services.transcript_index import TranscriptIndex
+from app.services.transcription import StreamingTranscriber, get_backend
+from app.services.youtube_downloader import TranscriptExtractor
+from app.utils.helpers import get_logger, save_json, load_json
+from app.workers.cancellation import JobCancelled, current_token, run_process
+from app.workers.download_pool import DownloadTask, get_download_pool
 
 logger = get_logger(__name__)
 settings = get_settings()
 
+# Long-lived extractor for metadata probes. YoutubeDL keeps its extractor
+# instances and HTTP session between calls but is not thread-safe.
+_probe_ydl: Optional[yt_dlp.YoutubeDL] = None
+_probe_lock = threading.Lock()
+
+# Sources that can't be fetched without credentials
+UNAVAILABLE_STATES = {"private", "premium_only", "subscriber_only", "needs_auth"}
+
+# Probe errors that say nothing about the source itself (rate limits, bot checks)
+TRANSIENT_PROBE_MARKERS = ("http error 429", "not a bot", "timed out", "temporary failure")
+PROBE_ATTEMPTS = 2
+PROBE_RETRY_DELAY = 2.0
+
+
+class SourceProbeError(Exception):
+    """Metadata probe failed for a transient reason; the source may be fine"""
+
+
+def is_unavailable_error(error: Exception) -> bool:
+    """
+    Whether a yt-dlp error means the source itself cannot be fetched
+    (private, removed, geo-blocked, unsupported URL), as opposed to a
+    network or extractor hiccup worth retrying.
+    """
+    cause = error
+    if isinstance(error, yt_dlp.utils.DownloadError) and error.exc_info and error.exc_info[1]:
+        cause = error.exc_info[1]
+    if isinstance(cause, (yt_dlp.utils.GeoRestrictedError, yt_dlp.utils.UnsupportedError)):
+        return True
+    if not isinstance(cause, yt_dlp.utils.ExtractorError):
+        return False
+
+    # yt-dlp marks network failures "expected" too: look at what caused them
+    network_error = cause.cause or (cause.exc_info[1] if cause.exc_info else None)
+    if isinstance(network_error, network_exceptions):
+        return isinstance(network_error, HTTPError) and network_error.status in (404, 410)
+    if any(marker in str(cause).lower() for marker in TRANSIENT_PROBE_MARKERS):
+        return False
+    return cause.expected
+
+
+def _extract_info_sync(youtube_url: str) -> Dict[str, Any]:
+    """Run a metadata-only extraction on the shared YoutubeDL instance"""
+    global _probe_ydl
+    with _probe_lock:
+        if _probe_ydl is None:
+            _probe_ydl = yt_dlp.YoutubeDL({
+                'quiet': True,
+                'no_warnings': True,
+                'skip_download': True,
+                'noplaylist': True,
+                'socket_timeout': 15,
+            })
+        info = _probe_ydl.extract_info(youtube_url, download=False)
+        return _probe_ydl.sanitize_info(info)
+
 
 class YouTubeService:
     """Service for downloading and processing YouTube videos"""
@@ -25,6 +91,10 @@ class YouTubeService:
         self.temp_path = settings.temp_path
         self.ffmpeg_path = settings.ffmpeg_path
         self.ffprobe_path = settings.ffprobe_path
+        self.format_planner = FormatPlanner(
+            target_height=max(frame.video_height for frame in list_all_frames()),
+            fallback_max_height=settings.download_max_height
+        )
         
         # Create directories if they don't exist
         Path(self.storage_base).mkdir(parents=True, exist_ok=True)
@@ -43,12 +113,126 @@ class YouTubeService:
             logger.error(f"Error extracting YouTube ID: {str(e)}")
             return None
     
-    async def download_video(self, youtube_url: str, video_id: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+    def _info_path(self, video_id: str) -> Path:
+        return Path(self.storage_base) / video_id / "info.json"
+    
+    def get_cached_info(self, video_id: str) -> Optional[Dict[str, Any]]:
+        """Return the cached info JSON if it is younger than the TTL"""
+        info_path = self._info_path(video_id)
+        if not info_path.exists():
+            return None
+        if time.time() - info_path.stat().st_mtime > settings.source_info_ttl:
+            return None
+        return load_json(str(info_path)) or None
+    
+    async def probe_video(self, youtube_url: str, video_id: str) -> Optional[Dict[str, Any]]:
         """
-        Download YouTube video in highest quality MP4
+        Fetch video metadata without downloading any media.
+        
+        Uses the long-lived probe extractor off the event loop and caches the
+        info JSON under storage/<id>/info.json for the download step.
+        
+        Returns: info dict, or None if the source is unavailable
+        Raises: SourceProbeError if it could not be probed for a transient reason
+        """
+        cached = self.get_cached_info(video_id)
+        if cached:
+            return cached
+        
+        for attempt in range(1, PROBE_ATTEMPTS + 1):
+            try:
+                info = await asyncio.to_thread(_extract_info_sync, youtube_url)
+                break
+            except Exception as e:
+                if is_unavailable_error(e):
+                    logger.info(f"Source unavailable: {youtube_url}: {str(e)}")
+                    return None
+                logger.warning(f"Metadata probe failed for {youtube_url} (attempt {attempt}): {str(e)}")
+                if attempt == PROBE_ATTEMPTS:
+                    raise SourceProbeError(str(e)) from e
+                await asyncio.sleep(PROBE_RETRY_DELAY * attempt)
+        
+        save_json(info, str(self._info_path(video_id)))
+        return info
+    
+    def estimate_reel_count(self, duration: Optional[float]) -> int:
+        """Number of reels the chunker will produce for this duration"""
+        if not duration:
+            return 0
+        full, remainder = divmod(duration, settings.chunk_duration)
+        return int(full) + (1 if remainder >= settings.min_chunk_duration else 0)
+    
+    def estimate_reel_count_for_ranges(self, ranges: List[TimeRange]) -> int:
+        """Number of reels the chunker will produce for these ranges"""
+        return sum(self.estimate_reel_count(r.duration) for r in ranges)
+    
+    def check_admission(self, info: Dict[str, Any], time_ranges: Optional[List[TimeRange]] = None) -> Optional[str]:
+        """
+        Decide whether a source may enter the pipeline.
+        
+        With time ranges, the duration limit applies to the selected ranges
+        rather than the whole source, since only those are downloaded.
+        
+        Returns: rejection reason, or None if the source is accepted
+        """
+        if info.get('is_live') or info.get('live_status') in ('is_live', 'is_upcoming'):
+            return "Live streams are not supported"
+        if info.get('availability') in UNAVAILABLE_STATES:
+            return f"Video is not publicly available ({info.get('availability')})"
+        
+        duration = info.get('duration')
+        if not duration:
+            return "Could not determine video duration"
+        
+        if time_ranges:
+            if any(r.start >= duration or r.end <= r.start for r in time_ranges):
+                return f"Time ranges must be non-empty and within the video ({int(duration)}s)"
+            selected = total_duration(normalize_ranges(time_ranges, duration))
+            if selected > settings.max_source_duration:
+                return f"Selected ranges are too long ({int(selected)}s, max {settings.max_source_duration}s)"
+            if self.estimate_reel_count_for_ranges(normalize_ranges(time_ranges, duration)) == 0:
+                return "Selected ranges are too short to make a reel"
+            return None
+        
+        if duration > settings.max_source_duration:
+            return f"Video is too long ({int(duration)}s, max {settings.max_source_duration}s)"
+        if self.estimate_reel_count(duration) == 0:
+            return f"Video is too short to make a reel ({int(duration)}s)"
+        return None
+    
+    def plan_sections(
+        self,
+        time_ranges: List[TimeRange],
+        source_duration: Optional[float]
+    ) -> List[Tuple[TimeRange, List[TimeRange]]]:
+        """
+        Keyframe-padded download sections for time ranges.
+        
+        Padding must stop at the source end: yt-dlp clamps the section
+        itself, so an unclamped span would not match the file it names.
+        """
+        if not source_duration:
+            logger.warning("Source duration unknown, download sections are not clamped")
+        return pad_ranges(time_ranges, settings.download_range_padding, source_duration)
+    
+    async def download_video(
+        self,
+        youtube_url: str,
+        video_id: str,
+        time_ranges: Optional[List[TimeRange]] = None,
+        job_id: Optional[int] = None,
+        source_duration: Optional[float] = None
+    ) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """
+        Download YouTube video as MP4
+        
+        With time_ranges, only those spans (padded to keyframes) are fetched,
+        one file per section, and listed under "sections"; source_duration
+        (Video.duration) bounds the padding once the probed info has expired.
+        With job_id, download progress is reported into that job record.
         
         Returns: (success, result_dict)
-        result_dict: {"video_path": str, "audio_path": str, "metadata": {...}}
+        result_dict: {"video_path": str, "audio_path": str, "sections": [...], "metadata": {...}}
         """
         try:
             video_dir = Path(self.storage_base) / video_id
@@ -56,32 +240,101 @@ class YouTubeService:
             
             logger.info(f"Starting YouTube download: {youtube_url}")
             
-            # Configure yt-dlp options
+            # Pick the cheapest streams that cover the reel's video band
+            cached_info = self.get_cached_info(video_id)
+            format_plan = self.format_planner.plan(cached_info)
+            logger.info(
+                f"Format plan: {format_plan.format_selector} "
+                f"(height={format_plan.height}, vcodec={format_plan.vcodec}, "
+                f"~{format_plan.expected_bytes} bytes, decode cost={format_plan.decode_cost})"
+            )
+            
+            # The pool process aborts the download if the running job is cancelled
+            token = current_token()
+            cancel_keys = tuple(token.keys) if token is not None else ()
+            
+            # Configure yt-dlp options (outtmpl and transport options are set by the download pool)
             ydl_opts = {
-                'format': 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best',
-                'outtmpl': str(video_dir / '%(id)s.%(ext)s'),
+                'format': format_plan.format_selector,
+                'merge_output_format': 'mp4',
                 'quiet': False,
                 'no_warnings': False,
-                'socket_timeout': 30,
+                # Auto-captions give us a timed transcript for free
+                'writesubtitles': True,
+                'writeautomaticsub': True,
+                'subtitleslangs': ['en'],
+                'subtitlesformat': 'vtt',
             }
             
-            # Download video
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(youtube_url, download=True)
+            def task(file_name: str, cache_key: str, dest: Path, section=None) -> DownloadTask:
+                return DownloadTask(
+                    youtube_url=youtube_url,
+                    youtube_id=video_id,
+                    cache_key=cache_key,
+                    dest=str(dest),
+                    file_name=file_name,
+                    ydl_opts=ydl_opts,
+                    cached_info=cached_info,
+                    section=section,
+                    job_id=job_id,
+                    cancel_keys=cancel_keys,
+                )
+            
+            # Downloads run in the worker pool, never on the event loop
+            pool = get_download_pool()
+            info = None
+            download_metrics = []
             
-            video_path = video_dir / f"{video_id}.mp4"
+            # Partial download: one keyframe-padded section per range group
+            section_records = None
+            if time_ranges:
+                source_duration = (cached_info or {}).get('duration') or source_duration
+                sections = self.plan_sections(time_ranges, source_duration)
+                logger.info(
+                    f"Partial download of {len(sections)} sections "
+                    f"({total_duration(p for p, _ in sections):.0f}s of {source_duration}s)"
+                )
+                
+                section_records = []
+                for padded, requested in sections:
+                    span = f"{int(padded.start)}-{int(padded.end)}"
+                    outcome = await pool.run(task(
+                        f"{video_id}.{span}",
+                        f"{format_plan.format_selector}@{span}",
+                        video_dir / f"{video_id}.{span}.mp4",
+                        section=(padded.start, padded.end),
+                    ))
+                    info = info or outcome['info']
+                    download_metrics.append(outcome['metrics'])
+                    section_records.append({
+                        'path': outcome['path'],
+                        'file_start': padded.start,
+                        'file_end': padded.end,
+                        'ranges': [r.to_list() for r in requested],
+                    })
+                video_path = Path(section_records[0]['path'])
+                file_size = sum(os.path.getsize(s['path']) for s in section_records)
+            else:
+                # Single-flight: concurrent requests for this id/format wait on one download
+                outcome = await pool.run(task(video_id, format_plan.format_selector, video_dir / f"{video_id}.mp4"))
+                if outcome['cache_hit']:
+                    logger.info(f"Source cache hit for {video_id}")
+                info = outcome['info']
+                download_metrics.append(outcome['metrics'])
+                video_path = Path(outcome['path'])
+                file_size = os.path.getsize(video_path)
             
-            if not video_path.exists():
-                logger.error(f"Video file not found after download: {video_path}")
-                return False, None
+            if info is None:
+                # Served from the source cache; metadata comes from the probe
+                info = cached_info or await self.probe_video(youtube_url, video_id) or {}
             
             logger.info(f"Video downloaded successfully: {video_path}")
             
-            # Extract audio
-            audio_path = await self._extract_audio(str(video_path), video_id)
+            # Extract audio (sections are transcribed directly from their files)
+            audio_path = None if section_records else await self._extract_audio(str(video_path), video_id)
             
             # Get transcript
-            transcript = await self._get_transcript(youtube_url, video_id)
+            transcript, transcript_source = await self._get_transcript(youtube_url, video_id, section_records)
             
             # Get metadata
             duration = info.get('duration')
@@ -93,21 +346,47 @@ class YouTubeService:
                 'video_path': str(video_path),
                 'audio_path': audio_path,
                 'transcript': transcript,
+                'transcript_source': transcript_source,
                 'duration': duration,
                 'title': title,
                 'description': description,
                 'thumbnail_url': thumbnail_url,
                 'youtube_video_id': video_id,
-                'file_size': os.path.getsize(video_path),
+                'file_size': file_size,
+                'sections': section_records,
+                'format_plan': format_plan.to_dict(),
+                'download_metrics': download_metrics,
             }
             
             logger.info(f"YouTube download complete. Duration: {duration}s, Size: {result['file_size']} bytes")
             return True, result
         
+        except JobCancelled:
+            raise
         except Exception as e:
             logger.error(f"Error downloading YouTube video: {str(e)}", exc_info=True)
             return False, None
     
+    def locate_source(
+        self,
+        video_id: str,
+        start_time: float,
+        sections: Optional[List[Dict[str, Any]]] = None
+    ) -> Tuple[Optional[str], float]:
+        """
+        Find the downloaded file holding source time start_time.
+        
+        Returns: (file_path, start time within that file), or (None, 0.0)
+        """
+        full_path = Path(self.storage_base) / video_id / f"{video_id}.mp4"
+        if full_path.exists():
+            return str(full_path), start_time
+        
+        for section in sections or []:
+            if section['file_start'] <= start_time < section['file_end'] and Path(section['path']).exists():
+                return section['path'], start_time - section['file_start']
+        return None, 0.0
+    
     async def _extract_audio(self, video_path: str, video_id: str) -> Optional[str]:
         """Extract audio from video using FFmpeg"""
         try:
@@ -124,7 +403,7 @@ class YouTubeService:
             ]
             
             logger.info(f"Extracting audio from video: {video_path}")
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=600)
+            result = run_process(cmd, timeout=600, cleanup=[audio_path], isolate=True)
             
             if result.returncode == 0 and audio_path.exists():
                 logger.info(f"Audio extracted: {audio_path}")
@@ -133,30 +412,40 @@ class YouTubeService:
                 logger.error(f"FFmpeg error: {result.stderr}")
                 return None
         
+        except JobCancelled:
+            raise
         except Exception as e:
             logger.error(f"Error extracting audio: {str(e)}")
             return None
     
-    async def _get_transcript(self, youtube_url: str, video_id: str) -> Tuple[Optional[str], str]:
+    async def _get_transcript(
+        self,
+        youtube_url: str,
+        video_id: str,
+        sections: Optional[List[Dict[str, Any]]] = None
+    ) -> Tuple[Optional[TranscriptIndex], Optional[str]]:
         """
-        Get transcript from YouTube or generate using Google Speech-to-Text
+        Get transcript from YouTube or generate using Speech-to-Text
         
-        Returns: (transcript_text, source)
+        Returns: (transcript_index, source)
         """
         try:
             # Try to get transcript from YouTube directly (if available)
-            transcript = await self._get_youtube_transcript(youtube_url)
+            transcript = await self._get_youtube_transcript(video_id)
             if transcript:
-                logger.info(f"Got transcript from YouTube")
+                logger.info(f"Got transcript from YouTube ({len(transcript)} segments)")
                 return transcript, "youtube"
             
             logger.info(f"YouTube transcript not available, generating using Speech-to-Text")
+            if sections:
+                return await self._sections_speech_to_text(sections)
+            
             # Generate transcript from audio
             audio_path = Path(self.storage_base) / video_id / f"{video_id}_audio.m4a"
             if audio_path.exists():
                 transcript = await self._speech_to_text(str(audio_path))
                 if transcript:
-                    return transcript, "google_speech"
+                    return transcript, f"{settings.transcription_backend}_speech"
             
             return None, None
         
@@ -164,59 +453,60 @@ class YouTubeService:
             logger.error(f"Error getting transcript: {str(e)}")
             return None, None
     
-    async def _get_youtube_transcript(self, youtube_url: str) -> Optional[str]:
-        """Attempt to get transcript from YouTube API"""
+    async def _get_youtube_transcript(self, video_id: str) -> Optional[TranscriptIndex]:
+        """Load the auto-captions yt-dlp saved next to the video"""
         try:
-            # This is a simplified version - in production, use youtube-transcript-api
-            # For now, return None to trigger Speech-to-Text fallback
-            logger.info("YouTube transcript extraction not configured")
-            return None
+            video_dir = Path(self.storage_base) / video_id
+            index = TranscriptExtractor().get_transcript_index(str(video_dir))
+            return index if len(index) else None
         except Exception as e:
             logger.warning(f"Could not get YouTube transcript: {str(e)}")
             return None
     
-    async def _speech_to_text(self, audio_path: str) -> Optional[str]:
-        """Convert audio to text using Google Speech-to-Text"""
+    async def _speech_to_text(self, audio_path: str) -> Optional[TranscriptIndex]:
+        """
+        Transcribe audio with the configured speech-to-text backend.
+        
+        Audio is streamed from FFmpeg as 16 kHz mono PCM in fixed windows,
+        so memory use does not grow with video length.
+        """
         try:
-            if not settings.google_application_credentials:
+            backend_name = settings.transcription_backend
+            if backend_name == "google" and not settings.google_application_credentials:
                 logger.warning("Google Cloud credentials not configured")
                 return None
             
-            client = speech_v1.SpeechClient()
-            
-            logger.info(f"Transcribing audio: {audio_path}")
-            
-            # Read audio file
-            with open(audio_path, 'rb') as audio_file:
-                content = audio_file.read()
-            
-            # Create audio object
-            audio = speech_v1.RecognitionAudio(content=content)
-            
-            # Configure recognition
-            config = speech_v1.RecognitionConfig(
-                encoding=speech_v1.RecognitionConfig.AudioEncoding.LINEAR16,
-                sample_rate_hertz=16000,
-                language_code="en-US",
-                enable_automatic_punctuation=True,
+            backend_kwargs = {"language_code": settings.transcription_language} if backend_name == "google" else {}
+            transcriber = StreamingTranscriber(
+                backend=get_backend(backend_name, **backend_kwargs),
+                ffmpeg_path=self.ffmpeg_path,
+                window_seconds=settings.transcription_window_seconds,
+                max_parallel=settings.transcription_max_parallel,
             )
             
-            # Perform transcription
-            response = client.recognize(config=config, audio=audio)
-            
-            # Extract transcript
-            transcript = ""
-            for result in response.results:
-                for alternative in result.alternatives:
-                    transcript += alternative.transcript + " "
+            logger.info(f"Transcribing audio: {audio_path} (backend={backend_name})")
+            transcript = await transcriber.transcribe_file(audio_path)
             
-            logger.info(f"Transcription complete: {len(transcript)} characters")
-            return transcript.strip() if transcript else None
+            logger.info(f"Transcription complete: {len(transcript.text)} characters")
+            return transcript if len(transcript) else None
         
         except Exception as e:
             logger.error(f"Error in speech-to-text: {str(e)}")
             return None
     
+    async def _sections_speech_to_text(self, sections: List[Dict[str, Any]]) -> Tuple[Optional[TranscriptIndex], Optional[str]]:
+        """Transcribe partially downloaded sections onto the source timeline"""
+        segments = []
+        for section in sections:
+            index = await self._speech_to_text(section['path'])
+            if index:
+                offset = section['file_start']
+                segments.extend((start + offset, end + offset, text) for start, end, text in index.segments())
+        
+        if not segments:
+            return None, None
+        return TranscriptIndex.from_segments(segments), f"{settings.transcription_backend}_speech"
+    
     def get_video_duration(self, video_path: str) -> Optional[float]:
         """Get video duration using ffprobe"""
         try:
@@ -1 +1 @@
-"""Celery workers and background tasks"""
+"""RQ workers, background jobs and the stage DAG job engine"""
@@ -0,0 +1,263 @@
+"""
+Cancellation - Cooperative cancellation of running jobs
+
+Cancelling a job (or a whole video) sets a flag key in Redis. Whoever runs
+the job wraps it in cancel_scope(CancelToken(...)); long-running steps
+then check the token from wherever they are, without it being threaded
+through every call:
+
+- run_process (and stream_process, for piped decodes) runs ffmpeg in its
+  own process group and kills the whole group (and removes its partial
+  output) once the token is cancelled
+- downloads check it from the yt-dlp progress hook in the pool process
+- Gemini batches check it before each request
+
+Checks raise JobCancelled; the worker then records the job as CANCELLED
+instead of failing or retrying it.
+"""
+
+import logging
+import os
+import signal
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+CANCEL_KEY = "cancel:{}:{}"  # Scope ("job" / "video"), id
+CANCEL_TTL = 24 * 3600
+
+POLL_INTERVAL = 0.5  # Seconds between checks of a running process
+KILL_GRACE = 5.0  # Seconds between SIGTERM and SIGKILL
+
+
+class JobCancelled(Exception):
+    """The job was cancelled while it ran"""
+
+
+def cancel_keys(job_id: Optional[int] = None, video_id: Optional[int] = None) -> List[str]:
+    keys = []
+    if job_id is not None:
+        keys.append(CANCEL_KEY.format("job", job_id))
+    if video_id is not None:
+        keys.append(CANCEL_KEY.format("video", video_id))
+    return keys
+
+
+def request_cancel(redis_client, job_ids: Iterable[int] = (), video_id: Optional[int] = None) -> bool:
+    """
+    Flag jobs (and everything running for a video) as cancelled.
+
+    Returns False if Redis could not be reached: the caller still records
+    the cancellation, but running handlers will not see the flag.
+    """
+    keys = [key for job_id in job_ids for key in cancel_keys(job_id=job_id)] + cancel_keys(video_id=video_id)
+    if not keys:
+        return True
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for key in keys:
+            pipe.set(key, 1, ex=CANCEL_TTL)
+        pipe.execute()
+    except Exception as e:
+        logger.error(f"Could not set cancel flags {keys}: {str(e)}")
+        return False
+    return True
+
+
+class CancelToken:
+    """Reads the cancel flags of one job/video, at most once per poll interval"""
+
+    def __init__(self, redis_client, keys: Sequence[str], poll_interval: float = POLL_INTERVAL):
+        self.redis = redis_client
+        self.keys = list(keys)
+        self.poll_interval = poll_interval
+        self._cancelled = False
+        self._checked_at = float("-inf")
+
+    @classmethod
+    def for_job(cls, redis_client, job_id: Optional[int] = None, video_id: Optional[int] = None) -> "CancelToken":
+        return cls(redis_client, cancel_keys(job_id, video_id))
+
+    @property
+    def cancelled(self) -> bool:
+        if self._cancelled or not self.keys:
+            return self._cancelled
+        now = time.monotonic()
+        if now - self._checked_at >= self.poll_interval:
+            self._checked_at = now
+            try:
+                self._cancelled = bool(self.redis.exists(*self.keys))
+            except Exception as e:
+                logger.debug(f"Cancel check failed: {str(e)}")
+        return self._cancelled
+
+    def raise_if_cancelled(self):
+        if self.cancelled:
+            raise JobCancelled(f"Cancelled ({', '.join(self.keys)})")
+
+    def child(self) -> "CancelToken":
+        """A token that follows this one's flags but can also be cancelled on its own"""
+        return CancelToken(self.redis, self.keys, self.poll_interval)
+
+    def cancel(self):
+        """Cancel this token in-process (its processes are killed; nothing is written to Redis)"""
+        self._cancelled = True
+
+
+_current_token: ContextVar[Optional[CancelToken]] = ContextVar("cancel_token", default=None)
+
+
+@contextmanager
+def cancel_scope(token: CancelToken):
+    """Make `token` the current one (inherited by asyncio tasks and to_thread)"""
+    reset = _current_token.set(token)
+    try:
+        yield token
+    finally:
+        _current_token.reset(reset)
+
+
+def current_token() -> Optional[CancelToken]:
+    return _current_token.get()
+
+
+def check_cancelled():
+    """Raise JobCancelled if the current job was cancelled (no-op outside a scope)"""
+    token = current_token()
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+def kill_process_group(process: subprocess.Popen, grace: float = KILL_GRACE):
+    """SIGTERM the process's whole group (ffmpeg and anything it spawned), then SIGKILL"""
+    for sig in (signal.SIGTERM, signal.SIGKILL):
+        try:
+            os.killpg(process.pid, sig)
+        except ProcessLookupError:
+            break
+        try:
+            process.wait(timeout=grace)
+            break
+        except subprocess.TimeoutExpired:
+            continue
+    try:
+        process.communicate(timeout=grace)
+    except Exception:
+        pass
+
+
+def run_process(
+    cmd: List[str],
+    timeout: Optional[float] = None,
+    cleanup: Iterable[str] = (),
+    text: bool = True,
+    isolate: bool = False
+) -> subprocess.CompletedProcess:
+    """
+    subprocess.run(cmd, capture_output=True) in its own process group.
+
+    On timeout or cancellation of the current job the whole group is
+    killed (not just the direct child) and the `cleanup` paths - the
+    command's partial outputs - are removed before the error propagates.
+    With `isolate`, the command runs under the encode isolation profile
+    (see app.workers.isolation) unless this worker already does.
+    """
+    token = current_token()
+    if isolate:
+        from app.workers.isolation import wrap_command
+        cmd = wrap_command(cmd)
+    process = subprocess.Popen(
+        cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=text, start_new_session=True
+    )
+    if isolate:
+        from app.workers.isolation import cgroup_for_spawned
+        cgroup_for_spawned(process.pid)
+    deadline = time.monotonic() + timeout if timeout else None
+    try:
+        while True:
+            try:
+                stdout, stderr = process.communicate(timeout=POLL_INTERVAL)
+                return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
+            except subprocess.TimeoutExpired:
+                pass
+            if token is not None:
+                token.raise_if_cancelled()
+            if deadline is not None and time.monotonic() > deadline:
+                raise subprocess.TimeoutExpired(cmd, timeout)
+    except BaseException:
+        kill_process_group(process)
+        for path in cleanup:
+            Path(path).unlink(missing_ok=True)
+        raise
+
+
+def stream_process(
+    cmd: List[str],
+    block_size: int,
+    timeout: Optional[float] = None,
+    isolate: bool = False
+) -> Iterator[bytes]:
+    """
+    Run cmd like run_process, yielding its stdout in blocks of `block_size`
+    bytes (the last one may be shorter) instead of buffering all of it.
+
+    A watchdog thread kills the process group on timeout or cancellation of
+    the current job, even while a read is blocked. A non-zero exit raises
+    CalledProcessError carrying stderr; closing the generator early kills
+    the process.
+    """
+    token = current_token()
+    if isolate:
+        from app.workers.isolation import wrap_command
+        cmd = wrap_command(cmd)
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, start_new_session=True)
+    if isolate:
+        from app.workers.isolation import cgroup_for_spawned
+        cgroup_for_spawned(process.pid)
+
+    stderr: List[bytes] = []
+    drain = threading.Thread(target=lambda: stderr.append(process.stderr.read()), daemon=True)
+    drain.start()
+
+    stopped = threading.Event()
+    aborted: List[BaseException] = []
+    deadline = time.monotonic() + timeout if timeout else None
+
+    def watch():
+        while not stopped.wait(POLL_INTERVAL):
+            if token is not None and token.cancelled:
+                aborted.append(JobCancelled(f"Cancelled ({', '.join(token.keys)})"))
+            elif deadline is not None and time.monotonic() > deadline:
+                aborted.append(subprocess.TimeoutExpired(cmd, timeout))
+            else:
+                continue
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            return
+
+    threading.Thread(target=watch, daemon=True).start()
+    try:
+        while True:
+            block = process.stdout.read(block_size)
+            if not block:
+                break
+            yield block
+        process.wait()
+        drain.join()
+        if aborted:
+            raise aborted[0]
+        if process.returncode != 0:
+            raise subprocess.CalledProcessError(process.returncode, cmd, stderr=b"".join(stderr))
+    except BaseException:
+        kill_process_group(process)
+        raise
+    finally:
+        stopped.set()
@@ -0,0 +1,120 @@
+"""
+Concurrency Controller - How many workers a pool should run on this node
+
+Every scale interval the supervisor feeds the controller the node's load
+and the pool's backlog, and it returns the pool's new target size:
+
+- grow by one when tasks are waiting, no worker is idle, and the node has
+  room for one more task: CPU below the target, I/O wait below its limit
+  and enough free memory for another ffmpeg (the mean RSS of the running
+  ones, or a configured estimate)
+- shrink by one when the node is overloaded (CPU above the high mark, I/O
+  wait above its limit, memory below the reserve), or when workers have
+  sat idle with nothing queued
+
+Signals are smoothed (EMA), the gap between the CPU target and the high
+mark is a hysteresis band, and each change starts a cooldown, so a node
+saturates without oscillating. The size always stays within the pool's
+floor and ceiling.
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+from app.workers.node_load import NodeLoad
+
+MB = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class ConcurrencyLimits:
+    """Sizing policy of one worker pool"""
+    floor: int = 1
+    ceiling: int = 4
+    cpu_target: float = 0.85  # Grow only below this (smoothed) utilization
+    cpu_high: float = 0.95  # Shrink above it
+    iowait_high: float = 0.25
+    memory_reserve: int = 1024 * MB  # Free memory always left to the host
+    task_memory: int = 768 * MB  # Assumed cost of a task until ffmpeg RSS is seen
+    cooldown: float = 30.0  # Seconds between size changes
+    idle_cooldown: float = 120.0  # Seconds a surplus must last before idle workers retire
+
+    def clamp(self, size: int) -> int:
+        return max(self.floor, min(self.ceiling, size))
+
+
+class ConcurrencyController:
+    """Target pool size from load and backlog samples"""
+
+    def __init__(self, limits: ConcurrencyLimits, smoothing: float = 0.3):
+        self.limits = limits
+        self.smoothing = smoothing
+        self.cpu: Optional[float] = None
+        self.iowait: Optional[float] = None
+        self._changed_at = float("-inf")
+        self._surplus_since: Optional[float] = None
+
+    def _smooth(self, previous: Optional[float], value: float) -> float:
+        if previous is None:
+            return value
+        return previous + self.smoothing * (value - previous)
+
+    def _task_memory(self, load: NodeLoad) -> int:
+        if load.ffmpeg_count:
+            return load.ffmpeg_rss // load.ffmpeg_count
+        return self.limits.task_memory
+
+    def decide(self, size: int, busy: int, backlog: int, load: NodeLoad, now: float) -> int:
+        """
+        New target size.
+
+        size: workers running now; busy: of those, how many have a task;
+        backlog: tasks waiting on the pool's queues.
+        """
+        limits = self.limits
+        self.cpu = self._smooth(self.cpu, load.cpu)
+        self.iowait = self._smooth(self.iowait, load.iowait)
+
+        if size != limits.clamp(size):
+            self._changed_at = now
+            return limits.clamp(size)
+
+        idle = size - busy
+        if backlog == 0 and idle > 0:
+            if self._surplus_since is None:
+                self._surplus_since = now
+        else:
+            self._surplus_since = None
+
+        if now - self._changed_at < limits.cooldown:
+            return size
+
+        memory_low = (
+            load.memory_available is not None
+            and load.memory_available < limits.memory_reserve
+        )
+        overloaded = self.cpu > limits.cpu_high or self.iowait > limits.iowait_high or memory_low
+        idle_too_long = (
+            self._surplus_since is not None
+            and now - self._surplus_since >= limits.idle_cooldown
+        )
+        if (overloaded or idle_too_long) and size > limits.floor:
+            self._changed_at = now
+            self._surplus_since = None
+            return size - 1
+
+        memory_room = (
+            load.memory_available is None
+            or load.memory_available - self._task_memory(load) >= limits.memory_reserve
+        )
+        if (
+            backlog > idle
+            and size < limits.ceiling
+            and self.cpu < limits.cpu_target
+            and self.iowait < limits.iowait_high
+            and memory_room
+        ):
+            self._changed_at = now
+            return size + 1
+
+        return size
@@ -0,0 +1,85 @@
+"""
+Stage DAG - Declarative pipeline graphs for the job engine
+
+A pipeline is a set of named stages with dependencies. A stage marked
+fan_out runs once per item produced by its (single) upstream stage; the
+stages that depend on it fan back in and run once, after every item task
+has completed.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Tuple
+
+
+class PipelineDefinitionError(Exception):
+    """The stage graph is malformed"""
+
+
+@dataclass(frozen=True)
+class Stage:
+    """One node of a pipeline"""
+    name: str
+    job_type: str  # Job.job_type of the rows created for this stage
+    depends_on: Tuple[str, ...] = ()
+    fan_out: bool = False  # One task per item of the upstream result's "items"
+    optional: bool = False  # Only scheduled when the pipeline context enables it
+
+
+class StageGraph:
+    """Validated, topologically ordered stage graph"""
+
+    def __init__(self, name: str, stages: Iterable[Stage]):
+        self.name = name
+        self.stages: Dict[str, Stage] = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise PipelineDefinitionError(f"Duplicate stage: {stage.name}")
+            self.stages[stage.name] = stage
+
+        for stage in self.stages.values():
+            for dep in stage.depends_on:
+                if dep not in self.stages:
+                    raise PipelineDefinitionError(f"{stage.name} depends on unknown stage {dep}")
+            if stage.fan_out and len(stage.depends_on) != 1:
+                raise PipelineDefinitionError(f"Fan-out stage {stage.name} needs exactly one upstream stage")
+
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> List[Stage]:
+        order: List[Stage] = []
+        state: Dict[str, int] = {}  # 1 = visiting, 2 = done
+
+        def visit(name: str):
+            if state.get(name) == 2:
+                return
+            if state.get(name) == 1:
+                raise PipelineDefinitionError(f"Cycle through stage {name}")
+            state[name] = 1
+            for dep in self.stages[name].depends_on:
+                visit(dep)
+            state[name] = 2
+            order.append(self.stages[name])
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    def roots(self) -> List[Stage]:
+        return [s for s in self.order if not s.depends_on]
+
+    def downstream(self, name: str) -> List[Stage]:
+        """Stages that directly depend on `name`, in topological order"""
+        return [s for s in self.order if name in s.depends_on]
+
+    def enabled(self, stage: Stage, options: Dict) -> bool:
+        return not stage.optional or bool(options.get(stage.name))
+
+
+# download -> cut -> verticalize (per chunk) -> ai -> publish
+VIDEO_PIPELINE = StageGraph("video", [
+    Stage("download", "youtube_download"),
+    Stage("cut", "cutting", depends_on=("download",)),
+    Stage("verticalize", "vertical_conversion", depends_on=("cut",), fan_out=True),
+    Stage("ai", "ai_generation", depends_on=("verticalize",)),
+    Stage("publish", "instagram_upload", depends_on=("ai",), optional=True),
+])
@@ -0,0 +1,93 @@
+"""
+Dead Letter Queue - Jobs that exhausted their retries
+
+Each entry keeps what is needed to inspect and replay the job: its type,
+owner, last error, attempt count and the RQ call that ran it. Entries live
+in a capped Redis list (newest first) plus a hash by job id, so one entry
+can be looked up and removed when it is replayed. A list per owner indexes
+the same entries, so a user's entries page and count without reading
+anyone else's.
+"""
+
+import json
+import time
+from typing import Dict, List, Optional
+
+LIST_KEY = "dead_letter:jobs"
+ENTRY_KEY = "dead_letter:entries"
+USER_LIST_KEY = "dead_letter:user:{}"
+
+
+class DeadLetterQueue:
+    """Capped, inspectable store of permanently failed jobs"""
+
+    def __init__(self, redis_client, max_entries: int = 1000):
+        self.redis = redis_client
+        self.max_entries = max_entries
+
+    def add(
+        self,
+        job_id: int,
+        job_type: str,
+        error: str,
+        attempts: int,
+        call: Optional[Dict] = None,
+        user_id: Optional[int] = None,
+        video_id: Optional[int] = None
+    ):
+        entry = json.dumps({
+            'job_id': job_id,
+            'job_type': job_type,
+            'user_id': user_id,
+            'video_id': video_id,
+            'error': error,
+            'attempts': attempts,
+            'failed_at': time.time(),
+            'call': call,
+        })
+        pipe = self.redis.pipeline()
+        pipe.lrem(LIST_KEY, 0, job_id)
+        pipe.lpush(LIST_KEY, job_id)
+        if user_id is not None:
+            pipe.lrem(USER_LIST_KEY.format(user_id), 0, job_id)
+            pipe.lpush(USER_LIST_KEY.format(user_id), job_id)
+        pipe.hset(ENTRY_KEY, job_id, entry)
+        pipe.execute()
+
+        # Trim the oldest entries beyond the cap
+        for old_id in self.redis.lrange(LIST_KEY, self.max_entries, -1):
+            self._unindex_owner(old_id)
+            self.redis.hdel(ENTRY_KEY, old_id)
+        self.redis.ltrim(LIST_KEY, 0, self.max_entries - 1)
+
+    def _unindex_owner(self, job_id):
+        entry = self.get(job_id)
+        if entry and entry.get('user_id') is not None:
+            self.redis.lrem(USER_LIST_KEY.format(entry['user_id']), 0, job_id)
+
+    def list(self, limit: int = 50, offset: int = 0, user_id: Optional[int] = None) -> List[Dict]:
+        """Newest first; only `user_id`'s entries if given"""
+        key = LIST_KEY if user_id is None else USER_LIST_KEY.format(user_id)
+        job_ids = self.redis.lrange(key, offset, offset + limit - 1)
+        if not job_ids:
+            return []
+        entries = self.redis.hmget(ENTRY_KEY, job_ids)
+        return [json.loads(e) for e in entries if e]
+
+    def get(self, job_id: int) -> Optional[Dict]:
+        raw = self.redis.hget(ENTRY_KEY, job_id)
+        return json.loads(raw) if raw else None
+
+    def remove(self, job_id: int):
+        self._unindex_owner(job_id)
+        pipe = self.redis.pipeline()
+        pipe.lrem(LIST_KEY, 0, job_id)
+        pipe.hdel(ENTRY_KEY, job_id)
+        pipe.execute()
+
+    def count(self, user_id: Optional[int] = None) -> int:
+        """Entries in total, or of one owner"""
+        return self.redis.llen(LIST_KEY if user_id is None else USER_LIST_KEY.format(user_id))
+
+    def __len__(self) -> int:
+        return self.count()
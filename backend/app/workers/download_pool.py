@@ -0,0 +1,444 @@
+"""
+Download worker pool
+
+yt-dlp downloads are blocking and long-running, so they run in a dedicated
+pool of worker processes instead of on the API event loop. RQ workers run
+them in a thread of the work horse instead: it is forked per job and
+exits without shutting a pool down, and the host-wide slots already bound
+concurrency:
+
+- Concurrency: host-wide download slots (flock'd slot files), so the limit
+  holds across the API process and every job worker on the host
+- Bandwidth: an aggregate budget shared by all active downloads; each
+  download's yt-dlp ratelimit is re-balanced as others start and finish
+- Progress: per-download percentage written into the Job record
+- Resume: DASH/HLS fragments are fetched concurrently, and .part files left
+  in the source-cache work dir by a crashed worker are resumed
+- Integrity: every downloaded file is verified (duration + tail decode)
+  before it is handed to chunking, once per cache entry; a corrupt resume
+  is discarded and fetched clean
+- Cancellation: the progress hook aborts the download once its job is
+  cancelled, and the partial files are removed
+- Metrics: bytes, wall time and throughput per download, for sizing
+  ingest nodes
+"""
+
+import asyncio
+import errno
+import fcntl
+import logging
+import multiprocessing
+import os
+import re
+import shutil
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import get_settings
+from app.services.source_cache import SourceCache
+from app.workers.cancellation import CancelToken, JobCancelled
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Info fields the pipeline keeps from a download
+INFO_FIELDS = ("id", "title", "description", "duration", "thumbnail")
+
+# ffmpeg messages that mean the tail is damaged; anything else on stderr
+# (timestamp, metadata or codec warnings) is harmless
+DECODE_ERRORS = re.compile(
+    r"invalid data found|error while decoding|corrupt|moov atom not found|"
+    r"invalid nal unit|truncat|partial file|decode_slice_header error|concealing",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class DownloadTask:
+    """One source download, picklable for the worker processes"""
+    youtube_url: str
+    youtube_id: str
+    cache_key: str  # Format selector (plus section span for partial downloads)
+    dest: str
+    file_name: str  # Output stem inside the cache work dir
+    ydl_opts: Dict[str, Any]
+    cached_info: Optional[Dict[str, Any]] = None
+    section: Optional[Tuple[float, float]] = None
+    job_id: Optional[int] = None
+    cancel_keys: Tuple[str, ...] = ()  # Cancel flags of the job/video it runs for
+
+
+@dataclass
+class DownloadMetrics:
+    """Throughput of one download (zeroed transfer fields on a cache hit)"""
+    youtube_id: str
+    cache_key: str
+    cache_hit: bool
+    bytes: int = 0
+    resumed_bytes: int = 0  # Already on disk from an interrupted attempt
+    elapsed: float = 0.0
+    throughput_mbps: float = 0.0
+    fragment_concurrency: int = 1
+    attempts: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class MediaIntegrityError(Exception):
+    """A downloaded file failed verification"""
+
+
+class DownloadSlots:
+    """
+    Host-wide download slots backed by flock'd files.
+
+    A holder writes its pid into the slot file, so active() can count live
+    downloads for bandwidth sharing without touching the locks.
+    """
+
+    def __init__(self, root: str, count: int):
+        self.root = Path(root)
+        self.count = max(1, count)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _slot_path(self, i: int) -> Path:
+        return self.root / f"slot-{i}.lock"
+
+    @contextmanager
+    def acquire(self):
+        """Block until a slot is free"""
+        waited = False
+        while True:
+            for i in range(self.count):
+                slot = open(self._slot_path(i), "a+")
+                try:
+                    fcntl.flock(slot.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError as e:
+                    slot.close()
+                    if e.errno not in (errno.EAGAIN, errno.EACCES):
+                        raise
+                    continue
+
+                try:
+                    slot.truncate(0)
+                    slot.write(str(os.getpid()))
+                    slot.flush()
+                    yield i
+                finally:
+                    slot.truncate(0)
+                    fcntl.flock(slot.fileno(), fcntl.LOCK_UN)
+                    slot.close()
+                return
+
+            if not waited:
+                logger.info("All download slots busy, waiting")
+                waited = True
+            time.sleep(1.0)
+
+    def active(self) -> int:
+        """Number of slots held by live processes"""
+        active = 0
+        for i in range(self.count):
+            try:
+                pid = int(self._slot_path(i).read_text().strip() or 0)
+            except (OSError, ValueError):
+                continue
+            if pid and _pid_alive(pid):
+                active += 1
+        return active
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+class _DownloadMonitor:
+    """yt-dlp progress hook: bandwidth re-balancing, job progress and cancellation"""
+
+    REBALANCE_INTERVAL = 2.0
+    PROGRESS_INTERVAL = 5.0
+
+    def __init__(
+        self,
+        ydl,
+        slots: DownloadSlots,
+        bandwidth_limit: int,
+        job_id: Optional[int],
+        token: Optional[CancelToken] = None
+    ):
+        self.ydl = ydl
+        self.slots = slots
+        self.bandwidth_limit = bandwidth_limit
+        self.job_id = job_id
+        self.token = token
+        self._last_rebalance = 0.0
+        self._last_progress = 0.0
+        self._last_percent = -1.0
+
+    def rebalance(self):
+        """Give this download an equal share of the aggregate budget"""
+        if not self.bandwidth_limit:
+            return
+        share = self.bandwidth_limit // max(1, self.slots.active())
+        self.ydl.params['ratelimit'] = max(share, 1)
+
+    def __call__(self, d: Dict[str, Any]):
+        if self.token is not None and self.token.cancelled:
+            import yt_dlp
+            raise yt_dlp.utils.DownloadCancelled("Job cancelled")
+
+        now = time.monotonic()
+        if d.get('status') != 'downloading':
+            return
+
+        if now - self._last_rebalance >= self.REBALANCE_INTERVAL:
+            self.rebalance()
+            self._last_rebalance = now
+
+        total = d.get('total_bytes') or d.get('total_bytes_estimate')
+        if not self.job_id or not total:
+            return
+        percent = min(100.0, d.get('downloaded_bytes', 0) * 100.0 / total)
+        if percent - self._last_percent >= 2.0 or now - self._last_progress >= self.PROGRESS_INTERVAL:
+            self._last_percent = percent
+            self._last_progress = now
+            _report_progress(self.job_id, percent)
+
+
+def _report_progress(job_id: int, percent: float):
+    """Write download progress into the job record"""
+    try:
+        from app.workers.rq_worker import update_job_status
+        from app.models.reel import JobStatus
+        update_job_status(job_id, JobStatus.PROCESSING, round(percent, 1))
+    except Exception as e:
+        logger.warning(f"Could not report progress for job {job_id}: {str(e)}")
+
+
+def _run_ydl(
+    task: DownloadTask,
+    opts: Dict[str, Any],
+    slots: DownloadSlots,
+    token: Optional[CancelToken] = None
+) -> Dict[str, Any]:
+    """Download with yt-dlp, reusing the probed info JSON while its URLs are fresh"""
+    import yt_dlp
+
+    bandwidth_limit = int(settings.download_bandwidth_limit_mbps * 125_000)
+    with yt_dlp.YoutubeDL(opts) as ydl:
+        monitor = _DownloadMonitor(ydl, slots, bandwidth_limit, task.job_id, token)
+        ydl.add_progress_hook(monitor)
+        monitor.rebalance()
+
+        if task.cached_info:
+            try:
+                return ydl.process_ie_result(dict(task.cached_info), download=True)
+            except yt_dlp.utils.DownloadError as e:
+                logger.warning(f"Cached info stale, re-extracting: {str(e)}")
+        return ydl.extract_info(task.youtube_url, download=True)
+
+
+def _transport_opts() -> Dict[str, Any]:
+    """yt-dlp options for throughput and resumability"""
+    return {
+        'concurrent_fragment_downloads': settings.download_fragment_concurrency,
+        'continuedl': True,  # Resume .part files left by a crashed worker
+        'retries': settings.download_retries,
+        'fragment_retries': settings.download_retries,
+        'socket_timeout': settings.download_socket_timeout,
+        # Range requests in chunks: resumable and not throttled as one huge read
+        'http_chunk_size': 10 * 1024 * 1024,
+    }
+
+
+def _partial_bytes(work_dir: Path) -> int:
+    """Bytes left in the work dir by an interrupted download"""
+    if not work_dir.exists():
+        return 0
+    return sum(p.stat().st_size for p in work_dir.iterdir() if p.is_file() and ".part" in p.name)
+
+
+def verify_media(path: str, expected_duration: Optional[float] = None) -> Optional[str]:
+    """
+    Check a downloaded file before chunking.
+
+    ffprobe must read a duration close to the expected one, and the last
+    seconds must decode cleanly (a bad resume truncates or corrupts the tail).
+
+    Returns: problem description, or None if the file is sound
+    """
+    probe = subprocess.run(
+        [settings.ffprobe_path, '-v', 'error', '-show_entries', 'format=duration',
+         '-of', 'default=noprint_wrappers=1:nokey=1', path],
+        capture_output=True, text=True, timeout=60
+    )
+    try:
+        duration = float(probe.stdout.strip())
+    except ValueError:
+        return f"unreadable container: {probe.stderr.strip()[:200]}"
+
+    if expected_duration:
+        tolerance = max(2.0, expected_duration * 0.02)
+        if duration + tolerance < expected_duration:
+            return f"truncated: {duration:.1f}s of {expected_duration:.1f}s"
+
+    tail = subprocess.run(
+        [settings.ffmpeg_path, '-v', 'error', '-sseof', '-3', '-i', path, '-f', 'null', '-'],
+        capture_output=True, text=True, timeout=120
+    )
+    return tail_decode_problem(tail.returncode, tail.stderr)
+
+
+def tail_decode_problem(returncode: int, stderr: str) -> Optional[str]:
+    """Judge the tail decode: a failed exit or a decode error, not any warning"""
+    errors = [line for line in stderr.splitlines() if DECODE_ERRORS.search(line)]
+    if returncode != 0 or errors:
+        return f"tail does not decode: {(' '.join(errors) or stderr).strip()[:200]}"
+    return None
+
+
+def run_download_task(task: DownloadTask) -> Dict[str, Any]:
+    """
+    Worker-process entry point: fetch one source through the source cache.
+
+    Returns: {"path": str, "cache_hit": bool, "info": {...} or None, "metrics": {...}}
+    """
+    import yt_dlp
+
+    cache = SourceCache(settings.source_cache_path)
+    slots = DownloadSlots(settings.download_slots_path, settings.download_concurrency)
+    token = None
+    if task.cancel_keys:
+        from redis import Redis
+        token = CancelToken(Redis.from_url(settings.redis_url), task.cancel_keys)
+    info: Dict[str, Any] = {}
+    metrics = DownloadMetrics(
+        youtube_id=task.youtube_id,
+        cache_key=task.cache_key,
+        cache_hit=True,
+        fragment_concurrency=settings.download_fragment_concurrency,
+    )
+
+    def download(work_dir: Path) -> Path:
+        opts = {**task.ydl_opts, **_transport_opts()}
+        opts['outtmpl'] = str(work_dir / f"{task.file_name}.%(ext)s")
+        if task.section:
+            opts['download_ranges'] = yt_dlp.utils.download_range_func(None, [task.section])
+
+        with slots.acquire():
+            metrics.resumed_bytes = _partial_bytes(work_dir)
+            if metrics.resumed_bytes:
+                logger.info(f"Resuming {task.youtube_id}: {metrics.resumed_bytes} bytes already on disk")
+            started = time.monotonic()
+            result = _run_ydl(task, opts, slots, token)
+            metrics.elapsed += time.monotonic() - started
+
+        metrics.cache_hit = False
+        metrics.attempts += 1
+        info.update({k: result.get(k) for k in INFO_FIELDS})
+        return work_dir / f"{task.file_name}.mp4"
+
+    if task.section:
+        expected_duration = task.section[1] - task.section[0]
+    else:
+        expected_duration = (task.cached_info or {}).get('duration')
+
+    for attempt in range(2):
+        try:
+            path, cache_hit = cache.fetch(task.youtube_id, task.cache_key, Path(task.dest), download)
+        except yt_dlp.utils.DownloadCancelled:
+            # Nobody will resume it: drop the partial files
+            shutil.rmtree(cache.work_dir(task.youtube_id, task.cache_key), ignore_errors=True)
+            logger.info(f"Download of {task.youtube_id} ({task.cache_key}) cancelled")
+            raise JobCancelled(f"Download of {task.youtube_id} cancelled")
+        if cache_hit and cache.is_verified(task.youtube_id, task.cache_key):
+            break
+        problem = verify_media(str(path), expected_duration or info.get('duration'))
+        if problem is None:
+            cache.mark_verified(task.youtube_id, task.cache_key)
+            break
+
+        logger.warning(f"Integrity check failed for {task.youtube_id} ({task.cache_key}): {problem}")
+        # Drop the entry and any resume state so the retry starts clean
+        cache.invalidate(task.youtube_id, task.cache_key)
+        shutil.rmtree(cache.work_dir(task.youtube_id, task.cache_key), ignore_errors=True)
+        Path(path).unlink(missing_ok=True)
+    else:
+        raise MediaIntegrityError(f"{task.youtube_id} ({task.cache_key}): {problem}")
+
+    if not metrics.cache_hit:
+        metrics.bytes = os.path.getsize(path)
+        if metrics.elapsed > 0:
+            metrics.throughput_mbps = round((metrics.bytes - metrics.resumed_bytes) * 8 / metrics.elapsed / 1e6, 2)
+        metrics.elapsed = round(metrics.elapsed, 2)
+        logger.info(
+            f"Downloaded {task.youtube_id} ({task.cache_key}): {metrics.bytes} bytes in "
+            f"{metrics.elapsed}s, {metrics.throughput_mbps} Mbps, resumed {metrics.resumed_bytes} bytes"
+        )
+
+    return {"path": str(path), "cache_hit": cache_hit, "info": info or None, "metrics": metrics.to_dict()}
+
+
+class DownloadPool:
+    """Process pool that runs DownloadTasks off the event loop"""
+
+    def __init__(self, max_workers: int):
+        # spawn: workers must not inherit the API's event loop or DB connections
+        self.executor = ProcessPoolExecutor(
+            max_workers=max(1, max_workers),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+    async def run(self, task: DownloadTask) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, run_download_task, task)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class InlineDownloadPool:
+    """Runs DownloadTasks in a thread of the current process"""
+
+    async def run(self, task: DownloadTask) -> Dict[str, Any]:
+        return await asyncio.to_thread(run_download_task, task)
+
+    def shutdown(self):
+        pass
+
+
+_pool: Optional[DownloadPool] = None
+_inline = False
+
+
+def run_downloads_inline():
+    """Make get_download_pool() run downloads in-process (call before an RQ worker forks work horses)"""
+    global _inline
+    _inline = True
+
+
+def get_download_pool() -> DownloadPool:
+    """Process-wide download pool, created on first use"""
+    global _pool
+    if _pool is None:
+        _pool = InlineDownloadPool() if _inline else DownloadPool(settings.download_concurrency)
+    return _pool
+
+
+def shutdown_download_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
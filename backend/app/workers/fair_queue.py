@@ -0,0 +1,206 @@
+"""
+Fair Queue - Weighted deficit round-robin in front of the RQ class queues
+
+Pipeline tasks are not put on their resource-class RQ queue directly. They wait in
+per-flow Redis lists (a flow is one user's work of one priority class),
+and a dispatcher keeps only a few tasks ready on the RQ queue - about one
+per idle worker - choosing them by deficit round-robin:
+
+- every visit credits a flow quantum * weight seconds of work
+- a flow dispatches head tasks while their cost (estimated seconds of
+  media) fits its credit, then the next flow gets its turn
+
+So a user with a 3-hour video or a whole playlist gets the same share of
+workers as a user with a 5-minute video, instead of everything they
+submitted running first. Lower-priority classes get a smaller weight.
+
+Dispatch runs whenever a task is pushed or a worker finishes a task,
+under a short Redis lock; any process can do it. A dispatch that finds
+the lock taken leaves a dirty flag, and the holder runs again after
+releasing it, so a task pushed mid-dispatch is not stranded until the
+next push. Interactive work (editor
+renders) bypasses this and goes to its own RQ queue, which encode workers
+check first.
+"""
+
+import json
+import logging
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "fair_queue:"
+
+# Priority class -> DRR weight
+PRIORITY_WEIGHTS = {
+    "standard": 1.0,
+    "bulk": 0.25,
+}
+
+
+def task_spec(func: Callable, args: tuple, kwargs: Dict, job_id: Optional[int] = None) -> Dict:
+    """JSON-serialisable RQ call (function by import path), replayable later"""
+    return {
+        'func': f"{func.__module__}.{func.__qualname__}",
+        'args': list(args),
+        'kwargs': kwargs,
+        'job_id': job_id,
+    }
+
+
+class DeficitRoundRobin:
+    """Weighted DRR over flows of task costs"""
+
+    def __init__(self, quantum: float):
+        if quantum <= 0:
+            raise ValueError("quantum must be positive")
+        self.quantum = quantum
+
+    def schedule(
+        self,
+        ring: List[str],
+        deficits: Dict[str, float],
+        weights: Dict[str, float],
+        queues: Dict[str, List[float]],
+        slots: int
+    ) -> Tuple[List[str], List[str], Dict[str, float]]:
+        """
+        Pick up to `slots` tasks.
+
+        queues holds the costs of each flow's waiting tasks, head first.
+        Returns the flows to pop from (in dispatch order), the new ring
+        order and the new deficits; emptied flows leave the ring.
+        """
+        ring = [flow for flow in ring if queues.get(flow)]
+        pending = {flow: deque(queues[flow]) for flow in ring}
+        deficits = {flow: deficits.get(flow, 0.0) for flow in ring}
+        picks: List[str] = []
+
+        while slots > 0 and ring:
+            flow = ring[0]
+            queue = pending[flow]
+            deficits[flow] += self.quantum * weights.get(flow, 1.0)
+            while queue and queue[0] <= deficits[flow] and slots > 0:
+                deficits[flow] -= queue.popleft()
+                picks.append(flow)
+                slots -= 1
+
+            ring.pop(0)
+            if queue:
+                ring.append(flow)
+            else:
+                # An idle flow does not bank credit
+                del deficits[flow]
+
+        return picks, ring, deficits
+
+
+class FairQueue:
+    """Per-flow task lists in Redis, dispatched to an RQ queue by DRR"""
+
+    def __init__(
+        self,
+        redis_client,
+        rq_queue,
+        quantum: float,
+        depth: int,
+        on_dispatch: Optional[Callable[[int, object], None]] = None,
+        lock_ms: int = 5000
+    ):
+        self.redis = redis_client
+        self.rq_queue = rq_queue
+        self.drr = DeficitRoundRobin(quantum)
+        self.depth = depth
+        self.on_dispatch = on_dispatch
+        self.lock_ms = lock_ms
+
+    def _key(self, name: str) -> str:
+        return f"{KEY_PREFIX}{self.rq_queue.name}:{name}"
+
+    def push(self, flow: str, weight: float, cost: float, job_id: int, func: Callable, *args, **kwargs):
+        """Queue `func(*args)` (JSON-serialisable args) for `flow`, then dispatch"""
+        spec = json.dumps(task_spec(func, args, kwargs, job_id))
+        pipe = self.redis.pipeline()
+        pipe.rpush(self._key(f"tasks:{flow}"), spec)
+        pipe.rpush(self._key(f"costs:{flow}"), max(0.0, float(cost)))
+        pipe.hset(self._key("weights"), flow, weight)
+        # Registered after the task, so a concurrent dispatch never drops the flow
+        pipe.sadd(self._key("flows"), flow)
+        pipe.execute()
+        self.dispatch()
+
+    def waiting(self) -> Dict[str, int]:
+        """Tasks waiting per flow"""
+        flows = [f.decode() for f in self.redis.smembers(self._key("flows"))]
+        return {flow: self.redis.llen(self._key(f"tasks:{flow}")) for flow in flows}
+
+    def dispatch(self) -> int:
+        """Top the RQ queue up to `depth` ready tasks; returns how many were moved"""
+        lock, dirty = self._key("lock"), self._key("dirty")
+        moved = 0
+        while self._acquire(lock, dirty):
+            try:
+                # Flags raised from here on mean another pass is needed
+                self.redis.delete(dirty)
+                moved += self._dispatch_locked()
+            finally:
+                self.redis.delete(lock)
+            if not self.redis.exists(dirty):
+                break
+        return moved
+
+    def _acquire(self, lock: str, dirty: str) -> bool:
+        if self.redis.set(lock, 1, nx=True, px=self.lock_ms):
+            return True
+        # Another process is dispatching: ask it for another pass, and retry
+        # in case it released the lock before the flag landed
+        self.redis.set(dirty, 1, px=self.lock_ms)
+        return bool(self.redis.set(lock, 1, nx=True, px=self.lock_ms))
+
+    def _dispatch_locked(self) -> int:
+        slots = self.depth - self.rq_queue.count
+        if slots <= 0:
+            return 0
+
+        flows = {f.decode() for f in self.redis.smembers(self._key("flows"))}
+        stored_ring = [f.decode() for f in self.redis.lrange(self._key("ring"), 0, -1)]
+        ring = [f for f in stored_ring if f in flows] + sorted(flows.difference(stored_ring))
+        deficits = {k.decode(): float(v) for k, v in self.redis.hgetall(self._key("deficits")).items()}
+        weights = {k.decode(): float(v) for k, v in self.redis.hgetall(self._key("weights")).items()}
+        queues = {
+            flow: [float(c) for c in self.redis.lrange(self._key(f"costs:{flow}"), 0, -1)]
+            for flow in ring
+        }
+
+        picks, ring, deficits = self.drr.schedule(ring, deficits, weights, queues, slots)
+
+        for flow in picks:
+            raw = self.redis.lpop(self._key(f"tasks:{flow}"))
+            self.redis.lpop(self._key(f"costs:{flow}"))
+            if raw is None:
+                continue
+            spec = json.loads(raw)
+            rq_job = self.rq_queue.enqueue(spec['func'], *spec['args'], **spec['kwargs'])
+            if self.on_dispatch:
+                self.on_dispatch(spec['job_id'], rq_job)
+
+        self._save(ring, deficits, flows)
+        if picks:
+            logger.info(f"Fair queue dispatched {len(picks)} task(s): {picks}")
+        return len(picks)
+
+    def _save(self, ring: List[str], deficits: Dict[str, float], flows):
+        pipe = self.redis.pipeline()
+        pipe.delete(self._key("ring"), self._key("deficits"))
+        if ring:
+            pipe.rpush(self._key("ring"), *ring)
+        if deficits:
+            pipe.hset(self._key("deficits"), mapping=deficits)
+        pipe.execute()
+
+        # Unregister drained flows; re-register if a push raced in
+        for flow in flows.difference(ring):
+            self.redis.srem(self._key("flows"), flow)
+            if self.redis.llen(self._key(f"tasks:{flow}")):
+                self.redis.sadd(self._key("flows"), flow)
@@ -0,0 +1,207 @@
+"""
+CPU Isolation - Keep encodes from starving the API on a shared host
+
+On a single VPS, uvicorn and ffmpeg compete for the same cores. Encode
+work can be confined with any combination of:
+
+- nice: lower CPU priority (ENCODE_NICE)
+- ionice: lower disk priority, "idle" or "best-effort[:level]" (ENCODE_IONICE)
+- CPU affinity: a core list such as "2-7" (ENCODE_CPUS)
+- cgroup v2: a directory under /sys/fs/cgroup, e.g. a systemd slice with
+  a CPUWeight/CPUQuota (ENCODE_CGROUP)
+
+Encode workers apply the profile to themselves at startup, so every ffmpeg
+they start inherits it. ffmpeg started anywhere else (the API's inline
+backend), or whatever part of the profile a worker could not apply to
+itself (e.g. a cgroup that is not delegated to it), is applied per command
+through `nice`/`ionice`/`taskset` instead (wrap_command). The API pins
+itself to API_CPUS, and its request latency histogram
+(http_request_duration_seconds) shows the effect. Under systemd,
+infrastructure/systemd/gravix-workers.slice gives all workers a low CPU
+and I/O weight on top.
+"""
+
+import logging
+import os
+import shutil
+import subprocess
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import FrozenSet, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+IONICE_CLASSES = {"realtime": 1, "best-effort": 2, "idle": 3}
+
+
+@dataclass(frozen=True)
+class IsolationProfile:
+    nice: int = 0
+    ionice: str = ""
+    cpus: FrozenSet[int] = frozenset()
+    cgroup: str = ""
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.nice or self.ionice or self.cpus or self.cgroup)
+
+
+_applied = IsolationProfile()  # What isolate_current_process applied to this process
+
+
+def parse_cpu_list(spec: str) -> FrozenSet[int]:
+    """"0-1,4" -> {0, 1, 4}"""
+    cpus = set()
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        first, _, last = part.partition("-")
+        cpus.update(range(int(first), int(last or first) + 1))
+    return frozenset(cpus)
+
+
+def parse_ionice(spec: str) -> Optional[Tuple[int, Optional[int]]]:
+    """"best-effort:7" -> (2, 7); "idle" -> (3, None); "" -> None"""
+    if not spec:
+        return None
+    name, _, level = spec.partition(":")
+    if name not in IONICE_CLASSES:
+        raise ValueError(f"Unknown ionice class: {name}")
+    return IONICE_CLASSES[name], int(level) if level else None
+
+
+def _settings():
+    # Imported late so the profile helpers stay usable without app settings
+    from app.core.config import get_settings
+    return get_settings()
+
+
+def encode_profile() -> IsolationProfile:
+    settings = _settings()
+    return IsolationProfile(
+        nice=settings.encode_nice,
+        ionice=settings.encode_ionice,
+        cpus=parse_cpu_list(settings.encode_cpus),
+        cgroup=settings.encode_cgroup,
+    )
+
+
+def _ionice_args(ionice: Tuple[int, Optional[int]]) -> List[str]:
+    io_class, level = ionice
+    return ["-c", str(io_class)] + (["-n", str(level)] if level is not None else [])
+
+
+@lru_cache(maxsize=None)
+def _tool(name: str) -> Optional[str]:
+    return shutil.which(name)
+
+
+def command_prefix(profile: IsolationProfile) -> List[str]:
+    """nice/ionice/taskset wrapper for a command (tools that are missing are skipped)"""
+    prefix: List[str] = []
+    ionice = parse_ionice(profile.ionice)
+    if ionice and _tool("ionice"):
+        prefix += [_tool("ionice"), *_ionice_args(ionice)]
+    if profile.nice and _tool("nice"):
+        prefix += [_tool("nice"), "-n", str(profile.nice)]
+    if profile.cpus and _tool("taskset"):
+        prefix += [_tool("taskset"), "-c", ",".join(str(c) for c in sorted(profile.cpus))]
+    return prefix
+
+
+def join_cgroup(cgroup: str, pid: int):
+    """Move a process (all its threads) into a cgroup v2 group"""
+    path = CGROUP_ROOT / cgroup.strip("/") / "cgroup.procs"
+    path.write_text(str(pid))
+
+
+def isolate_current_process(profile: Optional[IsolationProfile] = None):
+    """
+    Apply the profile to this process; its children inherit it.
+
+    Call at startup, before threads are started (nice and affinity are
+    per-thread on Linux). Each setting is applied on its own: one that
+    fails is left to wrap_command / cgroup_for_spawned.
+    """
+    global _applied
+    profile = profile or encode_profile()
+    if not profile.enabled:
+        return
+
+    pid = os.getpid()
+    ionice = parse_ionice(profile.ionice)
+    applied = {}
+    failures: List[str] = []
+
+    def attempt(setting: str, apply, *args) -> bool:
+        try:
+            apply(*args)
+            applied[setting] = getattr(profile, setting)
+            return True
+        except (OSError, subprocess.SubprocessError) as e:
+            failures.append(f"{setting}: {str(e)}")
+            return False
+
+    if profile.cgroup:
+        attempt("cgroup", join_cgroup, profile.cgroup, pid)
+    if profile.nice:
+        attempt("nice", os.setpriority, os.PRIO_PROCESS, 0, profile.nice)
+    if profile.cpus:
+        attempt("cpus", os.sched_setaffinity, 0, profile.cpus)
+    if ionice and _tool("ionice"):
+        attempt("ionice", lambda: subprocess.run(
+            [_tool("ionice"), *_ionice_args(ionice), "-p", str(pid)], check=True, timeout=5
+        ))
+
+    _applied = IsolationProfile(**applied)
+    if failures:
+        logger.warning(f"Worker {pid} only partly isolated, encodes are wrapped for the rest: {'; '.join(failures)}")
+    logger.info(f"Worker {pid} isolated: {_applied}")
+
+
+def _not_applied(profile: IsolationProfile) -> IsolationProfile:
+    """The part of `profile` this process does not already run under"""
+    return IsolationProfile(
+        nice=0 if _applied.nice else profile.nice,
+        ionice="" if _applied.ionice else profile.ionice,
+        cpus=frozenset() if _applied.cpus else profile.cpus,
+        cgroup="" if _applied.cgroup else profile.cgroup,
+    )
+
+
+def wrap_command(cmd: List[str]) -> List[str]:
+    """Run an encode command under the profile, minus what this process already applied"""
+    profile = _not_applied(encode_profile())
+    if not profile.enabled:
+        return cmd
+    return command_prefix(profile) + cmd
+
+
+def cgroup_for_spawned(pid: int):
+    """Move a just-started encode process into the encode cgroup (wrap_command cannot)"""
+    cgroup = _settings().encode_cgroup
+    if _applied.cgroup or not cgroup:
+        return
+    try:
+        join_cgroup(cgroup, pid)
+    except OSError as e:
+        logger.debug(f"Could not move {pid} into {cgroup}: {str(e)}")
+
+
+def pin_api_process():
+    """
+    Keep the API on its reserved cores (API_CPUS).
+
+    Encodes should then be kept off them with ENCODE_CPUS; systemd's
+    CPUAffinity= does the same for the whole service.
+    """
+    cpus = parse_cpu_list(_settings().api_cpus)
+    if not cpus:
+        return
+    try:
+        # Affinity is per thread: pin the ones already running, new ones inherit
+        for tid in os.listdir("/proc/self/task"):
+            os.sched_setaffinity(int(tid), cpus)
+        logger.info(f"API pinned to CPUs {sorted(cpus)}")
+    except OSError as e:
+        logger.warning(f"Could not pin API to CPUs {sorted(cpus)}: {str(e)}")
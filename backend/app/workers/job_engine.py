@@ -0,0 +1,449 @@
+"""
+Job Engine - Stage DAG pipelines executed by RQ workers
+
+A pipeline run is a parent Job row (job_type "<pipeline>_pipeline") plus
+one Job row per stage task. Every task is an RQ job, so any worker on any
+node attached to the same Redis can run it. There is no coordinator
+process: when a task completes, the worker that ran it records the
+completion in Redis and enqueues whatever became runnable, so the graph
+advances for as long as some worker is alive.
+
+The per-run bookkeeping lives in Redis (see pipeline_state.PipelineState).
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.core.config import get_settings
+from app.core.metrics import flush_metrics
+from app.db.database import SessionLocal
+from app.models.reel import Job, JobStatus
+from app.models.video import Video, VideoStatus
+from app.workers.dag import VIDEO_PIPELINE, Stage, StageGraph
+from app.services.progress_events import publish_video_status
+from app.workers.cancellation import CancelToken, cancel_scope
+from app.workers.pipeline_state import PipelineState
+from app.workers.retry_policy import Heartbeat, is_retryable
+from app.workers.rq_worker import (
+    begin_attempt, cancel_jobs, create_job_record, dispatch_waiting, fail_or_retry, flush_job_progress,
+    mark_cancelled, redis_conn, submit, update_job_status
+)
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+PIPELINES: Dict[str, StageGraph] = {VIDEO_PIPELINE.name: VIDEO_PIPELINE}
+
+# async handler(job_id, context, upstream_results, item) -> result dict,
+# or None when the handler re-queued its Job and will finish it later
+StageHandler = Callable[[int, Dict, List[Dict], Optional[Dict]], Awaitable[Optional[Dict]]]
+STAGE_HANDLERS: Dict[Tuple[str, str], StageHandler] = {}
+
+
+def stage_handler(pipeline: str, stage: str):
+    """Register the coroutine that runs one task of `pipeline`.`stage`"""
+    def register(func: StageHandler) -> StageHandler:
+        STAGE_HANDLERS[(pipeline, stage)] = func
+        return func
+    return register
+
+
+def start_pipeline(
+    pipeline: str,
+    user_id: int,
+    video_id: Optional[int] = None,
+    priority: str = "standard",
+    cost: float = 1.0,
+    **options
+) -> int:
+    """
+    Create the parent Job row and enqueue the root stages.
+
+    Tasks are fair-queued per user and priority class; cost is the
+    estimated seconds of media of a whole-video task (fan-out tasks use
+    their item's duration). options enable optional stages by name (and
+    carry their parameters). Returns the parent Job id.
+    """
+    graph = PIPELINES[pipeline]
+    pipeline_id = create_job_record(f"{graph.name}_pipeline", user_id, video_id, status=JobStatus.PROCESSING)
+
+    state = PipelineState(redis_conn, pipeline_id)
+    context = {
+        'pipeline': graph.name,
+        'user_id': user_id,
+        'video_id': video_id,
+        'priority': priority,
+        'cost': cost,
+        'options': options,
+    }
+    state.save_context(context)
+
+    for stage in graph.roots():
+        _schedule(state, graph, stage, context)
+
+    logger.info(f"Started {graph.name} pipeline {pipeline_id} (video_id={video_id})")
+    return pipeline_id
+
+
+def start_video_pipeline(
+    video_id: int,
+    user_id: int,
+    instagram_account_id: Optional[int] = None,
+    priority: str = "standard",
+    media_seconds: Optional[float] = None
+) -> int:
+    """Download -> cut -> verticalize -> AI, and queue the reels for upload if an account is given"""
+    return start_pipeline(
+        VIDEO_PIPELINE.name, user_id, video_id,
+        priority=priority,
+        cost=media_seconds or settings.chunk_duration,
+        publish=instagram_account_id
+    )
+
+
+def run_stage(pipeline_id: int, stage_name: str, job_id: int, upstream_ids: List[int], item: Optional[Dict] = None):
+    """RQ entry point for one stage task"""
+    try:
+        _run_stage(pipeline_id, stage_name, job_id, upstream_ids, item)
+    finally:
+        flush_job_progress()
+        dispatch_waiting()
+        flush_metrics()
+
+
+def _run_stage(pipeline_id: int, stage_name: str, job_id: int, upstream_ids: List[int], item: Optional[Dict]):
+    state = PipelineState(redis_conn, pipeline_id)
+    context = state.context()
+    if context is None:
+        update_job_status(job_id, JobStatus.FAILED, 0, error="Pipeline state expired")
+        return
+
+    handler = STAGE_HANDLERS[(context['pipeline'], stage_name)]
+    previous = begin_attempt(job_id)
+    if previous == JobStatus.COMPLETED:
+        # Duplicate delivery (or the reaper re-queued a task that did finish)
+        _task_completed(state, context, stage_name, job_id)
+        return
+    if previous in (None, JobStatus.FAILED, JobStatus.CANCELLED):
+        return
+
+    token = CancelToken.for_job(redis_conn, job_id, context.get('video_id'))
+    try:
+        with cancel_scope(token), Heartbeat(redis_conn, job_id, settings.job_heartbeat_ttl):
+            result = asyncio.run(handler(job_id, context, _load_results(upstream_ids), item))
+    except Exception as e:
+        if token.cancelled:
+            # Whoever cancelled the run has closed it; just record the stop
+            mark_cancelled(job_id)
+            return
+        logger.error(f"Pipeline {pipeline_id} stage {stage_name} (job {job_id}) error: {str(e)}")
+        if not fail_or_retry(job_id, str(e), is_retryable(e)):
+            _fail(state, context, f"{stage_name}: {str(e)}")
+        return
+
+    if result is None:
+        # Re-queued by the handler; rq_worker.run_job continues the pipeline
+        return
+
+    update_job_status(job_id, JobStatus.COMPLETED, 100, result)
+    _task_completed(state, context, stage_name, job_id)
+
+
+def on_job_finished(job_id: int):
+    """Continue the pipeline a re-queued stage task belongs to, if any"""
+    found = PipelineState.for_task(redis_conn, job_id)
+    if found is None:
+        return
+    state, stage_name = found
+    context = state.context()
+    if context is None:
+        return
+
+    db = SessionLocal()
+    try:
+        job = db.query(Job).filter(Job.id == job_id).first()
+        status, error = (job.status, job.error_message) if job else (JobStatus.FAILED, "Job row missing")
+    finally:
+        db.close()
+
+    if status == JobStatus.COMPLETED:
+        _task_completed(state, context, stage_name, job_id)
+    elif status == JobStatus.FAILED:
+        _fail(state, context, f"{stage_name}: {error}")
+
+
+def cancel_video(video_id: int) -> List[int]:
+    """
+    Stop all in-flight work for a video: its pipeline runs are closed (no
+    further stages get scheduled) and its unfinished jobs are cancelled.
+    Returns the cancelled job ids.
+    """
+    db = SessionLocal()
+    try:
+        jobs = db.query(Job.id, Job.job_type).filter(
+            Job.video_id == video_id,
+            Job.status.in_([JobStatus.PENDING, JobStatus.PROCESSING])
+        ).all()
+    finally:
+        db.close()
+
+    for job_id, job_type in jobs:
+        if job_type.endswith("_pipeline"):
+            try:
+                PipelineState(redis_conn, job_id).finish()
+            except Exception as e:
+                # The Job rows are still cancelled below; stages check them before running
+                logger.error(f"Could not close pipeline {job_id} of video {video_id}: {str(e)}")
+    job_ids = [job_id for job_id, _ in jobs]
+    cancel_jobs(job_ids, video_id)
+    if job_ids:
+        logger.info(f"Cancelled {len(job_ids)} job(s) of video {video_id}")
+    return job_ids
+
+
+def reopen_for_task(job_id: int):
+    """Put the run of a dead-lettered stage task back in flight before it is replayed"""
+    found = PipelineState.for_task(redis_conn, job_id)
+    if found is None:
+        return
+    state, _ = found
+    context = state.context()
+    if context is None:
+        return
+    state.reopen()
+    update_job_status(state.pipeline_id, JobStatus.PROCESSING, 0)
+    if context.get('video_id'):
+        _set_video_status(context['video_id'], VideoStatus.PROCESSING)
+
+
+def _task_completed(state: PipelineState, context: Dict, stage_name: str, job_id: int):
+    if state.task_finished(stage_name, job_id):
+        graph = PIPELINES[context['pipeline']]
+        _stage_done(state, graph, graph.stages[stage_name], context)
+
+
+def _stage_done(state: PipelineState, graph: StageGraph, stage: Stage, context: Dict):
+    done = state.mark_done(stage.name)
+    for downstream in graph.downstream(stage.name):
+        if all(dep in done for dep in downstream.depends_on):
+            _schedule(state, graph, downstream, context)
+
+    if len(done) == len(graph.stages) and state.finish():
+        update_job_status(
+            state.pipeline_id, JobStatus.COMPLETED, 100,
+            {'stages': {name: state.tasks(name) for name in graph.stages}}
+        )
+        if context.get('video_id'):
+            _set_video_status(context['video_id'], VideoStatus.COMPLETED)
+        logger.info(f"{graph.name} pipeline {state.pipeline_id} complete")
+
+
+def _schedule(state: PipelineState, graph: StageGraph, stage: Stage, context: Dict):
+    """Create and enqueue the tasks of a stage whose dependencies are all done"""
+    if not state.claim(stage.name):
+        return
+    if not graph.enabled(stage, context['options']):
+        _stage_done(state, graph, stage, context)
+        return
+
+    upstream_ids = [job_id for dep in stage.depends_on for job_id in state.tasks(dep)]
+    if stage.fan_out:
+        items = [item for result in _load_results(upstream_ids) for item in result.get('items') or []]
+    else:
+        items = [None]
+    if not items:
+        _stage_done(state, graph, stage, context)
+        return
+
+    job_ids = [create_job_record(stage.job_type, context['user_id'], context['video_id']) for _ in items]
+    state.add_tasks(stage.name, job_ids)
+    for job_id, item in zip(job_ids, items):
+        submit(
+            job_id, run_stage, state.pipeline_id, stage.name, job_id, upstream_ids, item,
+            job_type=stage.job_type,
+            user_id=context['user_id'],
+            priority=context.get('priority', "standard"),
+            cost=(item or {}).get('duration') or context.get('cost', 1.0)
+        )
+
+    logger.info(f"Pipeline {state.pipeline_id}: enqueued {len(job_ids)} {stage.name} task(s)")
+
+
+def _fail(state: PipelineState, context: Dict, error: str):
+    if not state.finish():
+        return
+    update_job_status(state.pipeline_id, JobStatus.FAILED, 0, error=error)
+    if context.get('video_id'):
+        _set_video_status(context['video_id'], VideoStatus.FAILED, error)
+
+
+def _load_results(job_ids: List[int]) -> List[Dict]:
+    """Job.result of each id, in the given order"""
+    if not job_ids:
+        return []
+    db = SessionLocal()
+    try:
+        results = dict(db.query(Job.id, Job.result).filter(Job.id.in_(job_ids)).all())
+    finally:
+        db.close()
+    return [results.get(job_id) or {} for job_id in job_ids]
+
+
+def _set_video_status(video_id: int, status: VideoStatus, error: Optional[str] = None):
+    db = SessionLocal()
+    try:
+        video = db.query(Video).filter(Video.id == video_id).first()
+        if video:
+            video.status = status
+            video.error_message = error
+            db.commit()
+            publish_video_status(video, redis_conn)
+    finally:
+        db.close()
+
+
+# Video pipeline stages
+
+@stage_handler("video", "download")
+async def _download_stage(job_id: int, context: Dict, upstream: List[Dict], item: Optional[Dict]) -> Dict:
+    from app.services.youtube_service import YouTubeService
+    from app.services.time_ranges import parse_ranges
+    from app.services.video_orchestrator import apply_download_result
+
+    db = SessionLocal()
+    try:
+        video = db.query(Video).filter(Video.id == context['video_id']).first()
+        video.status = VideoStatus.DOWNLOADING
+        db.commit()
+        publish_video_status(video, redis_conn)
+
+        time_ranges = parse_ranges((video.video_metadata or {}).get('time_ranges'))
+        success, result = await YouTubeService().download_video(
+            video.youtube_url, video.youtube_video_id, time_ranges=time_ranges or None, job_id=job_id,
+            source_duration=video.duration
+        )
+        if not success or not result:
+            raise RuntimeError("Download failed")
+
+        apply_download_result(video, result)
+        db.commit()
+        publish_video_status(video, redis_conn)
+    finally:
+        db.close()
+
+    # Job.result is JSON: store the transcript index in its dict form
+    transcript = result.get('transcript')
+    return {**result, 'transcript': transcript.to_dict() if transcript else None}
+
+
+@stage_handler("video", "cut")
+async def _cut_stage(job_id: int, context: Dict, upstream: List[Dict], item: Optional[Dict]) -> Dict:
+    from app.models.video import VideoChunk
+    from app.services.transcript_index import TranscriptIndex
+    from app.services.video_orchestrator import VideoOrchestrator, save_chunks
+
+    db = SessionLocal()
+    try:
+        video = db.query(Video).filter(Video.id == context['video_id']).first()
+        video.status = VideoStatus.PROCESSING
+        db.commit()
+        publish_video_status(video, redis_conn)
+
+        # A retried attempt replaces the chunks of the earlier one
+        db.query(VideoChunk).filter(VideoChunk.video_id == video.id).delete(synchronize_session=False)
+
+        transcript_index = TranscriptIndex.from_dict(video.transcript_segments) if video.transcript_segments else None
+        chunks = await VideoOrchestrator(db).cut_chunks(db, video, upstream[0], transcript_index)
+        records = save_chunks(db, video, chunks)
+        db.commit()
+
+        # One verticalize task per chunk
+        return {'items': [
+            {
+                'chunk_id': r.id,
+                'chunk_number': r.chunk_number,
+                'start_time': r.start_time,
+                'end_time': r.end_time,
+                'duration': r.duration,
+                'file_path': r.file_path,
+            }
+            for r in records
+        ]}
+    finally:
+        db.close()
+
+
+@stage_handler("video", "verticalize")
+async def _verticalize_stage(job_id: int, context: Dict, upstream: List[Dict], item: Optional[Dict]) -> Dict:
+    from app.services.video_service import VideoProcessingService
+
+    db = SessionLocal()
+    try:
+        youtube_video_id = db.query(Video.youtube_video_id).filter(Video.id == context['video_id']).scalar()
+    finally:
+        db.close()
+
+    success, reels = await VideoProcessingService().convert_to_vertical_reels([item], youtube_video_id)
+    if not success:
+        raise RuntimeError(f"Vertical conversion failed for chunk {item['chunk_number']}")
+    return {'reel': {**reels[0], 'chunk_id': item['chunk_id']}}
+
+
+@stage_handler("video", "ai")
+async def _ai_stage(job_id: int, context: Dict, upstream: List[Dict], item: Optional[Dict]) -> Optional[Dict]:
+    from app.workers.rq_worker import process_ai_generation_job
+
+    # Fan-in: every verticalize task's reel, in chunk order
+    reels = sorted((result['reel'] for result in upstream), key=lambda r: r['chunk_number'])
+
+    db = SessionLocal()
+    try:
+        video = db.query(Video).filter(Video.id == context['video_id']).first()
+        transcript, custom_caption = video.transcript, video.custom_caption
+    finally:
+        db.close()
+
+    await process_ai_generation_job(job_id, reels, transcript, custom_caption, context['video_id'])
+
+    # The legacy job records its own outcome (and may have re-queued itself)
+    db = SessionLocal()
+    try:
+        job = db.query(Job).filter(Job.id == job_id).first()
+        if job.status == JobStatus.FAILED:
+            raise RuntimeError(job.error_message or "AI generation failed")
+        return job.result if job.status == JobStatus.COMPLETED else None
+    finally:
+        db.close()
+
+
+@stage_handler("video", "publish")
+async def _publish_stage(job_id: int, context: Dict, upstream: List[Dict], item: Optional[Dict]) -> Dict:
+    from app.models.reel import Reel
+    from app.models.reel_schedule import ReelSchedule, ScheduleStatus
+
+    db = SessionLocal()
+    try:
+        reels = db.query(Reel).filter(Reel.video_id == context['video_id']).order_by(Reel.reel_number).all()
+        account_id = context['options']['publish']
+        # Reels a previous attempt already queued
+        scheduled = {
+            reel_id for (reel_id,) in db.query(ReelSchedule.reel_id).filter(
+                ReelSchedule.reel_id.in_([reel.id for reel in reels]),
+                ReelSchedule.instagram_account_id == account_id
+            )
+        }
+        for reel in reels:
+            if reel.id in scheduled:
+                continue
+            db.add(ReelSchedule(
+                reel_id=reel.id,
+                instagram_account_id=account_id,
+                user_id=context['user_id'],
+                status=ScheduleStatus.READY_FOR_UPLOAD,
+            ))
+            reel.publish_status = 'queued'
+        db.commit()
+        return {'queued_reels': [reel.id for reel in reels]}
+    finally:
+        db.close()
@@ -0,0 +1,108 @@
+"""
+Node Load - Live resource signals of the host a worker supervisor runs on
+
+Read straight from /proc (no extra dependency):
+
+- CPU utilization and I/O wait: deltas of the aggregate line of /proc/stat
+  between two samples
+- Memory headroom: MemAvailable from /proc/meminfo
+- ffmpeg footprint: summed VmRSS of every running ffmpeg process, which is
+  what an additional encode task will roughly cost
+
+Off Linux every signal reads as idle, so callers fall back to their floors
+and ceilings.
+"""
+
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+PROC = Path("/proc")
+
+
+@dataclass
+class NodeLoad:
+    """One sample of the host's load"""
+    cpu: float = 0.0  # Busy share of all cores, 0-1
+    iowait: float = 0.0  # Share of CPU time waiting on disk, 0-1
+    memory_available: Optional[int] = None  # Bytes; None if unknown
+    ffmpeg_rss: int = 0  # Bytes, all ffmpeg processes
+    ffmpeg_count: int = 0
+
+
+def parse_cpu_times(stat: str) -> Tuple[int, int, int]:
+    """(total, idle, iowait) jiffies from the aggregate "cpu" line of /proc/stat"""
+    for line in stat.splitlines():
+        if line.startswith("cpu "):
+            values = [int(v) for v in line.split()[1:]]
+            # guest and guest_nice are already counted in user and nice
+            total = sum(values[:8])
+            return total, values[3], values[4] if len(values) > 4 else 0
+    raise ValueError("no aggregate cpu line")
+
+
+def parse_meminfo(meminfo: str) -> Dict[str, int]:
+    """Fields of /proc/meminfo in bytes"""
+    fields = {}
+    for line in meminfo.splitlines():
+        name, _, rest = line.partition(":")
+        parts = rest.split()
+        if parts and parts[0].isdigit():
+            fields[name] = int(parts[0]) * (1024 if parts[1:] == ["kB"] else 1)
+    return fields
+
+
+def _read(path: Path) -> Optional[str]:
+    try:
+        return path.read_text()
+    except OSError:
+        return None
+
+
+def process_rss(name: str) -> Tuple[int, int]:
+    """(total RSS bytes, process count) of processes whose command is `name`"""
+    total = count = 0
+    if not PROC.is_dir():
+        return 0, 0
+    for entry in os.scandir(PROC):
+        if not entry.name.isdigit():
+            continue
+        base = PROC / entry.name
+        if (_read(base / "comm") or "").strip() != name:
+            continue
+        status = _read(base / "status") or ""
+        rss = parse_meminfo(status).get("VmRSS")
+        if rss is not None:
+            total += rss
+            count += 1
+    return total, count
+
+
+class LoadSampler:
+    """CPU figures need two readings, so the sampler keeps the previous one"""
+
+    def __init__(self):
+        self._previous: Optional[Tuple[int, int, int]] = None
+
+    def sample(self) -> NodeLoad:
+        load = NodeLoad()
+
+        stat = _read(PROC / "stat")
+        if stat:
+            current = parse_cpu_times(stat)
+            if self._previous is not None:
+                total = current[0] - self._previous[0]
+                if total > 0:
+                    idle = current[1] - self._previous[1]
+                    iowait = current[2] - self._previous[2]
+                    load.cpu = max(0.0, 1.0 - (idle + iowait) / total)
+                    load.iowait = max(0.0, iowait / total)
+            self._previous = current
+
+        meminfo = _read(PROC / "meminfo")
+        if meminfo:
+            load.memory_available = parse_meminfo(meminfo).get("MemAvailable")
+
+        load.ffmpeg_rss, load.ffmpeg_count = process_rss("ffmpeg")
+        return load
@@ -0,0 +1,99 @@
+"""
+Pipeline State - Redis bookkeeping for one run of a stage DAG
+
+Keys under job_engine:pipeline:<parent job id>, all expiring after the TTL:
+- context: pipeline name, owner, video and options
+- tasks:<stage>: Job ids of the stage's tasks (one per item for fan-out)
+- finished:<stage>: Job ids that completed; the stage is done when every
+  task has finished, which makes duplicate completions harmless
+- scheduled / done: stage names; SADD on scheduled is the once-only guard
+  when two parents of a fan-in stage complete at the same time
+- closed: set once by whoever completes or fails the run
+
+job_engine:task:<job id> maps a stage task back to its run.
+"""
+
+import json
+from typing import Dict, List, Optional, Set, Tuple
+
+STATE_TTL = 7 * 24 * 3600
+
+
+class PipelineState:
+    """Redis-side state of one pipeline run"""
+
+    def __init__(self, redis_client, pipeline_id: int, ttl: int = STATE_TTL):
+        self.redis = redis_client
+        self.pipeline_id = pipeline_id
+        self.ttl = ttl
+        self.prefix = f"job_engine:pipeline:{pipeline_id}"
+
+    def _key(self, name: str) -> str:
+        return f"{self.prefix}:{name}"
+
+    @staticmethod
+    def _task_key(job_id: int) -> str:
+        return f"job_engine:task:{job_id}"
+
+    def save_context(self, context: Dict):
+        self.redis.set(self._key("context"), json.dumps(context), ex=self.ttl)
+
+    def context(self) -> Optional[Dict]:
+        raw = self.redis.get(self._key("context"))
+        return json.loads(raw) if raw else None
+
+    def claim(self, stage: str) -> bool:
+        """True for exactly one caller per stage"""
+        key = self._key("scheduled")
+        claimed = self.redis.sadd(key, stage) == 1
+        self.redis.expire(key, self.ttl)
+        return claimed
+
+    def add_tasks(self, stage: str, job_ids: List[int]):
+        """Record all tasks of a stage (before any of them is enqueued)"""
+        pipe = self.redis.pipeline()
+        pipe.rpush(self._key(f"tasks:{stage}"), *job_ids)
+        pipe.expire(self._key(f"tasks:{stage}"), self.ttl)
+        for job_id in job_ids:
+            pipe.set(self._task_key(job_id), json.dumps([self.pipeline_id, stage]), ex=self.ttl)
+        pipe.execute()
+
+    def tasks(self, stage: str) -> List[int]:
+        return [int(job_id) for job_id in self.redis.lrange(self._key(f"tasks:{stage}"), 0, -1)]
+
+    def task_finished(self, stage: str, job_id: int) -> bool:
+        """Record a completed task; True once every task of the stage has completed"""
+        key = self._key(f"finished:{stage}")
+        pipe = self.redis.pipeline()
+        pipe.sadd(key, job_id)
+        pipe.expire(key, self.ttl)
+        pipe.scard(key)
+        pipe.llen(self._key(f"tasks:{stage}"))
+        _, _, finished, total = pipe.execute()
+        return finished >= total
+
+    def mark_done(self, stage: str) -> Set[str]:
+        """Record a completed stage; returns every completed stage so far"""
+        key = self._key("done")
+        pipe = self.redis.pipeline()
+        pipe.sadd(key, stage)
+        pipe.expire(key, self.ttl)
+        pipe.smembers(key)
+        return {s.decode() if isinstance(s, bytes) else s for s in pipe.execute()[2]}
+
+    def finish(self) -> bool:
+        """True for exactly one caller: the one that completes or fails the run"""
+        return bool(self.redis.set(self._key("closed"), 1, nx=True, ex=self.ttl))
+
+    def reopen(self):
+        """Undo finish() so a replayed task can still complete the run"""
+        self.redis.delete(self._key("closed"))
+
+    @classmethod
+    def for_task(cls, redis_client, job_id: int) -> Optional[Tuple["PipelineState", str]]:
+        """(state, stage name) of the run that stage task `job_id` belongs to"""
+        raw = redis_client.get(cls._task_key(job_id))
+        if not raw:
+            return None
+        pipeline_id, stage = json.loads(raw)
+        return cls(redis_client, pipeline_id), stage
@@ -0,0 +1,127 @@
+"""
+Progress Buffer - Write-behind coalescing of Job progress ticks
+
+Non-terminal progress updates are only recorded in a Redis hash (the
+latest tick per job wins). At most once per flush interval - cluster-wide,
+through a SET NX lease - one writer drains the hash and applies every
+buffered tick in a single DB transaction. A tick that does not win the
+lease schedules a trailing flush (one timer per process), so the last
+tick of a burst is not left stale until some later tick happens to flush.
+Terminal states, results, errors and each job's first PROCESSING tick
+(the PENDING -> PROCESSING transition) are written through by the caller.
+
+If Redis is unreachable, ticks are buffered in-process instead.
+"""
+
+import json
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+BUFFER_KEY = "job_progress:buffer"
+LEASE_KEY = "job_progress:flush_lease"
+
+Tick = Tuple[str, Optional[float]]  # (status value, progress)
+
+
+class ProgressBuffer:
+    """Latest progress tick per job, drained at a bounded rate"""
+
+    def __init__(
+        self,
+        redis_client=None,
+        interval: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+        on_flush: Optional[Callable[[], None]] = None
+    ):
+        self.redis = redis_client
+        self.interval = interval
+        self.clock = clock
+        self.on_flush = on_flush  # Runs the trailing flush; None disables it
+        self._local: Dict[int, Tick] = {}
+        self._started: Set[int] = set()
+        self._last_flush = clock()
+        self._lock = threading.Lock()
+        self._trailing: Optional[threading.Timer] = None
+
+    def started(self, job_id: int) -> bool:
+        """Whether this process already wrote the job's first PROCESSING tick through"""
+        with self._lock:
+            return job_id in self._started
+
+    def mark_started(self, job_id: int):
+        with self._lock:
+            self._started.add(job_id)
+
+    def record(self, job_id: int, status: str, progress: Optional[float]) -> bool:
+        """Buffer a tick; True if the caller should flush now"""
+        due = self._buffer(job_id, status, progress)
+        if not due:
+            self._schedule_trailing()
+        return due
+
+    def _buffer(self, job_id: int, status: str, progress: Optional[float]) -> bool:
+        if self.redis is not None:
+            try:
+                self.redis.hset(BUFFER_KEY, job_id, json.dumps([status, progress]))
+                return bool(self.redis.set(LEASE_KEY, 1, nx=True, px=max(1, int(self.interval * 1000))))
+            except Exception as e:
+                logger.debug(f"Progress buffer write to Redis failed, keeping locally: {str(e)}")
+
+        with self._lock:
+            self._local[job_id] = (status, progress)
+            now = self.clock()
+            if now - self._last_flush >= self.interval:
+                self._last_flush = now
+                return True
+            return False
+
+    def _schedule_trailing(self):
+        if self.on_flush is None:
+            return
+        with self._lock:
+            if self._trailing is not None and self._trailing.is_alive():
+                return
+            self._trailing = threading.Timer(self.interval, self._flush_trailing)
+            self._trailing.daemon = True
+            self._trailing.start()
+
+    def _flush_trailing(self):
+        try:
+            self.on_flush()
+        except Exception as e:
+            logger.error(f"Trailing progress flush failed: {str(e)}")
+
+    def drain(self) -> Dict[int, Tick]:
+        """Take every buffered tick (atomically with respect to other drainers)"""
+        ticks: Dict[int, Tick] = {}
+        if self.redis is not None:
+            try:
+                pipe = self.redis.pipeline()
+                pipe.hgetall(BUFFER_KEY)
+                pipe.delete(BUFFER_KEY)
+                raw, _ = pipe.execute()
+                for job_id, value in raw.items():
+                    status, progress = json.loads(value)
+                    ticks[int(job_id)] = (status, progress)
+            except Exception as e:
+                logger.debug(f"Progress buffer drain from Redis failed: {str(e)}")
+
+        with self._lock:
+            ticks.update(self._local)
+            self._local = {}
+        return ticks
+
+    def discard(self, job_id: int):
+        """Drop a job's pending tick and started mark (a state is being written through)"""
+        if self.redis is not None:
+            try:
+                self.redis.hdel(BUFFER_KEY, job_id)
+            except Exception as e:
+                logger.debug(f"Progress buffer discard failed: {str(e)}")
+        with self._lock:
+            self._local.pop(job_id, None)
+            self._started.discard(job_id)
@@ -1,4 +1,6 @@
 import logging
+import sys
+from typing import List, Optional
 from rq import Worker
 from rq.job import JobStatus
 import redis
@@ -8,16 +10,39 @@ logger = logging.getLogger(__name__)
 settings = get_settings()
 
 
-def start_workers():
-    """Start RQ workers for background jobs"""
+def start_workers(queues: Optional[List[str]] = None):
+    """
+    Start an RQ worker for background jobs.
+    
+    Run one per process on as many nodes as needed (or let
+    app.workers.supervisor size a pool of them per node from its load);
+    they coordinate only through Redis. The scheduler serves delayed re-queues (enqueue_in);
+    the reaper thread re-queues jobs whose worker died.
+    
+    By default the worker serves the interactive lane, then every
+    resource-class queue; `python -m app.workers.queue ingest` starts a
+    worker for downloads only, `... interactive` one reserved for editor
+    renders.
+    """
+    from app.workers.resource_classes import ENCODE, RESOURCE_CLASSES
     try:
+        queues = queues or [settings.interactive_queue_name, *RESOURCE_CLASSES, settings.queue_name]
+        if ENCODE in queues:
+            # Before any thread starts: ffmpeg children inherit nice/affinity/cgroup
+            from app.workers.isolation import isolate_current_process
+            isolate_current_process()
+        # Work horses are forked per job: a spawn pool per job would be rebuilt and leaked
+        from app.workers.download_pool import run_downloads_inline
+        run_downloads_inline()
         redis_conn = redis.from_url(settings.redis_url)
-        worker = Worker([settings.queue_name], connection=redis_conn)
+        worker = Worker(queues, connection=redis_conn)
+        from app.workers.reaper import start_reaper
+        start_reaper(redis_conn)
         logger.info("✓ RQ Worker started")
-        worker.work()
+        worker.work(with_scheduler=True)
     except Exception as e:
         logger.error(f"Worker error: {str(e)}")
 
 
 if __name__ == "__main__":
-    start_workers()
+    start_workers(sys.argv[1:] or None)
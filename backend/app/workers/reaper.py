@@ -0,0 +1,96 @@
+"""
+Reaper - Re-queue jobs whose worker died mid-task
+
+A job whose worker was OOM-killed, lost its node or hit the RQ timeout
+stays PROCESSING forever: nothing is left to mark it failed, and its
+pipeline stalls. Running jobs keep a heartbeat key alive (see
+retry_policy.Heartbeat); every worker runs a reaper thread, and once per
+interval one of them (under a Redis lock) sends PROCESSING jobs with no
+heartbeat back through the retry policy.
+
+Each sweep also runs a fair-queue dispatch, so waiting tasks still reach
+the RQ queues if a dispatcher died holding its lock.
+"""
+
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import List
+
+from app.core.config import get_settings
+from app.db.database import SessionLocal
+from app.models.reel import Job, JobStatus
+from app.workers.retry_policy import HEARTBEAT_KEY
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+LOCK_KEY = "reaper:lock"
+
+
+def find_stuck_jobs(redis_client, ttl: int) -> List[int]:
+    """PROCESSING jobs idle for longer than the heartbeat TTL with no live heartbeat"""
+    from app.workers.rq_worker import JOB_CALL_KEY
+
+    cutoff = datetime.utcnow() - timedelta(seconds=ttl)
+    db = SessionLocal()
+    try:
+        candidates = [
+            job_id for (job_id,) in db.query(Job.id).filter(
+                Job.status == JobStatus.PROCESSING,
+                Job.updated_at < cutoff
+            )
+        ]
+    finally:
+        db.close()
+    if not candidates:
+        return []
+
+    # Only jobs the workers run (they have a stored call); pipeline parents
+    # and in-process jobs have neither a call nor a heartbeat
+    pipe = redis_client.pipeline(transaction=False)
+    for job_id in candidates:
+        pipe.exists(HEARTBEAT_KEY.format(job_id))
+        pipe.exists(JOB_CALL_KEY.format(job_id))
+    flags = pipe.execute()
+    return [
+        job_id for i, job_id in enumerate(candidates)
+        if not flags[2 * i] and flags[2 * i + 1]
+    ]
+
+
+def reap_stuck_jobs(redis_client, ttl: int) -> int:
+    """Retry (or dead-letter) every stuck job; returns how many were reaped"""
+    from app.workers.job_engine import on_job_finished
+    from app.workers.rq_worker import fail_or_retry
+
+    stuck = find_stuck_jobs(redis_client, ttl)
+    for job_id in stuck:
+        logger.warning(f"Job {job_id} lost its worker, reaping")
+        if not fail_or_retry(job_id, "Worker stopped responding"):
+            # Out of retries: fail the pipeline it belongs to, if any
+            on_job_finished(job_id)
+    return len(stuck)
+
+
+def start_reaper(redis_client, interval: int = None, ttl: int = None) -> threading.Thread:
+    """Sweep for stuck jobs every `interval` seconds from a daemon thread"""
+    interval = interval or settings.reaper_interval
+    ttl = ttl or settings.job_heartbeat_ttl
+
+    from app.workers.rq_worker import dispatch_waiting
+
+    def run():
+        stop = threading.Event()
+        while not stop.wait(interval):
+            dispatch_waiting()
+            try:
+                # One sweep per interval across all workers
+                if redis_client.set(LOCK_KEY, 1, nx=True, ex=interval):
+                    reap_stuck_jobs(redis_client, ttl)
+            except Exception as e:
+                logger.warning(f"Reaper sweep failed: {str(e)}")
+
+    thread = threading.Thread(target=run, name="job-reaper", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,39 @@
+"""
+Resource Classes - Which queue (and worker pool) each job type runs on
+
+Stages are bound by different resources, so each class gets its own RQ
+queue, fair queue and worker pool, sized separately:
+
+- ingest: downloads, network-bound
+- encode: ffmpeg cuts and conversions, CPU-bound
+- ai: Gemini metadata, bound by API latency and quota
+- publish: Instagram Graph API calls, bound by API latency
+
+A backlog of one class then never holds up another: a slow Graph API
+ties up publish workers only, and a burst of encodes cannot starve
+downloads. The queue of a class is named after it.
+"""
+
+from typing import Dict, Tuple
+
+INGEST = "ingest"
+ENCODE = "encode"
+AI = "ai"
+PUBLISH = "publish"
+
+RESOURCE_CLASSES: Tuple[str, ...] = (INGEST, ENCODE, AI, PUBLISH)
+
+# job_type -> resource class
+JOB_RESOURCE_CLASSES: Dict[str, str] = {
+    "youtube_download": INGEST,
+    "cutting": ENCODE,
+    "vertical_conversion": ENCODE,
+    "ai_generation": AI,
+    "instagram_upload": PUBLISH,
+    "token_refresh": PUBLISH,
+}
+
+
+def resource_class(job_type: str) -> str:
+    """Resource class of a job type (unknown types are treated as encodes)"""
+    return JOB_RESOURCE_CLASSES.get(job_type, ENCODE)
@@ -0,0 +1,97 @@
+"""
+Retry Policy - Per-stage retries, worker heartbeats and failure classification
+
+A failed stage task is retried on its own, with jittered exponential
+backoff, up to its job type's max_retries; only then does it fail the
+pipeline (and land in the dead-letter queue). Handlers raise
+PermanentJobError for failures a retry cannot fix.
+
+While a task runs, a Heartbeat thread keeps a short-lived Redis key alive.
+A task whose worker died (OOM, node loss, RQ timeout) stops refreshing it,
+and the reaper re-queues the task.
+"""
+
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+from app.services.rate_limiter import backoff_delay
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_KEY = "job_heartbeat:{}"
+
+
+class PermanentJobError(Exception):
+    """A failure that retrying cannot fix (bad input, missing rows)"""
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Retry budget and backoff of one job type"""
+    max_retries: int
+    base_delay: float  # Seconds
+    max_delay: float
+
+    def delay(self, attempt: int) -> float:
+        """Seconds before retry number `attempt` (0-based): base plus full jitter"""
+        return self.base_delay + backoff_delay(attempt, self.base_delay, self.max_delay)
+
+
+# job_type -> policy
+STAGE_RETRY_POLICIES = {
+    "youtube_download": RetryPolicy(max_retries=3, base_delay=30, max_delay=600),
+    "cutting": RetryPolicy(max_retries=2, base_delay=10, max_delay=120),
+    "vertical_conversion": RetryPolicy(max_retries=3, base_delay=5, max_delay=120),
+    "ai_generation": RetryPolicy(max_retries=2, base_delay=60, max_delay=900),
+    "instagram_upload": RetryPolicy(max_retries=5, base_delay=60, max_delay=3600),
+    "token_refresh": RetryPolicy(max_retries=3, base_delay=300, max_delay=3600),
+}
+DEFAULT_RETRY_POLICY = RetryPolicy(max_retries=3, base_delay=10, max_delay=300)
+
+
+def policy_for(job_type: str) -> RetryPolicy:
+    return STAGE_RETRY_POLICIES.get(job_type, DEFAULT_RETRY_POLICY)
+
+
+def is_retryable(error: BaseException) -> bool:
+    return not isinstance(error, (PermanentJobError, KeyError, TypeError))
+
+
+class Heartbeat:
+    """Refresh a job's heartbeat key from a daemon thread while the job runs"""
+
+    def __init__(self, redis_client, job_id: int, ttl: int = 60, interval: Optional[float] = None):
+        self.redis = redis_client
+        self.key = HEARTBEAT_KEY.format(job_id)
+        self.ttl = ttl
+        self.interval = interval or max(1.0, ttl / 4)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _beat(self):
+        try:
+            self.redis.set(self.key, 1, ex=self.ttl)
+        except Exception as e:
+            logger.debug(f"Heartbeat write failed for {self.key}: {str(e)}")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._beat()
+
+    def __enter__(self) -> "Heartbeat":
+        self._beat()
+        self._thread = threading.Thread(target=self._run, name=f"heartbeat-{self.key}", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+        try:
+            self.redis.delete(self.key)
+        except Exception as e:
+            logger.debug(f"Heartbeat cleanup failed for {self.key}: {str(e)}")
+        return False
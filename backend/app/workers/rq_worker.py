@@ -1,38 +1,271 @@
 """Background job worker using RQ"""
 
+import asyncio
+import json
 import logging
+from typing import List
 from rq import Queue
 from redis import Redis
-from datetime import datetime
+from datetime import datetime, timedelta
 from app.core.config import get_settings
+from app.core.metrics import flush_metrics
 from app.utils.helpers import get_logger
 from app.db.database import SessionLocal
 from sqlalchemy.orm import Session
 from app.models.reel import Job, JobStatus
+from app.services.progress_events import publish_event
+from app.workers.cancellation import CancelToken, cancel_scope, request_cancel
+from app.workers.dead_letter import DeadLetterQueue
+from app.workers.fair_queue import PRIORITY_WEIGHTS, FairQueue, task_spec
+from app.workers.progress_buffer import ProgressBuffer
+from app.workers.resource_classes import AI, RESOURCE_CLASSES, resource_class
+from app.workers.retry_policy import Heartbeat, RetryPolicy, policy_for
 
 logger = get_logger(__name__)
 settings = get_settings()
 
 # Connect to Redis
-redis_conn = Redis.from_url(settings.rq_redis_url)
-job_queue = Queue(connection=redis_conn)
+redis_conn = Redis.from_url(settings.redis_url)
+job_queue = Queue(settings.queue_name, connection=redis_conn)  # Calls stored before resource classes
+class_queues = {name: Queue(name, connection=redis_conn) for name in RESOURCE_CLASSES}
+interactive_queue = Queue(settings.interactive_queue_name, connection=redis_conn)
+progress_buffer = ProgressBuffer(
+    redis_conn, settings.job_progress_flush_interval, on_flush=lambda: flush_job_progress()
+)
+dead_letters = DeadLetterQueue(redis_conn, settings.dead_letter_max_entries)
 
+TERMINAL_STATUSES = (JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED)
 
-def enqueue_job(job_type: str, user_id: int, video_id: int = None, **kwargs) -> str:
-    """Enqueue a background job"""
+# Re-queues of an AI job after Gemini quota exhaustion (not counted as failed attempts)
+QUOTA_REQUEUE_POLICY = RetryPolicy(
+    max_retries=settings.gemini_max_requeues,
+    base_delay=settings.gemini_requeue_base,
+    max_delay=settings.gemini_requeue_base * 2 ** settings.gemini_max_requeues,
+)
+
+# job_type/user/video per job, so buffered ticks can be published without a DB read
+JOB_META_KEY = "job_meta:{}"
+JOB_META_TTL = 7 * 24 * 3600
+
+# The RQ call that runs a job, so retries, the reaper and DLQ replays can re-issue it
+JOB_CALL_KEY = "job_call:{}"
+
+
+def create_job_record(job_type: str, user_id: int, video_id: int = None, status: JobStatus = JobStatus.PENDING) -> int:
+    """Insert a Job row and return its id"""
+    db = SessionLocal()
     try:
-        # Create job record in database
-        db = SessionLocal()
         job = Job(
             user_id=user_id,
             video_id=video_id,
             job_type=job_type,
-            status=JobStatus.PENDING,
+            status=status,
+            retry_count=0,
+            max_retries=policy_for(job_type).max_retries,
         )
         db.add(job)
         db.commit()
-        job_id_db = job.id
+        job_id = job.id
+    finally:
         db.close()
+
+    try:
+        redis_conn.set(JOB_META_KEY.format(job_id), json.dumps([job_type, user_id, video_id]), ex=JOB_META_TTL)
+    except Exception as e:
+        logger.debug(f"Could not cache job meta for {job_id}: {str(e)}")
+    return job_id
+
+
+def _link_rq_job(job_id: int, rq_job):
+    """Record the RQ job id on Job row `job_id`"""
+    db = SessionLocal()
+    try:
+        db.query(Job).filter(Job.id == job_id).update({Job.rq_job_id: rq_job.id})
+        db.commit()
+    finally:
+        db.close()
+
+
+# One fair queue in front of each resource-class queue
+fair_queues = {
+    name: FairQueue(
+        redis_conn, queue,
+        quantum=settings.fair_queue_quantum,
+        depth=settings.fair_queue_depth,
+        on_dispatch=_link_rq_job
+    )
+    for name, queue in class_queues.items()
+}
+
+
+def submit(
+    job_id: int,
+    func,
+    *args,
+    job_type: str = None,
+    user_id: int = None,
+    priority: str = "standard",
+    cost: float = 1.0
+):
+    """
+    Hand `func(*args)` to the workers for Job row `job_id`.
+    
+    The job type picks the resource-class queue. Work with an owner waits
+    in that user's fair-queue flow of the class (cost is the estimated
+    seconds of media it processes); everything else, or all work when
+    FAIR_QUEUE_DEPTH=0, goes straight onto the class queue.
+    """
+    queue_class = resource_class(job_type)
+    spec = task_spec(func, args, {'job_timeout': settings.worker_timeout}, job_id)
+    _remember_call(job_id, {**spec, 'queue': queue_class})
+    if user_id is not None and settings.fair_queue_depth > 0:
+        fair_queues[queue_class].push(
+            f"{user_id}:{priority}", PRIORITY_WEIGHTS.get(priority, 1.0), cost,
+            job_id, func, *args, job_timeout=settings.worker_timeout
+        )
+        return
+    _link_rq_job(job_id, class_queues[queue_class].enqueue(func, *args, job_timeout=settings.worker_timeout))
+
+
+def _remember_call(job_id: int, spec: dict):
+    try:
+        redis_conn.set(JOB_CALL_KEY.format(job_id), json.dumps(spec), ex=JOB_META_TTL)
+    except Exception as e:
+        logger.debug(f"Could not store call for job {job_id}: {str(e)}")
+
+
+def _load_call(job_id: int):
+    try:
+        raw = redis_conn.get(JOB_CALL_KEY.format(job_id))
+    except Exception:
+        raw = None
+    return json.loads(raw) if raw else None
+
+
+def _enqueue_call(spec: dict, delay: float = 0):
+    """Re-issue a stored call on its class queue (after `delay` seconds)"""
+    queue = class_queues.get(spec.get('queue'), job_queue)
+    if delay > 0:
+        rq_job = queue.enqueue_in(timedelta(seconds=delay), spec['func'], *spec['args'], **spec['kwargs'])
+    else:
+        rq_job = queue.enqueue(spec['func'], *spec['args'], **spec['kwargs'])
+    if spec.get('job_id'):
+        _link_rq_job(spec['job_id'], rq_job)
+    return rq_job
+
+
+def begin_attempt(job_id: int):
+    """
+    Mark a job PROCESSING before its handler runs (written through, so the
+    reaper can see it). Returns the status it had (None if the row is gone,
+    e.g. its video was deleted): callers skip jobs that are missing or
+    already COMPLETED, FAILED or CANCELLED, which makes a duplicate delivery
+    of the same task harmless.
+    """
+    db = SessionLocal()
+    try:
+        job = db.query(Job).filter(Job.id == job_id).first()
+        if job is None:
+            return None
+        previous = job.status
+        if previous not in TERMINAL_STATUSES:
+            job.status = JobStatus.PROCESSING
+            job.updated_at = datetime.utcnow()
+            db.commit()
+        return previous
+    finally:
+        db.close()
+
+
+def fail_or_retry(job_id: int, error: str, retryable: bool = True) -> bool:
+    """
+    Handle a failed attempt: re-queue it with backoff while the job type's
+    retry policy allows, otherwise fail the job and dead-letter it.
+    Returns True if a retry was scheduled.
+    """
+    spec = _load_call(job_id)
+    db = SessionLocal()
+    try:
+        job = db.query(Job).filter(Job.id == job_id).first()
+        if job is None:
+            return False
+        if job.status == JobStatus.CANCELLED:
+            return False
+
+        attempts = (job.retry_count or 0) + 1
+        if retryable and spec is not None and job.retry_count < job.max_retries:
+            delay = policy_for(job.job_type).delay(job.retry_count)
+            job.retry_count = attempts
+            job.status = JobStatus.PENDING
+            job.error_message = f"Attempt {attempts} failed, retrying in {delay:.0f}s: {error}"
+            job.updated_at = datetime.utcnow()
+            db.commit()
+            _enqueue_call(spec, delay)
+            logger.warning(f"Job {job_id} ({job.job_type}) attempt {attempts} failed, retry in {delay:.0f}s: {error}")
+            return True
+
+        meta = (job.job_type, job.user_id, job.video_id)
+    finally:
+        db.close()
+
+    update_job_status(job_id, JobStatus.FAILED, 0, error=error)
+    dead_letters.add(job_id, meta[0], error, attempts, call=spec, user_id=meta[1], video_id=meta[2])
+    logger.error(f"Job {job_id} ({meta[0]}) dead-lettered after {attempts} attempt(s): {error}")
+    return False
+
+
+def replay_dead_letter(job_id: int) -> bool:
+    """Reset a dead-lettered job's retry budget and run it again"""
+    entry = dead_letters.get(job_id)
+    if entry is None or not entry.get('call'):
+        return False
+
+    db = SessionLocal()
+    try:
+        db.query(Job).filter(Job.id == job_id).update({
+            Job.status: JobStatus.PENDING,
+            Job.retry_count: 0,
+            Job.error_message: None,
+            Job.updated_at: datetime.utcnow(),
+        }, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+    from app.workers.job_engine import reopen_for_task
+    reopen_for_task(job_id)
+
+    _enqueue_call(entry['call'])
+    dead_letters.remove(job_id)
+    logger.info(f"Replaying dead-lettered job {job_id}")
+    return True
+
+
+def submit_interactive(func, *args):
+    """Editor work: its own lane, which encode workers check before their class queue"""
+    return interactive_queue.enqueue(func, *args, job_timeout=settings.worker_timeout)
+
+
+def dispatch_waiting():
+    """Refill the class queues from their fair queues (after a task frees a worker)"""
+    if settings.fair_queue_depth <= 0:
+        return
+    for name, fair_queue in fair_queues.items():
+        try:
+            fair_queue.dispatch()
+        except Exception as e:
+            logger.warning(f"Fair queue dispatch failed for {name}: {str(e)}")
+
+
+def enqueue_job(job_type: str, user_id: int, video_id: int = None, **kwargs) -> str:
+    """Enqueue a background job; kwargs are passed to its JOB_HANDLERS function"""
+    try:
+        if job_type not in JOB_HANDLERS:
+            raise ValueError(f"Unknown job type: {job_type}")
+
+        # Create job record in database, then hand it to any worker
+        job_id_db = create_job_record(job_type, user_id, video_id)
+        submit(job_id_db, run_job, job_type, job_id_db, kwargs, job_type=job_type, user_id=user_id)
         
         logger.info(f"Enqueued job: {job_type} (db_id={job_id_db})")
         return str(job_id_db)
@@ -42,13 +275,90 @@ def enqueue_job(job_type: str, user_id: int, video_id: int = None, **kwargs) ->
         return None
 
 
+def run_job(job_type: str, job_id: int, kwargs: dict):
+    """
+    RQ entry point: run a process_*_job coroutine to completion.
+    
+    The coroutines record their own outcome on the Job row. If the job is a
+    stage task of a pipeline (e.g. an AI job re-queued after a quota error),
+    the pipeline continues from here.
+    """
+    from app.workers.job_engine import on_job_finished
+    try:
+        previous = begin_attempt(job_id)
+        if previous is None:
+            return
+        if previous not in TERMINAL_STATUSES:
+            token = CancelToken.for_job(redis_conn, job_id)
+            with cancel_scope(token), Heartbeat(redis_conn, job_id, settings.job_heartbeat_ttl):
+                asyncio.run(JOB_HANDLERS[job_type](job_id, **kwargs))
+            if token.cancelled:
+                mark_cancelled(job_id)
+                return
+
+            # The coroutines catch their own errors and mark the job FAILED
+            status, error = _job_outcome(job_id)
+            if status == JobStatus.FAILED and fail_or_retry(job_id, error):
+                return
+
+        on_job_finished(job_id)
+    finally:
+        flush_job_progress()
+        dispatch_waiting()
+        flush_metrics()
+
+
+def _job_outcome(job_id: int):
+    db = SessionLocal()
+    try:
+        job = db.query(Job).filter(Job.id == job_id).first()
+        return (job.status, job.error_message) if job else (None, None)
+    finally:
+        db.close()
+
+
+def mark_cancelled(job_id: int):
+    update_job_status(job_id, JobStatus.CANCELLED, error="Cancelled")
+    logger.info(f"Job {job_id} cancelled")
+
+
+def cancel_jobs(job_ids: List[int], video_id: int = None):
+    """
+    Cancel jobs (and, with video_id, anything else running for that video).
+
+    Running handlers notice the flag and stop (see cancellation); queued
+    ones are skipped when a worker picks them up.
+    """
+    request_cancel(redis_conn, job_ids, video_id)
+    for job_id in job_ids:
+        mark_cancelled(job_id)
+
+
 def update_job_status(job_id: int, status: JobStatus, progress: float = None, result: dict = None, error: str = None):
-    """Update job status in database"""
+    """
+    Update job status in database
+    
+    Plain progress ticks of a running job are buffered and flushed in
+    batches (at most once per job_progress_flush_interval, plus a trailing
+    flush); everything else, including the first PROCESSING tick, is
+    written through.
+    """
+    if status == JobStatus.PROCESSING and not result and not error and progress_buffer.started(job_id):
+        if progress_buffer.record(job_id, status.value, progress):
+            flush_job_progress()
+        _publish_job_event(job_id, status, progress)
+        return
+
+    # A buffered tick flushed after this write must not move the job backwards
+    progress_buffer.discard(job_id)
     try:
         db = SessionLocal()
         job = db.query(Job).filter(Job.id == job_id).first()
         
-        if job:
+        if job and job.status == JobStatus.CANCELLED and status != JobStatus.CANCELLED:
+            # Cancellation is final: a handler winding down must not overwrite it
+            logger.info(f"Job {job_id} is cancelled, ignoring {status}")
+        elif job:
             job.status = status
             if progress is not None:
                 job.progress = progress
@@ -59,7 +369,10 @@ def update_job_status(job_id: int, status: JobStatus, progress: float = None, re
             job.updated_at = datetime.utcnow()
             
             db.commit()
+            if status == JobStatus.PROCESSING:
+                progress_buffer.mark_started(job_id)
             logger.info(f"Updated job {job_id} status: {status}")
+            _publish_job_event(job_id, status, job.progress, (job.job_type, job.user_id, job.video_id))
         
         db.close()
     
@@ -67,6 +380,57 @@ def update_job_status(job_id: int, status: JobStatus, progress: float = None, re
         logger.error(f"Error updating job status: {str(e)}")
 
 
+def _publish_job_event(job_id: int, status: JobStatus, progress: float = None, meta: tuple = None):
+    """Publish a job's status/progress to its video and user progress channels"""
+    if meta is None:
+        try:
+            raw = redis_conn.get(JOB_META_KEY.format(job_id))
+        except Exception:
+            raw = None
+        if not raw:
+            return
+        meta = json.loads(raw)
+    job_type, user_id, video_id = meta
+    publish_event(
+        redis_conn,
+        {
+            'type': 'job',
+            'job_id': job_id,
+            'job_type': job_type,
+            'video_id': video_id,
+            'status': status.value,
+            'progress': progress,
+        },
+        video_id=video_id,
+        user_id=user_id,
+    )
+
+
+def flush_job_progress():
+    """Apply all buffered progress ticks in one transaction"""
+    ticks = progress_buffer.drain()
+    if not ticks:
+        return
+    try:
+        db = SessionLocal()
+        now = datetime.utcnow()
+        for job_id, (status, progress) in ticks.items():
+            values = {Job.status: JobStatus(status), Job.updated_at: now}
+            if progress is not None:
+                values[Job.progress] = progress
+            # Never overwrite a terminal state written through meanwhile
+            db.query(Job).filter(
+                Job.id == job_id,
+                Job.status.notin_(TERMINAL_STATUSES)
+            ).update(values, synchronize_session=False)
+        db.commit()
+        db.close()
+        logger.debug(f"Flushed progress for {len(ticks)} job(s)")
+    
+    except Exception as e:
+        logger.error(f"Error flushing job progress: {str(e)}")
+
+
 # Background job functions
 
 async def process_youtube_download_job(job_id: int, youtube_url: str, video_id: str):
@@ -77,9 +441,12 @@ async def process_youtube_download_job(job_id: int, youtube_url: str, video_id:
         from app.services.youtube_service import YouTubeService
         yt_service = YouTubeService()
         
-        success, result = await yt_service.download_video(youtube_url, video_id)
+        success, result = await yt_service.download_video(youtube_url, video_id, job_id=job_id)
         
         if success:
+            # Job.result is JSON: store the transcript index in its dict form
+            transcript = result.get('transcript')
+            result = {**result, 'transcript': transcript.to_dict() if transcript else None}
             update_job_status(job_id, JobStatus.COMPLETED, 100, result)
         else:
             update_job_status(job_id, JobStatus.FAILED, 0, error="Download failed")
@@ -129,13 +496,22 @@ async def process_vertical_conversion_job(job_id: int, chunks: list, video_id: s
         update_job_status(job_id, JobStatus.FAILED, 0, error=str(e))
 
 
-async def process_ai_generation_job(job_id: int, reels: list, transcript: str = None, custom_caption: str = None, video_id: int = None):
-    """Background job: Generate AI metadata for reels"""
+async def process_ai_generation_job(job_id: int, reels: list, transcript: str = None, custom_caption: str = None, video_id: int = None, attempt: int = 0, metadata_mode: str = None):
+    """
+    Background job: Generate AI metadata for reels
+    
+    metadata_mode overrides settings.metadata_mode (e.g. "heuristic" for
+    bulk runs). If Gemini quota stays exhausted, the job is re-queued with
+    jittered backoff; once re-queues run out, it finishes with the local
+    heuristic engine instead of placeholder metadata.
+    """
     try:
         update_job_status(job_id, JobStatus.PROCESSING, 30)
 
         from app.services.gemini_service import GeminiAIService
+        from app.services.transcript_index import TranscriptIndex
         from app.models.reel import Reel, ReelQuality
+        from app.models.video import Video
         from app.db.database import SessionLocal
         ai_service = GeminiAIService()
 
@@ -144,6 +520,37 @@ async def process_ai_generation_job(job_id: int, reels: list, transcript: str =
 
         db = SessionLocal()
 
+        # Timed transcript lets each reel describe its own window
+        transcript_index = None
+        video_title = None
+        if video_id:
+            video = db.query(Video).filter(Video.id == video_id).first()
+            video_title = video.title if video else None
+            if video and video.transcript_segments:
+                transcript_index = TranscriptIndex.from_dict(video.transcript_segments)
+
+        reel_transcripts = []
+        for reel in reels:
+            reel_transcript = transcript
+            if transcript_index is not None and reel.get('start_time') is not None:
+                reel_transcript = transcript_index.slice(reel['start_time'], reel['end_time'])
+            reel_transcripts.append(reel_transcript)
+
+        if custom_caption:
+            ai_metadata = None
+        else:
+            # Batched Gemini, local heuristics, or heuristics as an LLM pre-filter
+            ai_metadata = await ai_service.generate_metadata(
+                [{'transcript': t, 'duration': r.get('duration')} for r, t in zip(reels, reel_transcripts)],
+                title=video_title,
+                context=(transcript_index.plain_text if transcript_index is not None else transcript),
+                mode=metadata_mode,
+            )
+
+        existing_reels = {}
+        if video_id:
+            existing_reels = {r.reel_number: r for r in db.query(Reel).filter(Reel.video_id == video_id)}
+
         for i, reel in enumerate(reels):
             if custom_caption:
                 # Use custom caption instead of AI generation
@@ -155,19 +562,14 @@ async def process_ai_generation_job(job_id: int, reels: list, transcript: str =
                     'quality_score': 0.8
                 }
             else:
-                metadata = await ai_service.generate_reel_metadata(
-                    transcript=transcript,
-                    duration=reel.get('duration'),
-                )
+                metadata = ai_metadata[i]
 
             reel['metadata'] = metadata
             reels_with_ai.append(reel)
 
-            # Save reel to database
-            db_reel = Reel(
-                video_id=video_id,
-                chunk_id=reel.get('chunk_number'),  # Assuming chunk_number is used as chunk_id
-                reel_number=i+1,
+            # Save reel to database (a retried attempt updates the rows it already wrote)
+            fields = dict(
+                chunk_id=reel.get('chunk_id', reel.get('chunk_number')),  # VideoChunk id when the pipeline provides it
                 file_path=reel.get('file_path'),
                 file_size=reel.get('file_size'),
                 duration=reel.get('duration'),
@@ -178,7 +580,12 @@ async def process_ai_generation_job(job_id: int, reels: list, transcript: str =
                 quality_score=metadata.get('quality_score'),
                 quality_grade=ai_service.calculate_quality_grade(metadata.get('quality_score', 0)),
             )
-            db.add(db_reel)
+            db_reel = existing_reels.get(i + 1)
+            if db_reel is None:
+                db.add(Reel(video_id=video_id, reel_number=i+1, **fields))
+            else:
+                for name, value in fields.items():
+                    setattr(db_reel, name, value)
 
             progress = 30 + int((i + 1) / total * 50)  # 30-80%
             update_job_status(job_id, JobStatus.PROCESSING, progress)
@@ -189,6 +596,31 @@ async def process_ai_generation_job(job_id: int, reels: list, transcript: str =
         update_job_status(job_id, JobStatus.COMPLETED, 100, {'reels': reels_with_ai})
 
     except Exception as e:
+        from app.services.gemini_client import GeminiQuotaExceeded
+        if isinstance(e, GeminiQuotaExceeded) and attempt < QUOTA_REQUEUE_POLICY.max_retries:
+            # Completed reels are in the AI cache, so the retry only pays for the rest
+            delay = QUOTA_REQUEUE_POLICY.delay(attempt)
+            kwargs = {
+                'reels': reels, 'transcript': transcript, 'custom_caption': custom_caption,
+                'video_id': video_id, 'attempt': attempt + 1, 'metadata_mode': metadata_mode,
+            }
+            # Stored like any call, so the reaper, DLQ replays and cancellation see this attempt
+            spec = {
+                **task_spec(run_job, ("ai_generation", job_id, kwargs), {'job_timeout': settings.worker_timeout}, job_id),
+                'queue': AI,
+            }
+            _remember_call(job_id, spec)
+            _enqueue_call(spec, delay)
+            logger.warning(f"Job {job_id}: Gemini quota exhausted, re-queued in {delay:.0f}s (attempt {attempt + 1})")
+            update_job_status(job_id, JobStatus.PENDING, 30, error=f"Gemini quota exhausted, retrying in {delay:.0f}s")
+            return
+        if isinstance(e, GeminiQuotaExceeded) and metadata_mode != "heuristic":
+            logger.warning(f"Job {job_id}: Gemini quota still exhausted, finishing with heuristic metadata")
+            return await process_ai_generation_job(
+                job_id, reels, transcript, custom_caption, video_id,
+                attempt=attempt, metadata_mode="heuristic"
+            )
+
         logger.error(f"Job {job_id} error: {str(e)}")
         update_job_status(job_id, JobStatus.FAILED, 0, error=str(e))
 
@@ -261,3 +693,54 @@ async def process_token_refresh_job(job_id: int, instagram_token_id: int):
         logger.error(f"Job {job_id} error during token refresh: {str(e)}")
         update_job_status(job_id, JobStatus.FAILED, 0, error=str(e))
 
+
+def render_reel(reel_id: int) -> dict:
+    """Interactive lane: re-compose a reel with its saved frame/text settings"""
+    import os
+    from app.config.frames import FrameType
+    from app.models.reel import Reel
+    from app.services.reel_composer import ReelComposer
+
+    db = SessionLocal()
+    try:
+        reel = db.query(Reel).filter(Reel.id == reel_id).first()
+        if not reel:
+            raise ValueError(f"Reel {reel_id} not found")
+
+        # Always render from the pre-edit file so edits do not stack
+        source = reel.original_file_path or reel.file_path
+        output_path = os.path.join(os.path.dirname(source), f"reel_{reel.id}_edited.mp4")
+        composer = ReelComposer(
+            optimize_encoding=settings.reel_encode_optimize,
+            ssim_floor=settings.reel_ssim_floor,
+            max_size_bytes=int(settings.reel_max_size_mb * 1024 * 1024)
+        )
+        final_path = composer.compose_reel(
+            input_video_path=source,
+            output_path=output_path,
+            frame_type=FrameType(reel.frame_type),
+            text_overlays=reel.text_overlays,
+            has_shadow=reel.has_shadow,
+            shadow_intensity=reel.shadow_intensity,
+            has_overlay=reel.has_overlay,
+            overlay_opacity=reel.overlay_opacity,
+        )
+
+        reel.original_file_path = source
+        reel.file_path = final_path
+        reel.is_edited = True
+        db.commit()
+        logger.info(f"Re-rendered reel {reel_id}: {final_path}")
+        return {'reel_id': reel_id, 'file_path': final_path}
+    finally:
+        db.close()
+
+
+# job_type -> coroutine run by run_job
+JOB_HANDLERS = {
+    "youtube_download": process_youtube_download_job,
+    "cutting": process_video_cutting_job,
+    "vertical_conversion": process_vertical_conversion_job,
+    "ai_generation": process_ai_generation_job,
+    "token_refresh": process_token_refresh_job,
+}
@@ -0,0 +1,209 @@
+"""
+Worker Supervisor - Load-aware pool of RQ worker processes per node
+
+`python -m app.workers.supervisor` replaces running a fixed number of
+`app.workers.queue` processes. It keeps one pool of RQ worker processes
+per resource class and, every scale interval, resizes each with its own
+ConcurrencyController from the node's live load (CPU, I/O wait, free
+memory, ffmpeg RSS) and the pool's backlog (its RQ queue plus fair-queued
+tasks). Only the encode pool reacts to CPU: the other classes are bound
+by the network or remote APIs, so a CPU-saturated node still downloads
+and publishes. `python -m app.workers.supervisor encode` runs only the
+named pools (e.g. for dedicated encode nodes).
+
+Growing starts a worker process; shrinking sends the newest one SIGTERM,
+which RQ treats as a warm shutdown: it finishes its current task first.
+A worker that dies is replaced up to the pool's floor on the next tick.
+"""
+
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from typing import List, Optional
+
+import redis
+from rq import Queue, Worker
+
+from app.core.config import get_settings
+from app.core.metrics import get_registry
+from app.workers.concurrency import MB, ConcurrencyController, ConcurrencyLimits
+from app.workers.fair_queue import FairQueue
+from app.workers.node_load import LoadSampler
+from app.workers.queue import start_workers
+from app.workers.resource_classes import AI, ENCODE, INGEST, PUBLISH
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+SCALE_EVENTS = get_registry().counter(
+    "worker_pool_scale_events_total", "Worker pool resizes by the supervisor"
+)
+
+
+# Thresholds a pool ignores (utilization never exceeds 1)
+UNBOUNDED = 2.0
+
+# Memory assumed per task of a class that does not run ffmpeg
+LIGHT_TASK_MEMORY = 256 * MB
+
+
+def default_limits() -> ConcurrencyLimits:
+    """Encode pool: bound by CPU and memory"""
+    return ConcurrencyLimits(
+        floor=settings.worker_min_processes,
+        ceiling=settings.worker_max_processes,
+        cpu_target=settings.worker_cpu_target,
+        cpu_high=settings.worker_cpu_high,
+        iowait_high=settings.worker_iowait_high,
+        memory_reserve=settings.worker_memory_reserve_mb * MB,
+        task_memory=settings.worker_task_memory_mb * MB,
+        cooldown=settings.worker_scale_cooldown,
+        idle_cooldown=settings.worker_idle_cooldown,
+    )
+
+
+def class_limits(floor: int, ceiling: int, disk_bound: bool) -> ConcurrencyLimits:
+    """Ingest/AI/publish pools: CPU is not theirs to saturate"""
+    encode = default_limits()
+    return ConcurrencyLimits(
+        floor=floor,
+        ceiling=ceiling,
+        cpu_target=UNBOUNDED,
+        cpu_high=UNBOUNDED,
+        iowait_high=encode.iowait_high if disk_bound else UNBOUNDED,
+        memory_reserve=encode.memory_reserve,
+        task_memory=LIGHT_TASK_MEMORY,
+        cooldown=encode.cooldown,
+        idle_cooldown=encode.idle_cooldown,
+    )
+
+
+def class_pools(redis_client) -> List["WorkerPool"]:
+    """One pool per resource class; a pool with a ceiling of 0 is not run on this node"""
+    specs = [
+        # Encode workers also take editor renders (first) and calls queued before resource classes
+        (ENCODE, [settings.interactive_queue_name, ENCODE, settings.queue_name], default_limits()),
+        (INGEST, [INGEST], class_limits(settings.ingest_min_processes, settings.ingest_max_processes, True)),
+        (AI, [AI], class_limits(settings.ai_min_processes, settings.ai_max_processes, False)),
+        (PUBLISH, [PUBLISH], class_limits(settings.publish_min_processes, settings.publish_max_processes, False)),
+    ]
+    return [
+        WorkerPool(name, queues, limits, redis_client)
+        for name, queues, limits in specs
+        if limits.ceiling > 0
+    ]
+
+
+class WorkerPool:
+    """Worker processes serving one list of queues"""
+
+    def __init__(self, name: str, queues: List[str], limits: ConcurrencyLimits, redis_client):
+        self.name = name
+        self.queues = queues
+        self.redis = redis_client
+        self.controller = ConcurrencyController(limits)
+        self.processes: List[multiprocessing.Process] = []
+        self.stopping: List[multiprocessing.Process] = []
+        # spawn: workers must not inherit the supervisor's Redis connection
+        self._context = multiprocessing.get_context("spawn")
+
+    @property
+    def size(self) -> int:
+        return len(self.processes)
+
+    def backlog(self) -> int:
+        """Tasks waiting for this pool"""
+        waiting = 0
+        for name in self.queues:
+            queue = Queue(name, connection=self.redis)
+            fair_queue = FairQueue(self.redis, queue, settings.fair_queue_quantum, settings.fair_queue_depth)
+            waiting += queue.count + sum(fair_queue.waiting().values())
+        return waiting
+
+    def busy(self) -> int:
+        """This pool's workers that are running a task"""
+        pids = {p.pid for p in self.processes}
+        hostname = socket.gethostname()
+        return sum(
+            1 for worker in Worker.all(connection=self.redis)
+            if worker.pid in pids and worker.hostname == hostname and worker.get_state() == "busy"
+        )
+
+    def reap(self):
+        """Forget processes that have exited"""
+        for process in [p for p in self.processes if not p.is_alive()]:
+            logger.warning(f"Pool {self.name}: worker {process.pid} exited ({process.exitcode})")
+            self.processes.remove(process)
+        self.stopping = [p for p in self.stopping if p.is_alive()]
+
+    def scale_to(self, target: int):
+        while self.size < target:
+            process = self._context.Process(
+                target=start_workers, args=(self.queues,), name=f"rq-{self.name}", daemon=False
+            )
+            process.start()
+            self.processes.append(process)
+        while self.size > target:
+            process = self.processes.pop()
+            os.kill(process.pid, signal.SIGTERM)  # Warm shutdown
+            self.stopping.append(process)
+
+    def tick(self, load, now: float):
+        self.reap()
+        size = self.size
+        target = self.controller.decide(size, self.busy(), self.backlog(), load, now)
+        if target != size:
+            logger.info(
+                f"Pool {self.name}: {size} -> {target} workers "
+                f"(cpu={self.controller.cpu:.2f}, iowait={self.controller.iowait:.2f}, "
+                f"mem_available={load.memory_available}, ffmpeg_rss={load.ffmpeg_rss})"
+            )
+            SCALE_EVENTS.inc(pool=self.name, direction="up" if target > size else "down")
+            self.scale_to(target)
+
+    def stop(self, timeout: Optional[float] = None):
+        self.scale_to(0)
+        for process in self.stopping:
+            process.join(timeout)
+
+
+def supervise(pools: List[WorkerPool], interval: float):
+    """Run the pools until SIGTERM/SIGINT, then let their workers finish"""
+    stop = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: stop.set())
+
+    sampler = LoadSampler()
+    sampler.sample()
+    for pool in pools:
+        pool.scale_to(pool.controller.limits.floor)
+        logger.info(f"Pool {pool.name} started on {pool.queues} with {pool.size} worker(s)")
+
+    while not stop.wait(interval):
+        load = sampler.sample()
+        now = time.monotonic()
+        for pool in pools:
+            try:
+                pool.tick(load, now)
+            except Exception as e:
+                logger.error(f"Pool {pool.name} tick failed: {str(e)}")
+
+    logger.info("Supervisor stopping, waiting for running tasks")
+    for pool in pools:
+        pool.stop()
+
+
+def main(classes: Optional[List[str]] = None):
+    redis_conn = redis.from_url(settings.redis_url)
+    pools = [pool for pool in class_pools(redis_conn) if not classes or pool.name in classes]
+    supervise(pools, settings.worker_scale_interval)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=settings.log_level)
+    main(sys.argv[1:] or None)
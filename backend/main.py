@@ -1,12 +1,17 @@
 """Main FastAPI application"""
 
-from fastapi import FastAPI
+import time
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 from app.core.config import get_settings
 from app.core.database import init_db
+from app.core.metrics import get_registry
 from app.api import health, video, reels, social, social_checker, schedules
+from app.workers.download_pool import shutdown_download_pool
+from app.workers.isolation import pin_api_process
 import logging
 
 # Setup logging
@@ -33,6 +38,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency - shows whether encodes on this host slow the API down
+REQUEST_LATENCY = get_registry().histogram(
+    "http_request_duration_seconds",
+    "API request latency",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - started
+    route = request.scope.get("route")
+    # Route template, not the raw path, to keep label cardinality bounded
+    path = getattr(route, "path", "unmatched")
+    # Buffered in-process; the metrics flusher thread writes it to Redis
+    REQUEST_LATENCY.observe(elapsed, method=request.method, route=path, status=str(response.status_code))
+    return response
+
 
 # Include routers
 # Include routers
@@ -59,6 +84,10 @@ app.include_router(instagram_verified.router, prefix="/api/instagram", tags=["In
 
 app.include_router(schedules.router, prefix="/api")
 
+# Job router (dead-letter queue)
+from app.api import jobs
+app.include_router(jobs.router, prefix="/api")
+
 # Analytics router
 from app.routers import analytics
 app.include_router(analytics.router)
@@ -92,6 +121,7 @@ async def startup_event():
     logger.info("🚀 GRAVIXAI Backend Starting...")
     init_db()
     logger.info("✓ Database initialized")
+    pin_api_process()
     logger.info("✓ All systems ready")
 
 
@@ -100,6 +130,7 @@ async def startup_event():
 async def shutdown_event():
     """Cleanup on shutdown"""
     logger.info("🛑 GRAVIXAI Backend Shutting Down...")
+    shutdown_download_pool()
 
 
 # Exception handlers
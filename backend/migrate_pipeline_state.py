@@ -0,0 +1,68 @@
+"""
+Database Migration: Add processing pipeline columns
+
+Adds columns used by the video processing pipeline:
+- videos.transcript_segments: Timed transcript index (JSON)
+
+Run with: python migrate_pipeline_state.py
+"""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+# Database path
+DB_PATH = Path(__file__).parent / "gravixai.db"
+
+# (table, column, DDL) - appended to as the pipeline grows
+COLUMNS = [
+    ("videos", "transcript_segments", "ALTER TABLE videos ADD COLUMN transcript_segments JSON"),
+]
+
+
+def migrate():
+    """Apply migration to add pipeline columns"""
+    if not DB_PATH.exists():
+        print(f"Error: Database not found at {DB_PATH}")
+        sys.exit(1)
+
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    print("🔄 Starting migration: Add processing pipeline columns")
+
+    try:
+        existing = {}
+        migrations_needed = []
+
+        for table, column, sql in COLUMNS:
+            if table not in existing:
+                cursor.execute(f"PRAGMA table_info({table})")
+                existing[table] = {col[1] for col in cursor.fetchall()}
+
+            if column not in existing[table]:
+                migrations_needed.append((table, column, sql))
+
+        if not migrations_needed:
+            print("✅ All columns already exist. No migration needed.")
+            return
+
+        # Execute migrations
+        for i, (table, column, sql) in enumerate(migrations_needed, 1):
+            print(f"  [{i}/{len(migrations_needed)}] {table}.{column}...")
+            cursor.execute(sql)
+
+        conn.commit()
+        print(f"✅ Successfully added {len(migrations_needed)} columns")
+
+    except Exception as e:
+        conn.rollback()
+        print(f"❌ Migration failed: {str(e)}")
+        sys.exit(1)
+
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    migrate()
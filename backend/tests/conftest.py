@@ -0,0 +1,15 @@
+"""
+Shared test setup: settings-dependent modules run against a throwaway SQLite file
+and storage directory (real environment variables win)
+"""
+
+import os
+import tempfile
+
+_storage = tempfile.mkdtemp(prefix="gravix_test_storage_")
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_storage, 'test.db')}")
+os.environ.setdefault("STORAGE_BASE_PATH", _storage)
+os.environ.setdefault("TEMP_PATH", os.path.join(_storage, "temp"))
+os.environ.setdefault("SOURCE_CACHE_PATH", os.path.join(_storage, "source_cache"))
+os.environ.setdefault("DOWNLOAD_SLOTS_PATH", os.path.join(_storage, "download_slots"))
@@ -0,0 +1,94 @@
+"""
+Test suite for source admission, download sections and probe error classification
+"""
+
+import pytest
+
+yt_dlp = pytest.importorskip("yt_dlp")
+
+from yt_dlp.networking.exceptions import TransportError
+
+from app.core.config import get_settings
+from app.services.time_ranges import TimeRange
+from app.services.youtube_service import YouTubeService, is_unavailable_error
+
+settings = get_settings()
+
+
+@pytest.fixture
+def service():
+    return YouTubeService()
+
+
+def info(**fields):
+    return {"duration": 600, "availability": "public", "live_status": "not_live", **fields}
+
+
+class TestCheckAdmission:
+    """Test which sources may enter the pipeline"""
+
+    def test_accepts_public_video(self, service):
+        assert service.check_admission(info()) is None
+
+    def test_rejects_live_and_upcoming(self, service):
+        assert "Live" in service.check_admission(info(is_live=True))
+        assert "Live" in service.check_admission(info(live_status="is_upcoming"))
+
+    def test_rejects_private(self, service):
+        assert "not publicly available" in service.check_admission(info(availability="private"))
+
+    def test_rejects_unknown_duration(self, service):
+        assert "duration" in service.check_admission(info(duration=None))
+
+    def test_rejects_too_long_and_too_short(self, service):
+        assert "too long" in service.check_admission(info(duration=settings.max_source_duration + 1))
+        assert "too short" in service.check_admission(info(duration=settings.min_chunk_duration - 1))
+
+    def test_ranges_make_a_long_video_admissible(self, service):
+        long_video = info(duration=settings.max_source_duration * 2)
+        assert service.check_admission(long_video, [TimeRange(0, 120)]) is None
+
+    def test_rejects_ranges_outside_the_video(self, service):
+        assert "within the video" in service.check_admission(info(), [TimeRange(700, 760)])
+
+    def test_rejects_ranges_too_short_for_a_reel(self, service):
+        assert "too short" in service.check_admission(info(), [TimeRange(0, settings.min_chunk_duration - 1)])
+
+
+class TestPlanSections:
+    """Test download section bounds"""
+
+    def test_range_ending_at_source_end_is_not_padded_past_it(self, service):
+        """Without cached info the stored Video.duration still clamps the padding"""
+        sections = service.plan_sections([TimeRange(570, 600)], source_duration=600)
+        padded, requested = sections[0]
+        assert padded.end == 600
+        assert padded.start == 570 - settings.download_range_padding
+        assert requested == [TimeRange(570, 600)]
+
+
+def download_error(cause: Exception) -> yt_dlp.utils.DownloadError:
+    return yt_dlp.utils.DownloadError(str(cause), exc_info=(type(cause), cause, None))
+
+
+class TestIsUnavailableError:
+    """Test permanent vs transient probe failures"""
+
+    def test_expected_extractor_error_is_permanent(self):
+        error = yt_dlp.utils.ExtractorError("Private video", expected=True)
+        assert is_unavailable_error(download_error(error))
+
+    def test_geo_restriction_is_permanent(self):
+        assert is_unavailable_error(download_error(yt_dlp.utils.GeoRestrictedError("blocked")))
+
+    def test_network_failure_is_transient(self):
+        error = yt_dlp.utils.ExtractorError("Unable to download webpage", expected=True, cause=TransportError("reset"))
+        assert not is_unavailable_error(download_error(error))
+
+    def test_rate_limit_is_transient(self):
+        error = yt_dlp.utils.ExtractorError("Sign in to confirm you're not a bot", expected=True)
+        assert not is_unavailable_error(download_error(error))
+
+    def test_unexpected_errors_are_transient(self):
+        assert not is_unavailable_error(download_error(yt_dlp.utils.ExtractorError("parse failure")))
+        assert not is_unavailable_error(OSError("connection refused"))
@@ -0,0 +1,67 @@
+"""
+Test suite for the AI prompt-response cache
+"""
+
+from app.core.metrics import MetricsRegistry, MetricsStore
+from app.services.ai_cache import PromptCache, cache_key
+
+
+class DictRedis:
+    """Minimal in-memory stand-in for the Redis calls the cache makes"""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+class TestCacheKey:
+    """Test key stability and normalization"""
+
+    def test_whitespace_and_float_noise_ignored(self):
+        a = cache_key("m", "v1", transcript="hello   world\n", duration=30.04)
+        b = cache_key("m", "v1", transcript=" hello world", duration=30.0)
+        assert a == b
+
+    def test_model_and_template_version_change_key(self):
+        base = cache_key("m", "v1", transcript="x")
+        assert cache_key("other", "v1", transcript="x") != base
+        assert cache_key("m", "v2", transcript="x") != base
+
+
+class TestPromptCache:
+    """Test hit/miss accounting"""
+
+    def test_round_trip_and_counters(self):
+        registry = MetricsRegistry(MetricsStore(redis_url=None))
+        cache = PromptCache(DictRedis(), ttl=60, namespace="t", registry=registry)
+        key = cache_key("m", "v1", transcript="x")
+
+        assert cache.get(key) is None
+        cache.set(key, {"title": "T"}, latency=1.5, prompt_tokens=200)
+        assert cache.get(key) == {"title": "T"}
+
+        requests = registry.counter("ai_cache_requests_total", "")
+        assert requests.value(namespace="t", result="miss") == 1
+        assert requests.value(namespace="t", result="hit") == 1
+        assert registry.counter("ai_cache_saved_seconds_total", "").value(namespace="t") == 1.5
+        assert registry.counter("ai_cache_saved_tokens_total", "").value(namespace="t") == 200
+
+    def test_unreadable_entries_are_dropped_misses(self):
+        registry = MetricsRegistry(MetricsStore(redis_url=None))
+        redis = DictRedis()
+        cache = PromptCache(redis, ttl=60, namespace="t", registry=registry)
+        for i, raw in enumerate([b"{not json", b'{"title": "old format"}', b'["value"]']):
+            key = cache_key("m", "v1", transcript=str(i))
+            redis.set(cache._key(key), raw)
+            assert cache.get(key) is None
+            assert cache._key(key) not in redis.data
+
+        assert registry.counter("ai_cache_requests_total", "").value(namespace="t", result="miss") == 3
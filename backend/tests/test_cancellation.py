@@ -0,0 +1,130 @@
+"""
+Test suite for cooperative job cancellation
+"""
+
+import os
+import subprocess
+import time
+
+import pytest
+
+from app.workers.cancellation import (
+    CancelToken, JobCancelled, cancel_keys, cancel_scope, check_cancelled, request_cancel, run_process,
+    stream_process
+)
+
+
+class FakeRedis:
+    """The few commands cancellation uses"""
+
+    def __init__(self):
+        self.keys = set()
+
+    def exists(self, *keys):
+        return sum(1 for key in keys if key in self.keys)
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def set(self, key, value, ex=None):
+        self.keys.add(key)
+
+    def execute(self):
+        return []
+
+
+def _gone(pid: int) -> bool:
+    """Exited (a zombie waiting for init to reap it counts as gone)"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().split(")")[-1].split()[0] == "Z"
+    except FileNotFoundError:
+        return True
+
+
+class TestCancelToken:
+    """Test cancel flags"""
+
+    def test_job_and_video_flags(self):
+        redis = FakeRedis()
+        token = CancelToken(redis, cancel_keys(job_id=1, video_id=9), poll_interval=0)
+        assert not token.cancelled
+        request_cancel(redis, video_id=9)
+        assert token.cancelled
+        assert cancel_keys(job_id=1) == ["cancel:job:1"]
+
+    def test_unreachable_redis_does_not_raise(self):
+        class DownRedis:
+            def pipeline(self, transaction=True):
+                raise ConnectionError("Connection refused")
+
+        assert request_cancel(DownRedis(), job_ids=[1], video_id=2) is False
+
+    def test_check_outside_scope_is_noop(self):
+        check_cancelled()
+
+    def test_check_inside_scope_raises(self):
+        redis = FakeRedis()
+        request_cancel(redis, job_ids=[3])
+        with cancel_scope(CancelToken.for_job(redis, job_id=3)):
+            with pytest.raises(JobCancelled):
+                check_cancelled()
+
+
+class TestRunProcess:
+    """Test process-group handling"""
+
+    def test_returns_output(self):
+        result = run_process(["sh", "-c", "echo out; echo err >&2"])
+        assert result.returncode == 0
+        assert result.stdout == "out\n" and result.stderr == "err\n"
+
+    def test_timeout_kills_process(self):
+        started = time.monotonic()
+        with pytest.raises(subprocess.TimeoutExpired):
+            run_process(["sleep", "30"], timeout=0.2)
+        assert time.monotonic() - started < 10
+
+    def test_cancel_kills_group_and_cleans_up(self, tmp_path):
+        pid_file = tmp_path / "pid"
+        partial = tmp_path / "partial.mp4"
+        partial.write_bytes(b"half")
+        redis = FakeRedis()
+        request_cancel(redis, job_ids=[5])
+
+        with cancel_scope(CancelToken.for_job(redis, job_id=5)):
+            with pytest.raises(JobCancelled):
+                run_process(["sh", "-c", f"sleep 30 & echo $! > {pid_file}; wait"], cleanup=[str(partial)])
+
+        assert not partial.exists()
+        child = int(pid_file.read_text())
+        deadline = time.monotonic() + 5
+        while not _gone(child) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert _gone(child)
+
+
+class TestStreamProcess:
+    """Test block-wise reads of a process's output"""
+
+    def test_yields_fixed_size_blocks(self):
+        blocks = list(stream_process(["sh", "-c", "printf abcdefg"], 3))
+        assert blocks == [b"abc", b"def", b"g"]
+
+    def test_failure_raises_with_stderr(self):
+        with pytest.raises(subprocess.CalledProcessError) as error:
+            list(stream_process(["sh", "-c", "echo broken >&2; exit 2"], 16))
+        assert error.value.stderr == b"broken\n"
+
+    def test_timeout_kills_a_stalled_read(self):
+        started = time.monotonic()
+        with pytest.raises(subprocess.TimeoutExpired):
+            list(stream_process(["sleep", "30"], 16, timeout=0.2))
+        assert time.monotonic() - started < 10
+
+    def test_cancel_kills_process(self):
+        redis = FakeRedis()
+        request_cancel(redis, job_ids=[6])
+        with cancel_scope(CancelToken.for_job(redis, job_id=6)):
+            with pytest.raises(JobCancelled):
+                list(stream_process(["sleep", "30"], 16))
@@ -0,0 +1,69 @@
+"""
+Test suite for the worker concurrency controller and /proc load parsing
+"""
+
+from app.workers.concurrency import MB, ConcurrencyController, ConcurrencyLimits
+from app.workers.node_load import NodeLoad, parse_cpu_times, parse_meminfo
+
+LIMITS = ConcurrencyLimits(floor=1, ceiling=4, cooldown=10, idle_cooldown=60)
+IDLE_NODE = NodeLoad(cpu=0.3, iowait=0.01, memory_available=8000 * MB)
+
+
+class TestConcurrencyController:
+    """Test scaling decisions"""
+
+    def test_grows_with_backlog_and_room(self):
+        controller = ConcurrencyController(LIMITS)
+        assert controller.decide(1, busy=1, backlog=5, load=IDLE_NODE, now=0) == 2
+
+    def test_cooldown_between_changes(self):
+        controller = ConcurrencyController(LIMITS)
+        assert controller.decide(1, 1, 5, IDLE_NODE, now=0) == 2
+        assert controller.decide(2, 2, 5, IDLE_NODE, now=5) == 2
+        assert controller.decide(2, 2, 5, IDLE_NODE, now=11) == 3
+
+    def test_never_above_ceiling(self):
+        controller = ConcurrencyController(LIMITS)
+        assert controller.decide(4, 4, 50, IDLE_NODE, now=0) == 4
+
+    def test_idle_worker_takes_the_backlog(self):
+        controller = ConcurrencyController(LIMITS)
+        assert controller.decide(3, busy=2, backlog=1, load=IDLE_NODE, now=0) == 3
+
+    def test_shrinks_when_cpu_saturated(self):
+        controller = ConcurrencyController(LIMITS)
+        busy_node = NodeLoad(cpu=0.99, memory_available=8000 * MB)
+        assert controller.decide(3, 3, 10, busy_node, now=0) == 2
+
+    def test_hysteresis_band_holds_size(self):
+        controller = ConcurrencyController(LIMITS)
+        warm = NodeLoad(cpu=0.9, memory_available=8000 * MB)
+        assert controller.decide(3, 3, 10, warm, now=0) == 3
+
+    def test_memory_headroom_blocks_growth(self):
+        controller = ConcurrencyController(LIMITS)
+        tight = NodeLoad(cpu=0.2, memory_available=1500 * MB, ffmpeg_rss=1200 * MB, ffmpeg_count=2)
+        assert controller.decide(2, 2, 10, tight, now=0) == 2
+
+    def test_idle_workers_retire_after_idle_cooldown(self):
+        controller = ConcurrencyController(LIMITS)
+        assert controller.decide(3, 0, 0, IDLE_NODE, now=0) == 3
+        assert controller.decide(3, 0, 0, IDLE_NODE, now=30) == 3
+        assert controller.decide(3, 0, 0, IDLE_NODE, now=61) == 2
+
+    def test_replaces_dead_workers_up_to_floor(self):
+        controller = ConcurrencyController(ConcurrencyLimits(floor=2, ceiling=4))
+        assert controller.decide(0, 0, 0, IDLE_NODE, now=0) == 2
+
+
+class TestProcParsing:
+    """Test /proc readers"""
+
+    def test_cpu_times(self):
+        stat = "cpu  100 5 50 800 40 3 2 0 7 0\ncpu0 50 2 25 400 20 1 1 0 0 0\n"
+        assert parse_cpu_times(stat) == (1000, 800, 40)
+
+    def test_meminfo_in_bytes(self):
+        fields = parse_meminfo("MemTotal:       16000 kB\nMemAvailable:    8000 kB\nHugePages_Total:       0\n")
+        assert fields["MemAvailable"] == 8000 * 1024
+        assert fields["HugePages_Total"] == 0
@@ -0,0 +1,45 @@
+"""
+Test suite for pipeline stage graphs
+"""
+
+import pytest
+
+from app.workers.dag import VIDEO_PIPELINE, PipelineDefinitionError, Stage, StageGraph
+
+
+class TestStageGraph:
+    """Test validation and ordering"""
+
+    def test_video_pipeline_order(self):
+        assert [s.name for s in VIDEO_PIPELINE.order] == ["download", "cut", "verticalize", "ai", "publish"]
+        assert [s.name for s in VIDEO_PIPELINE.roots()] == ["download"]
+        assert [s.name for s in VIDEO_PIPELINE.downstream("verticalize")] == ["ai"]
+
+    def test_diamond_is_ordered_after_all_dependencies(self):
+        graph = StageGraph("g", [
+            Stage("join", "j", depends_on=("left", "right")),
+            Stage("left", "l", depends_on=("root",)),
+            Stage("right", "r", depends_on=("root",)),
+            Stage("root", "r0"),
+        ])
+        names = [s.name for s in graph.order]
+        assert names.index("join") > names.index("left")
+        assert names.index("join") > names.index("right")
+        assert names[0] == "root"
+
+    def test_cycle_rejected(self):
+        with pytest.raises(PipelineDefinitionError):
+            StageGraph("g", [Stage("a", "a", depends_on=("b",)), Stage("b", "b", depends_on=("a",))])
+
+    def test_unknown_dependency_rejected(self):
+        with pytest.raises(PipelineDefinitionError):
+            StageGraph("g", [Stage("a", "a", depends_on=("missing",))])
+
+    def test_fan_out_needs_single_upstream(self):
+        with pytest.raises(PipelineDefinitionError):
+            StageGraph("g", [Stage("a", "a"), Stage("b", "b"), Stage("c", "c", depends_on=("a", "b"), fan_out=True)])
+
+    def test_optional_stage_enabled_by_options(self):
+        publish = VIDEO_PIPELINE.stages["publish"]
+        assert not VIDEO_PIPELINE.enabled(publish, {})
+        assert VIDEO_PIPELINE.enabled(publish, {"publish": True})
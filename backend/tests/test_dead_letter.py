@@ -0,0 +1,55 @@
+"""
+Test suite for the dead-letter queue (needs a local Redis)
+"""
+
+import pytest
+
+redis = pytest.importorskip("redis")
+
+from app.workers.dead_letter import DeadLetterQueue, ENTRY_KEY, LIST_KEY
+
+
+@pytest.fixture
+def client():
+    conn = redis.Redis.from_url("redis://localhost:6379/15")
+    try:
+        conn.ping()
+    except redis.exceptions.ConnectionError:
+        pytest.skip("Redis is not running on localhost:6379")
+    conn.delete(LIST_KEY, ENTRY_KEY, *conn.keys("dead_letter:user:*"))
+    yield conn
+    conn.delete(LIST_KEY, ENTRY_KEY, *conn.keys("dead_letter:user:*"))
+
+
+class TestDeadLetterQueue:
+    """Test the capped dead-letter store"""
+
+    def test_newest_first_and_capped(self, client):
+        dlq = DeadLetterQueue(client, max_entries=2)
+        for job_id in (1, 2, 3):
+            dlq.add(job_id, "cutting", "boom", attempts=3)
+        assert [e['job_id'] for e in dlq.list()] == [3, 2]
+        assert dlq.get(1) is None
+        assert len(dlq) == 2
+
+    def test_remove_and_re_add(self, client):
+        dlq = DeadLetterQueue(client)
+        dlq.add(7, "cutting", "first", attempts=1, call={'func': 'f', 'args': [], 'kwargs': {}})
+        dlq.add(7, "cutting", "second", attempts=2)
+        assert len(dlq) == 1
+        assert dlq.get(7)['error'] == "second"
+        dlq.remove(7)
+        assert dlq.get(7) is None and len(dlq) == 0
+
+    def test_pages_and_counts_per_owner(self, client):
+        dlq = DeadLetterQueue(client, max_entries=3)
+        for job_id, user_id in ((1, 10), (2, 20), (3, 10), (4, 20)):
+            dlq.add(job_id, "cutting", "boom", attempts=3, user_id=user_id)
+        # Job 1 was trimmed by the cap: gone from its owner's index too
+        assert [e['job_id'] for e in dlq.list(user_id=10)] == [3]
+        assert [e['job_id'] for e in dlq.list(limit=1, user_id=20)] == [4]
+        assert [e['job_id'] for e in dlq.list(limit=1, offset=1, user_id=20)] == [2]
+        assert dlq.count(10) == 1 and dlq.count(20) == 2 and len(dlq) == 3
+
+        dlq.remove(4)
+        assert dlq.count(20) == 1
@@ -0,0 +1,223 @@
+"""
+Test suite for the download pool: slots, verification, monitoring and retries
+"""
+
+import asyncio
+import subprocess
+import threading
+
+import pytest
+
+yt_dlp = pytest.importorskip("yt_dlp")
+
+from app.core.config import get_settings
+from app.services.source_cache import SourceCache
+from app.workers import download_pool
+from app.workers.download_pool import (
+    DownloadSlots,
+    DownloadTask,
+    InlineDownloadPool,
+    MediaIntegrityError,
+    _DownloadMonitor,
+    run_download_task,
+    tail_decode_problem,
+    verify_media,
+)
+
+settings = get_settings()
+
+
+class TestDownloadSlots:
+    """Test host-wide slot limits"""
+
+    def test_active_counts_live_holders(self, tmp_path):
+        slots = DownloadSlots(str(tmp_path), 2)
+        assert slots.active() == 0
+        with slots.acquire() as slot:
+            assert slot == 0
+            assert slots.active() == 1
+        assert slots.active() == 0
+
+    def test_full_slots_block_until_released(self, tmp_path):
+        slots = DownloadSlots(str(tmp_path), 1)
+        acquired = threading.Event()
+
+        def second():
+            with slots.acquire():
+                acquired.set()
+
+        with slots.acquire():
+            thread = threading.Thread(target=second)
+            thread.start()
+            assert not acquired.wait(0.3)
+        assert acquired.wait(3)
+        thread.join()
+
+
+def completed(stdout: str = "", stderr: str = "", returncode: int = 0):
+    return subprocess.CompletedProcess([], returncode, stdout, stderr)
+
+
+@pytest.fixture
+def ffmpeg(monkeypatch):
+    """Canned ffprobe/ffmpeg results"""
+    results = {}
+
+    def run(cmd, **kwargs):
+        return results["probe" if cmd[0] == settings.ffprobe_path else "tail"]
+
+    monkeypatch.setattr(download_pool.subprocess, "run", run)
+    results["probe"] = completed("60.0\n")
+    results["tail"] = completed()
+    return results
+
+
+class TestVerifyMedia:
+    """Test integrity checks"""
+
+    def test_sound_file(self, ffmpeg):
+        assert verify_media("a.mp4", expected_duration=60) is None
+
+    def test_harmless_warnings_pass(self, ffmpeg):
+        ffmpeg["tail"] = completed(stderr="[mp4 @ 0x1] Non-monotonous DTS in output stream; previous: 5, current: 4\n")
+        assert verify_media("a.mp4") is None
+
+    def test_decode_errors_fail(self, ffmpeg):
+        ffmpeg["tail"] = completed(stderr="[h264 @ 0x1] error while decoding MB 12 3, bytestream -5\n")
+        assert "tail does not decode" in verify_media("a.mp4")
+
+    def test_failed_decode_fails(self, ffmpeg):
+        ffmpeg["tail"] = completed(stderr="a.mp4: No such file or directory\n", returncode=1)
+        assert verify_media("a.mp4") is not None
+
+    def test_truncated(self, ffmpeg):
+        assert verify_media("a.mp4", expected_duration=120).startswith("truncated")
+
+    def test_unreadable_container(self, ffmpeg):
+        ffmpeg["probe"] = completed(stderr="moov atom not found", returncode=1)
+        assert verify_media("a.mp4").startswith("unreadable container")
+
+    def test_tail_decode_problem(self):
+        assert tail_decode_problem(0, "") is None
+        assert tail_decode_problem(0, "Invalid data found when processing input") is not None
+
+
+class FakeYdl:
+    def __init__(self):
+        self.params = {}
+
+
+class FakeSlots:
+    def __init__(self, active):
+        self._active = active
+
+    def active(self):
+        return self._active
+
+
+class TestDownloadMonitor:
+    """Test bandwidth sharing and cancellation in the progress hook"""
+
+    def test_rebalances_to_an_equal_share(self):
+        ydl = FakeYdl()
+        monitor = _DownloadMonitor(ydl, FakeSlots(3), bandwidth_limit=9_000_000, job_id=None)
+        monitor({"status": "downloading", "downloaded_bytes": 10})
+        assert ydl.params["ratelimit"] == 3_000_000
+
+    def test_share_follows_active_downloads(self):
+        ydl = FakeYdl()
+        slots = FakeSlots(2)
+        monitor = _DownloadMonitor(ydl, slots, bandwidth_limit=8_000_000, job_id=None)
+        monitor.rebalance()
+        assert ydl.params["ratelimit"] == 4_000_000
+        slots._active = 0
+        monitor.rebalance()
+        assert ydl.params["ratelimit"] == 8_000_000
+
+    def test_unlimited_bandwidth_sets_no_ratelimit(self):
+        ydl = FakeYdl()
+        _DownloadMonitor(ydl, FakeSlots(2), bandwidth_limit=0, job_id=None).rebalance()
+        assert "ratelimit" not in ydl.params
+
+    def test_cancelled_token_aborts(self):
+        class Token:
+            cancelled = True
+
+        monitor = _DownloadMonitor(FakeYdl(), FakeSlots(1), 0, None, token=Token())
+        with pytest.raises(yt_dlp.utils.DownloadCancelled):
+            monitor({"status": "downloading"})
+
+
+@pytest.fixture
+def fake_download(monkeypatch):
+    """yt-dlp replaced by a writer; verification scripted per call"""
+    calls = {"downloads": 0, "verifications": []}
+
+    def run_ydl(task, opts, slots, token=None):
+        calls["downloads"] += 1
+        path = opts["outtmpl"].replace("%(ext)s", "mp4")
+        with open(path, "wb") as f:
+            f.write(b"x" * 1024)
+        return {"id": task.youtube_id, "duration": 60}
+
+    def verify(path, expected_duration=None):
+        outcome = calls["verdicts"].pop(0) if calls.get("verdicts") else None
+        calls["verifications"].append(path)
+        return outcome
+
+    monkeypatch.setattr(download_pool, "_run_ydl", run_ydl)
+    monkeypatch.setattr(download_pool, "verify_media", verify)
+    return calls
+
+
+def make_task(tmp_path, youtube_id: str) -> DownloadTask:
+    return DownloadTask(
+        youtube_url=f"https://youtu.be/{youtube_id}",
+        youtube_id=youtube_id,
+        cache_key="18",
+        dest=str(tmp_path / youtube_id / f"{youtube_id}.mp4"),
+        file_name=youtube_id,
+        ydl_opts={},
+    )
+
+
+class TestRunDownloadTask:
+    """Test verification retries and cache hits"""
+
+    def test_corrupt_download_is_fetched_again(self, tmp_path, fake_download):
+        fake_download["verdicts"] = ["tail does not decode", None]
+        outcome = run_download_task(make_task(tmp_path, "retry01"))
+        assert fake_download["downloads"] == 2
+        assert outcome["metrics"]["attempts"] == 2
+        assert outcome["cache_hit"] is False
+
+    def test_gives_up_after_two_attempts(self, tmp_path, fake_download):
+        fake_download["verdicts"] = ["truncated", "truncated"]
+        with pytest.raises(MediaIntegrityError):
+            run_download_task(make_task(tmp_path, "broken01"))
+        cache = SourceCache(settings.source_cache_path)
+        assert not cache.entry_path("broken01", "18").exists()
+
+    def test_verified_cache_hit_is_not_verified_again(self, tmp_path, fake_download):
+        run_download_task(make_task(tmp_path / "first", "cached01"))
+        assert len(fake_download["verifications"]) == 1
+
+        outcome = run_download_task(make_task(tmp_path / "second", "cached01"))
+        assert outcome["cache_hit"] is True
+        assert fake_download["downloads"] == 1
+        assert len(fake_download["verifications"]) == 1
+
+
+class TestInlineDownloads:
+    """Test the in-process pool used by RQ work horses"""
+
+    def test_worker_context_gets_inline_pool(self, monkeypatch):
+        monkeypatch.setattr(download_pool, "_pool", None)
+        monkeypatch.setattr(download_pool, "_inline", False)
+        download_pool.run_downloads_inline()
+        assert isinstance(download_pool.get_download_pool(), InlineDownloadPool)
+
+    def test_runs_task_in_process(self, tmp_path, fake_download):
+        outcome = asyncio.run(InlineDownloadPool().run(make_task(tmp_path, "inline01")))
+        assert outcome["cache_hit"] is False
+        assert fake_download["downloads"] == 1
@@ -0,0 +1,80 @@
+"""
+Test suite for per-title CRF selection
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.services import encode_optimizer
+from app.services.encode_optimizer import EncodeOptimizer, compute_ssim
+
+
+def frames(seed: int = 0, count: int = 3, height: int = 32, width: int = 48):
+    return np.random.default_rng(seed).integers(0, 256, size=(count, height, width)).astype(np.uint8)
+
+
+class TestComputeSsim:
+    """Test the SSIM measure"""
+
+    def test_identical_frames(self):
+        reference = frames()
+        assert compute_ssim(reference, reference.copy()) == pytest.approx(1.0)
+
+    def test_more_distortion_scores_lower(self):
+        reference = frames()
+        noise = np.random.default_rng(1).normal(0, 1, reference.shape)
+        light = np.clip(reference + noise * 5, 0, 255)
+        heavy = np.clip(reference + noise * 40, 0, 255)
+        assert 1.0 > compute_ssim(reference, light) > compute_ssim(reference, heavy)
+
+    def test_unrelated_frames_score_low(self):
+        assert compute_ssim(frames(0), frames(1)) < 0.2
+
+
+class FakeOptimizer(EncodeOptimizer):
+    """Sample encodes write files sized by CRF; decodes tag frames with their CRF"""
+
+    def _encode_sample(self, input_path, output_path, start, crf):
+        with open(output_path, "wb") as f:
+            f.write(b"\0" * (100_000 // crf))
+
+    def _decode_luma(self, path, start, duration):
+        name = path.rsplit("/", 1)[-1]
+        crf = int(name.split("_")[1]) if name.startswith("sample_") else 0
+        return np.full((4, 8, 8), crf, dtype=np.uint8)
+
+
+@pytest.fixture
+def ssim_by_crf(monkeypatch):
+    scores = {23: 0.99, 25: 0.98, 27: 0.97, 29: 0.95, 31: 0.90}
+    monkeypatch.setattr(encode_optimizer, "compute_ssim", lambda reference, distorted: scores[int(distorted[0, 0, 0])])
+    return scores
+
+
+class TestOptimize:
+    """Test CRF selection and its fallbacks"""
+
+    def test_highest_crf_above_floor(self, ssim_by_crf):
+        decision = FakeOptimizer(ssim_floor=0.96).optimize("in.mp4", 0.0, 30.0)
+        assert decision.crf == 27
+        assert decision.ssim == pytest.approx(0.97)
+        assert decision.maxrate_kbps is None
+
+    def test_best_candidate_kept_when_none_reach_floor(self, ssim_by_crf):
+        decision = FakeOptimizer(ssim_floor=0.995).optimize("in.mp4", 0.0, 30.0)
+        assert decision.crf == 23
+
+    def test_size_cap_sets_maxrate(self, ssim_by_crf):
+        decision = FakeOptimizer(max_size_bytes=10_000_000).optimize("in.mp4", 0.0, 30.0)
+        assert decision.maxrate_kbps == int(10_000_000 * 8 * 0.95 / 1000 / 30 - 128)
+        assert decision.estimated_size <= 10_000_000
+
+    def test_unreachable_cap_falls_back_to_baseline(self, ssim_by_crf):
+        decision = FakeOptimizer(max_size_bytes=1000).optimize("in.mp4", 0.0, 30.0)
+        assert decision.crf == EncodeOptimizer.BASELINE_CRF
+        assert decision.maxrate_kbps is None
+
+    def test_short_range_uses_baseline(self):
+        decision = FakeOptimizer(max_size_bytes=1000).optimize("in.mp4", 0.0, 1.0)
+        assert decision.crf == EncodeOptimizer.BASELINE_CRF
@@ -0,0 +1,160 @@
+"""
+Test suite for deficit round-robin scheduling
+"""
+
+import pytest
+
+from app.workers.fair_queue import DeficitRoundRobin, FairQueue
+
+
+class TestDeficitRoundRobin:
+    """Test fairness across flows"""
+
+    def test_long_video_does_not_block_short_one(self):
+        drr = DeficitRoundRobin(quantum=30)
+        queues = {"1:standard": [30.0] * 360, "2:standard": [30.0] * 10}
+        picks, ring, _ = drr.schedule(["1:standard", "2:standard"], {}, {}, queues, slots=4)
+        assert picks == ["1:standard", "2:standard", "1:standard", "2:standard"]
+        assert ring == ["1:standard", "2:standard"]
+
+    def test_weights_scale_share(self):
+        drr = DeficitRoundRobin(quantum=30)
+        queues = {"a": [30.0] * 20, "b": [30.0] * 20}
+        picks, _, _ = drr.schedule(["a", "b"], {}, {"a": 1.0, "b": 0.25}, queues, slots=10)
+        assert picks.count("a") == 8 and picks.count("b") == 2
+
+    def test_expensive_task_waits_for_credit(self):
+        drr = DeficitRoundRobin(quantum=100)
+        picks, ring, deficits = drr.schedule(["big", "small"], {}, {}, {"big": [250.0], "small": [10.0] * 5}, slots=1)
+        assert picks == ["small"]
+        assert deficits["big"] == 100.0
+        # Credit is kept between dispatches
+        picks, _, _ = drr.schedule(ring, deficits, {}, {"big": [250.0], "small": [10.0] * 4}, slots=6)
+        assert picks.count("big") == 1
+
+    def test_drained_flows_leave_ring(self):
+        drr = DeficitRoundRobin(quantum=30)
+        picks, ring, deficits = drr.schedule(["a", "b"], {"a": 5.0}, {}, {"a": [10.0], "b": []}, slots=5)
+        assert picks == ["a"]
+        assert ring == [] and deficits == {}
+
+    def test_quantum_must_be_positive(self):
+        with pytest.raises(ValueError):
+            DeficitRoundRobin(quantum=0)
+
+
+class FakeRedis:
+    """The commands FairQueue uses, in memory (bytes out, like redis-py)"""
+
+    def __init__(self):
+        self.data = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def set(self, key, value, nx=False, px=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    def exists(self, *keys):
+        return sum(1 for key in keys if key in self.data)
+
+    def delete(self, *keys):
+        return sum(1 for key in keys if self.data.pop(key, None) is not None)
+
+    def rpush(self, key, *values):
+        self.data.setdefault(key, []).extend(str(v).encode() for v in values)
+
+    def lpop(self, key):
+        values = self.data.get(key)
+        if not values:
+            return None
+        value = values.pop(0)
+        if not values:
+            del self.data[key]
+        return value
+
+    def lrange(self, key, start, end):
+        return list(self.data.get(key, []))
+
+    def llen(self, key):
+        return len(self.data.get(key, []))
+
+    def hset(self, key, field=None, value=None, mapping=None):
+        fields = self.data.setdefault(key, {})
+        for k, v in (mapping or {field: value}).items():
+            fields[str(k).encode()] = str(v).encode()
+
+    def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    def sadd(self, key, member):
+        self.data.setdefault(key, set()).add(member.encode())
+
+    def srem(self, key, member):
+        self.data.get(key, set()).discard(member.encode())
+
+    def smembers(self, key):
+        return set(self.data.get(key, set()))
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+    def execute(self):
+        return [getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+class FakeRqQueue:
+    name = "cpu"
+
+    def __init__(self, on_enqueue=None):
+        self.jobs = []
+        self.on_enqueue = on_enqueue
+
+    @property
+    def count(self):
+        return len(self.jobs)
+
+    def enqueue(self, func, *args, **kwargs):
+        self.jobs.append(args)
+        if self.on_enqueue:
+            self.on_enqueue()
+
+
+def task(*args):
+    pass
+
+
+class TestFairQueueDispatch:
+    """Test that no waiting task is stranded by a busy dispatcher"""
+
+    def test_push_while_locked_leaves_task_waiting_and_flags_dirty(self):
+        redis = FakeRedis()
+        queue = FairQueue(redis, FakeRqQueue(), quantum=30, depth=10)
+        redis.set(queue._key("lock"), 1)
+        queue.push("1:standard", 1.0, 30, 1, task, 1)
+        assert queue.rq_queue.count == 0
+        assert redis.exists(queue._key("dirty"))
+
+    def test_push_during_dispatch_is_dispatched_by_the_holder(self):
+        redis = FakeRedis()
+        pushed = []
+
+        def push_from_another_process():
+            # Runs while the first dispatch holds the lock
+            if not pushed:
+                pushed.append(True)
+                FairQueue(redis, rq_queue, quantum=30, depth=10).push("2:standard", 1.0, 30, 2, task, 2)
+
+        rq_queue = FakeRqQueue(on_enqueue=push_from_another_process)
+        FairQueue(redis, rq_queue, quantum=30, depth=10).push("1:standard", 1.0, 30, 1, task, 1)
+        assert rq_queue.jobs == [(1,), (2,)]
+        assert not redis.exists("fair_queue:cpu:lock", "fair_queue:cpu:dirty")
@@ -0,0 +1,84 @@
+"""
+Test suite for cost-aware download format planning
+"""
+
+from app.services.format_planner import FormatPlanner, decode_cost_factor
+
+
+def _video(format_id, height, vcodec, filesize, fps=30):
+    return {
+        "format_id": format_id,
+        "height": height,
+        "width": height * 16 // 9,
+        "vcodec": vcodec,
+        "acodec": "none",
+        "fps": fps,
+        "filesize": filesize,
+    }
+
+
+def _audio(format_id, acodec, abr, ext):
+    return {
+        "format_id": format_id,
+        "vcodec": "none",
+        "acodec": acodec,
+        "abr": abr,
+        "ext": ext,
+        "filesize": int(abr * 1000 / 8 * 600),
+    }
+
+
+INFO = {
+    "duration": 600,
+    "formats": [
+        _audio("139", "mp4a.40.5", 48, "m4a"),
+        _audio("140", "mp4a.40.2", 129, "m4a"),
+        _audio("251", "opus", 135, "webm"),
+        _video("134", 360, "avc1.4d401e", 20_000_000),
+        _video("136", 720, "avc1.4d401f", 60_000_000),
+        _video("247", 720, "vp9", 45_000_000),
+        _video("398", 720, "av01.0.05M.08", 35_000_000),
+        _video("137", 1080, "avc1.640028", 120_000_000),
+        _video("313", 2160, "vp9", 900_000_000),
+    ],
+}
+
+
+class TestFormatPlanner:
+    """Test stream selection for a 608px output band"""
+
+    def test_picks_smallest_covering_tier_with_h264(self):
+        """720p H.264 beats 4K VP9 and smaller-but-costlier AV1"""
+        plan = FormatPlanner(target_height=608).plan(INFO)
+
+        assert plan.format_selector == "136+140"
+        assert plan.height == 720
+        assert plan.vcodec.startswith("avc1")
+
+    def test_plan_reports_bytes_and_decode_cost(self):
+        """Each candidate carries expected size and decode cost"""
+        ranked = FormatPlanner(target_height=608).rank(INFO)
+        by_video = {p.video_format_id: p for p in ranked}
+
+        assert by_video["136"].expected_bytes == 60_000_000 + INFO["formats"][1]["filesize"]
+        assert by_video["247"].decode_cost > by_video["136"].decode_cost
+        assert by_video["313"].decode_cost > by_video["137"].decode_cost
+
+    def test_never_upscales_when_higher_tier_exists(self):
+        """360p should rank below every format covering the band"""
+        ranked = FormatPlanner(target_height=608).rank(INFO)
+        assert ranked[-1].video_format_id == "134"
+
+    def test_uses_largest_when_nothing_covers_target(self):
+        """Low-resolution sources fall back to their best height"""
+        info = {"duration": 60, "formats": INFO["formats"][:4]}
+        plan = FormatPlanner(target_height=608).plan(info)
+        assert plan.video_format_id == "134"
+
+    def test_fallback_without_info(self):
+        """No format list yields a height-capped H.264-first selector"""
+        plan = FormatPlanner(fallback_max_height=720).plan(None)
+        assert plan.format_selector.startswith("bestvideo[height<=720][vcodec^=avc1]")
+
+    def test_codec_cost_ordering(self):
+        assert decode_cost_factor("avc1.640028") < decode_cost_factor("vp09.00.40.08") < decode_cost_factor("av01.0.05M.08")
@@ -0,0 +1,48 @@
+"""
+Test suite for the offline heuristic metadata engine
+"""
+
+from app.services.heuristic_metadata import HeuristicMetadataEngine, generate_batch, rake_candidates
+
+REELS = [
+    "Welcome back to the podcast. Today we talk about compound interest and why investing early matters.",
+    "Welcome back to the podcast. My morning workout routine builds muscle without a gym membership!",
+    "Welcome back to the podcast. Can sleep deprivation really wreck your brain? Studies say 7 hours.",
+]
+
+
+class TestKeyPhrases:
+    """Test RAKE candidates and TF-IDF weighting"""
+
+    def test_candidates_split_on_stopwords_and_punctuation(self):
+        assert rake_candidates("the compound interest is huge, really") == [["compound", "interest"], ["huge"]]
+
+    def test_words_common_to_every_reel_rank_low(self):
+        engine = HeuristicMetadataEngine().fit(REELS)
+        phrases = [phrase for phrase, _ in engine.key_phrases(REELS[0], limit=2)]
+        assert all("podcast" not in p and "welcome" not in p for p in phrases)
+        assert "compound interest" in phrases
+
+
+class TestGenerate:
+    """Test output shape and vocabulary mapping"""
+
+    def test_shape_matches_gemini_metadata(self):
+        metadata = generate_batch(REELS, [30.0, 30.0, 30.0])
+        for item in metadata:
+            assert set(item) == {"title", "caption", "hashtags", "topics", "quality_score"}
+            assert len(item["title"]) <= 50
+            assert len(item["caption"]) <= 150
+            assert 0.0 <= item["quality_score"] <= 1.0
+            assert all(tag.startswith("#") for tag in item["hashtags"])
+
+    def test_vocabulary_topics(self):
+        metadata = generate_batch(REELS, [30.0, 30.0, 30.0])
+        assert "finance" in metadata[0]["topics"] or "business" in metadata[0]["topics"]
+        assert "#fitness" in metadata[1]["hashtags"]
+        assert "health" in metadata[2]["topics"]
+
+    def test_empty_transcript_gets_low_score(self):
+        metadata = HeuristicMetadataEngine().generate(None, 30.0)
+        assert metadata["quality_score"] == 0.3
+        assert metadata["hashtags"]
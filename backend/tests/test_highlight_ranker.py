@@ -0,0 +1,102 @@
+"""
+Test suite for highlight window scoring and selection
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.services import highlight_ranker
+from app.services.highlight_ranker import (
+    AUDIO_RATE, Highlight, HighlightRanker, loudness_per_second, speech_per_second
+)
+from app.services.transcript_index import TranscriptIndex
+
+
+def highlight(start: float, score: float, window: int = 30) -> Highlight:
+    return Highlight(start, start + window, score, 0.0, 0.0, 0.0)
+
+
+class TestScoreWindows:
+    """Test sliding-window scoring"""
+
+    def test_windows_on_the_hop_grid(self):
+        ranker = HighlightRanker(window=10, hop=5)
+        signal = np.zeros(40)
+        highlights = ranker.score_windows(signal, signal, signal)
+        assert [(h.start, h.end) for h in highlights] == [(0, 10), (5, 15), (10, 20), (15, 25), (20, 30), (25, 35), (30, 40)]
+
+    def test_busiest_window_scores_highest(self):
+        ranker = HighlightRanker(window=10, hop=10)
+        loudness = np.full(40, -30.0)
+        loudness[20:30:2] = -5.0  # Loudness swings in the third window
+        motion = np.zeros(40)
+        motion[20:30] = 8.0
+        speech = np.zeros(40)
+        speech[20:30] = 2.0
+        highlights = ranker.score_windows(loudness, motion, speech)
+        assert max(highlights, key=lambda h: h.score).start == 20
+
+    def test_source_shorter_than_window(self):
+        assert HighlightRanker(window=30).score_windows(np.zeros(20), np.zeros(20), np.zeros(20)) == []
+
+    def test_missing_motion_is_ignored(self):
+        ranker = HighlightRanker(window=10, hop=10)
+        highlights = ranker.score_windows(np.zeros(30), np.zeros(0), np.zeros(30))
+        assert len(highlights) == 3
+        assert all(h.motion == 0 for h in highlights)
+
+
+class TestTopWindows:
+    """Test non-overlapping selection"""
+
+    def test_best_non_overlapping_in_time_order(self):
+        highlights = [highlight(60, 0.5), highlight(0, 1.0), highlight(10, 3.0), highlight(30, 2.0)]
+        top = HighlightRanker().top_windows(highlights, 2)
+        assert [h.start for h in top] == [10, 60]
+
+    def test_overlapping_runner_up_is_skipped(self):
+        highlights = [highlight(0, 3.0), highlight(15, 2.5), highlight(40, 1.0)]
+        assert [h.start for h in HighlightRanker().top_windows(highlights, 2)] == [0, 40]
+
+    def test_fewer_windows_than_asked(self):
+        assert len(HighlightRanker().top_windows([highlight(0, 1.0)], 5)) == 1
+
+
+class TestSpeechPerSecond:
+    """Test transcript word density"""
+
+    def test_words_spread_over_their_segment(self):
+        transcript = TranscriptIndex.from_segments([(2.0, 4.0, "amazing goal scored")])
+        density = speech_per_second(transcript, 6)
+        assert density.tolist() == [0, 0, 1.5, 1.5, 0, 0]
+
+    def test_stopwords_and_short_words_do_not_count(self):
+        transcript = TranscriptIndex.from_segments([(0.0, 1.0, "the and it is so")])
+        assert speech_per_second(transcript, 2).sum() == 0
+
+    def test_segments_past_the_end_are_clipped(self):
+        transcript = TranscriptIndex.from_segments([(3.0, 9.0, "penalty kick saved")])
+        assert len(speech_per_second(transcript, 5)) == 5
+
+    def test_no_transcript(self):
+        assert speech_per_second(None, 3).tolist() == [0, 0, 0]
+
+
+class TestLoudnessPerSecond:
+    """Test per-second RMS over the decoded audio stream"""
+
+    def test_rms_per_second_block(self, monkeypatch):
+        second = AUDIO_RATE * 2
+        silent = np.zeros(AUDIO_RATE, dtype=np.int16).tobytes()
+        full_scale = np.full(AUDIO_RATE, 32767, dtype=np.int16).tobytes()
+
+        def stream(cmd, block_size, timeout=None, isolate=False):
+            assert block_size == second
+            yield from (silent, full_scale, full_scale[:100])
+
+        monkeypatch.setattr(highlight_ranker, "stream_process", stream)
+        loudness = loudness_per_second("in.mp4")
+        assert len(loudness) == 2  # The partial last second is dropped
+        assert loudness[0] == pytest.approx(-100.0)
+        assert loudness[1] == pytest.approx(0.0, abs=0.01)
@@ -0,0 +1,97 @@
+"""
+Test suite for encode isolation profiles
+"""
+
+import pytest
+
+from app.workers import isolation
+from app.workers.isolation import IsolationProfile, command_prefix, parse_cpu_list, parse_ionice
+
+
+@pytest.fixture
+def all_tools(monkeypatch):
+    monkeypatch.setattr(isolation, "_tool", lambda name: f"/usr/bin/{name}")
+
+
+class TestParsing:
+    """Test settings parsing"""
+
+    def test_cpu_list(self):
+        assert parse_cpu_list("0-1,4") == {0, 1, 4}
+        assert parse_cpu_list(" 2 , 5-6 ") == {2, 5, 6}
+        assert parse_cpu_list("") == frozenset()
+
+    def test_ionice(self):
+        assert parse_ionice("best-effort:7") == (2, 7)
+        assert parse_ionice("idle") == (3, None)
+        assert parse_ionice("") is None
+
+    def test_unknown_ionice_class(self):
+        with pytest.raises(ValueError):
+            parse_ionice("lowest")
+
+
+class TestCommandPrefix:
+    """Test wrapping of encode commands"""
+
+    def test_full_profile(self, all_tools):
+        profile = IsolationProfile(nice=10, ionice="best-effort:7", cpus=frozenset({3, 2}))
+        assert command_prefix(profile) == [
+            "/usr/bin/ionice", "-c", "2", "-n", "7",
+            "/usr/bin/nice", "-n", "10",
+            "/usr/bin/taskset", "-c", "2,3",
+        ]
+
+    def test_empty_profile(self, all_tools):
+        profile = IsolationProfile()
+        assert not profile.enabled
+        assert command_prefix(profile) == []
+
+    def test_missing_tools_are_skipped(self, monkeypatch):
+        monkeypatch.setattr(isolation, "_tool", lambda name: "/usr/bin/nice" if name == "nice" else None)
+        profile = IsolationProfile(nice=5, ionice="idle", cpus=frozenset({1}))
+        assert command_prefix(profile) == ["/usr/bin/nice", "-n", "5"]
+
+
+class TestIsolateCurrentProcess:
+    """Test applying the profile to a worker process"""
+
+    PROFILE = IsolationProfile(nice=10, cpus=frozenset({2}), cgroup="gravix.slice/encode")
+
+    @pytest.fixture
+    def calls(self, monkeypatch, all_tools):
+        calls = []
+        monkeypatch.setattr(isolation, "_applied", IsolationProfile())
+        monkeypatch.setattr(isolation, "encode_profile", lambda: self.PROFILE)
+        monkeypatch.setattr(isolation.os, "setpriority", lambda *args: calls.append("nice"))
+        monkeypatch.setattr(isolation.os, "sched_setaffinity", lambda *args: calls.append("cpus"))
+        return calls
+
+    def test_undelegated_cgroup_does_not_skip_the_rest(self, monkeypatch, calls):
+        def join_cgroup(cgroup, pid):
+            raise PermissionError("cgroup.procs")
+
+        monkeypatch.setattr(isolation, "join_cgroup", join_cgroup)
+        isolation.isolate_current_process()
+
+        assert calls == ["nice", "cpus"]
+        assert isolation._applied == IsolationProfile(nice=10, cpus=frozenset({2}))
+
+    def test_failed_settings_are_still_wrapped(self, monkeypatch, calls):
+        def sched_setaffinity(*args):
+            raise OSError("Invalid argument")
+
+        monkeypatch.setattr(isolation, "join_cgroup", lambda cgroup, pid: None)
+        monkeypatch.setattr(isolation.os, "sched_setaffinity", sched_setaffinity)
+        isolation.isolate_current_process()
+
+        assert isolation.wrap_command(["ffmpeg"]) == ["/usr/bin/taskset", "-c", "2", "ffmpeg"]
+
+    def test_fully_isolated_process_is_not_wrapped(self, monkeypatch, calls):
+        joined = []
+        monkeypatch.setattr(isolation, "join_cgroup", lambda cgroup, pid: joined.append(pid))
+        isolation.isolate_current_process()
+
+        assert isolation.wrap_command(["ffmpeg"]) == ["ffmpeg"]
+        isolation.cgroup_for_spawned(1234)
+        assert joined == [isolation.os.getpid()]
@@ -0,0 +1,123 @@
+"""
+Test suite for counters and latency histograms (in-process store)
+"""
+
+import time
+
+import pytest
+
+from app.core.metrics import MetricsRegistry, MetricsStore
+
+
+def make_registry():
+    return MetricsRegistry(MetricsStore(redis_url=None))
+
+
+class TestCounter:
+    """Test labelled counters"""
+
+    def test_counts_per_label_set(self):
+        counter = make_registry().counter("cache_requests_total", "Cache lookups")
+        counter.inc(result="hit")
+        counter.inc(result="hit")
+        counter.inc(result="miss")
+
+        assert counter.value(result="hit") == 2
+        assert counter.value(result="miss") == 1
+        assert counter.value(result="other") == 0
+
+
+class TestHistogram:
+    """Test bucket accounting and exposition"""
+
+    def test_summary(self):
+        histogram = make_registry().histogram("latency_seconds", "Latency", buckets=(1.0, 5.0))
+        for value in (0.5, 2.0, 30.0):
+            histogram.observe(value, model="m")
+
+        summary = histogram.summary(model="m")
+        assert summary["count"] == 3
+        assert summary["sum"] == 32.5
+
+    def test_render_is_cumulative(self):
+        registry = make_registry()
+        histogram = registry.histogram("latency_seconds", "Latency", buckets=(1.0, 5.0))
+        for value in (0.5, 2.0, 30.0):
+            histogram.observe(value, model="m")
+
+        text = registry.render()
+        assert '# TYPE latency_seconds histogram' in text
+        assert 'latency_seconds_bucket{model="m",le="1.0"} 1' in text
+        assert 'latency_seconds_bucket{model="m",le="5.0"} 2' in text
+        assert 'latency_seconds_bucket{model="m",le="+Inf"} 3' in text
+        assert 'latency_seconds_count{model="m"} 3' in text
+
+
+class FlakyRedis:
+    """Hash commands of a Redis that can be taken down"""
+
+    def __init__(self):
+        self.up = True
+        self.hashes = {}
+        self.batch = []
+
+    def _check(self):
+        if not self.up:
+            raise ConnectionError("Connection refused")
+
+    def pipeline(self, transaction=True):
+        self.batch = []
+        return self
+
+    def hincrbyfloat(self, key, field, amount):
+        self.batch.append((key, field, amount))
+
+    def execute(self):
+        self._check()
+        for key, field, amount in self.batch:
+            fields = self.hashes.setdefault(key, {})
+            fields[field] = fields.get(field, 0.0) + amount
+
+    def hgetall(self, key):
+        self._check()
+        return {k.encode(): str(v).encode() for k, v in self.hashes.get(key, {}).items()}
+
+    def hset(self, key, field, value):
+        self._check()
+
+
+class TestBufferedStore:
+    """Test that recording does not wait on Redis"""
+
+    def test_unreachable_redis_does_not_slow_recording(self):
+        pytest.importorskip("redis")
+        store = MetricsStore(redis_url="redis://127.0.0.1:1/0", flush_interval=60)
+        counter = MetricsRegistry(store).counter("requests_total", "Requests")
+
+        started = time.perf_counter()
+        for _ in range(100):
+            counter.inc(route="/x")
+        assert time.perf_counter() - started < 0.1
+        assert counter.value(route="/x") == 100  # Not yet flushed
+
+        store.flush()  # Fails: kept in-process
+        assert counter.value(route="/x") == 100
+
+    def test_increments_from_an_outage_reach_redis_once_it_recovers(self):
+        redis = FlakyRedis()
+        store = MetricsStore(redis_url="redis://flaky", flush_interval=60)
+        store._redis = redis
+        counter = MetricsRegistry(store).counter("requests_total", "Requests")
+
+        redis.up = False
+        counter.inc(3, route="/x")
+        store.flush()
+        counter.inc(2, route="/x")
+        store.flush()
+        assert counter.value(route="/x") == 5
+
+        redis.up = True
+        counter.inc(1, route="/x")
+        store.flush()
+        assert redis.hashes["metrics:requests_total"] == {'route="/x"': 6}
+        assert counter.value(route="/x") == 6
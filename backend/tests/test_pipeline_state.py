@@ -0,0 +1,59 @@
+"""
+Test suite for pipeline run bookkeeping (needs a local Redis)
+"""
+
+import uuid
+
+import pytest
+
+redis = pytest.importorskip("redis")
+
+from app.workers.pipeline_state import PipelineState
+
+
+@pytest.fixture
+def client():
+    conn = redis.Redis.from_url("redis://localhost:6379/15")
+    try:
+        conn.ping()
+    except redis.exceptions.ConnectionError:
+        pytest.skip("Redis is not running on localhost:6379")
+    yield conn
+    for key in conn.scan_iter("job_engine:*"):
+        conn.delete(key)
+
+
+def _state(client):
+    return PipelineState(client, uuid.uuid4().int % 10**9, ttl=60)
+
+
+class TestPipelineState:
+    """Test fan-in accounting and once-only guards"""
+
+    def test_context_round_trip(self, client):
+        state = _state(client)
+        state.save_context({'pipeline': 'video', 'options': {'publish': None}})
+        assert state.context() == {'pipeline': 'video', 'options': {'publish': None}}
+
+    def test_stage_done_after_every_fan_out_task(self, client):
+        state = _state(client)
+        state.add_tasks("verticalize", [11, 12, 13])
+        assert state.tasks("verticalize") == [11, 12, 13]
+        assert not state.task_finished("verticalize", 12)
+        assert not state.task_finished("verticalize", 12)  # duplicate completion
+        assert not state.task_finished("verticalize", 11)
+        assert state.task_finished("verticalize", 13)
+
+    def test_claim_and_finish_are_once_only(self, client):
+        state = _state(client)
+        assert state.claim("ai")
+        assert not state.claim("ai")
+        assert state.finish()
+        assert not state.finish()
+
+    def test_task_maps_back_to_its_run(self, client):
+        state = _state(client)
+        state.add_tasks("cut", [21])
+        found, stage = PipelineState.for_task(client, 21)
+        assert (found.pipeline_id, stage) == (state.pipeline_id, "cut")
+        assert state.mark_done("cut") == {"cut"}
@@ -0,0 +1,76 @@
+"""
+Test suite for write-behind job progress buffering
+"""
+
+import threading
+
+from app.workers.progress_buffer import ProgressBuffer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestProgressBuffer:
+    """Test coalescing and the flush rate bound (in-process mode)"""
+
+    def test_latest_tick_per_job_wins(self):
+        buffer = ProgressBuffer(interval=1.0, clock=FakeClock())
+        buffer.record(1, "processing", 10)
+        buffer.record(1, "processing", 40)
+        buffer.record(2, "processing", 5)
+        assert buffer.drain() == {1: ("processing", 40), 2: ("processing", 5)}
+        assert buffer.drain() == {}
+
+    def test_flush_due_at_most_once_per_interval(self):
+        clock = FakeClock()
+        buffer = ProgressBuffer(interval=1.0, clock=clock)
+        assert not buffer.record(1, "processing", 10)
+        clock.now = 1.0
+        assert buffer.record(1, "processing", 20)
+        clock.now = 1.5
+        assert not buffer.record(1, "processing", 30)
+        clock.now = 2.0
+        assert buffer.record(1, "processing", 40)
+
+    def test_discard_drops_pending_tick(self):
+        buffer = ProgressBuffer(interval=1.0, clock=FakeClock())
+        buffer.record(1, "processing", 10)
+        buffer.record(2, "processing", 10)
+        buffer.discard(1)
+        assert buffer.drain() == {2: ("processing", 10)}
+
+    def test_started_mark_cleared_by_discard(self):
+        buffer = ProgressBuffer(interval=1.0, clock=FakeClock())
+        assert not buffer.started(1)
+        buffer.mark_started(1)
+        assert buffer.started(1)
+        buffer.discard(1)
+        assert not buffer.started(1)
+
+
+class TestTrailingFlush:
+    """Test that the last tick of a burst is flushed without a later tick"""
+
+    def test_tick_that_is_not_due_schedules_one_flush(self):
+        flushed = threading.Event()
+        calls = []
+
+        def on_flush():
+            calls.append(buffer.drain())
+            flushed.set()
+
+        buffer = ProgressBuffer(interval=0.05, on_flush=on_flush)
+        assert not buffer.record(1, "processing", 10)
+        assert not buffer.record(1, "processing", 20)
+        assert flushed.wait(2)
+        assert calls == [{1: ("processing", 20)}]
+
+    def test_no_trailing_flush_without_callback(self):
+        buffer = ProgressBuffer(interval=0.01)
+        buffer.record(1, "processing", 10)
+        assert buffer._trailing is None
@@ -0,0 +1,46 @@
+"""
+Test suite for video progress derived from job state
+"""
+
+from app.services.progress_events import VideoProgressTracker, format_sse, video_progress
+
+
+class TestVideoProgress:
+    """Test stage weighting"""
+
+    def test_status_fallback_without_jobs(self):
+        assert video_progress("uploaded", []) == 0.0
+        assert video_progress("processing", []) == 60.0
+        assert video_progress("completed", []) == 100.0
+
+    def test_fan_out_stage_uses_mean_of_tasks(self):
+        jobs = [
+            ("youtube_download", "completed", 100.0),
+            ("cutting", "completed", 100.0),
+            ("vertical_conversion", "completed", 100.0),
+            ("vertical_conversion", "processing", 0.0),
+        ]
+        # (30 + 10 + 15) of the 95 non-optional weight
+        assert video_progress("processing", jobs) == round(55 * 100 / 95, 1)
+
+    def test_optional_publish_counts_only_when_present(self):
+        jobs = [(t, "completed", 100.0) for t in ("youtube_download", "cutting", "vertical_conversion", "ai_generation")]
+        assert video_progress("processing", jobs) == 100.0
+        assert video_progress("processing", jobs + [("instagram_upload", "pending", 0.0)]) == 95.0
+
+
+class TestVideoProgressTracker:
+    """Test folding published events into seeded state"""
+
+    def test_job_events_update_progress(self):
+        tracker = VideoProgressTracker()
+        tracker.seed(7, "downloading", [(1, "youtube_download", "processing", 0.0)])
+        assert tracker.apply({"type": "job", "video_id": 7, "job_id": 1, "job_type": "youtube_download",
+                              "status": "processing", "progress": 50.0}) == round(15 * 100 / 95, 1)
+        assert tracker.apply({"type": "video", "video_id": 7, "status": "completed"}) == 100.0
+
+    def test_untracked_video_ignored(self):
+        assert VideoProgressTracker().apply({"type": "video", "video_id": 3, "status": "failed"}) is None
+
+    def test_sse_frame(self):
+        assert format_sse({"a": 1}, "progress") == 'event: progress\ndata: {"a": 1}\n\n'
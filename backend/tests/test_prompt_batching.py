@@ -0,0 +1,29 @@
+"""
+Test suite for token-budgeted prompt batching
+"""
+
+from app.services.prompt_batching import estimate_tokens, pack_batches
+
+
+class TestPackBatches:
+    """Test greedy packing under a token budget"""
+
+    def test_packs_in_order_under_budget(self):
+        batches = pack_batches([3, 3, 3, 3, 3], cost=lambda x: x, budget=7)
+        assert batches == [[3, 3], [3, 3], [3]]
+
+    def test_oversized_item_gets_own_batch(self):
+        batches = pack_batches([2, 50, 2], cost=lambda x: x, budget=10)
+        assert batches == [[2], [50], [2]]
+
+    def test_max_items_caps_batch_length(self):
+        batches = pack_batches(list(range(5)), cost=lambda x: 0, budget=100, max_items=2)
+        assert batches == [[0, 1], [2, 3], [4]]
+
+    def test_empty(self):
+        assert pack_batches([], cost=len, budget=10) == []
+
+
+def test_estimate_tokens_rounds_up():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcde") == 2
@@ -0,0 +1,53 @@
+"""
+Test suite for token buckets and retry backoff
+"""
+
+import random
+
+from app.services.rate_limiter import LocalTokenBucket, TokenBucketLimiter, backoff_delay
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLocalTokenBucket:
+    """Test refill and wait computation"""
+
+    def test_burst_then_wait(self):
+        clock = FakeClock()
+        bucket = LocalTokenBucket(rate=1.0, capacity=2, clock=clock)
+
+        assert bucket.take() == 0
+        assert bucket.take() == 0
+        assert bucket.take() == 1.0
+
+    def test_refills_over_time_up_to_capacity(self):
+        clock = FakeClock()
+        bucket = LocalTokenBucket(rate=2.0, capacity=2, clock=clock)
+        bucket.take()
+        bucket.take()
+
+        clock.now = 100.0
+        assert bucket.take() == 0
+        assert bucket.take() == 0
+        assert bucket.take() > 0
+
+
+def test_limiter_without_redis_uses_local_buckets():
+    limiter = TokenBucketLimiter(None, rate=0.5, capacity=1)
+    assert limiter.take("a") == 0
+    assert limiter.take("a") > 0
+    # Buckets are independent
+    assert limiter.take("b") == 0
+
+
+def test_backoff_is_jittered_and_capped():
+    rng = random.Random(7)
+    delays = [backoff_delay(attempt, base=2.0, cap=10.0, rng=rng) for attempt in range(8)]
+    assert all(0 <= d <= 10.0 for d in delays)
+    assert len(set(delays)) == len(delays)
@@ -0,0 +1,29 @@
+"""
+Test suite for job type -> resource class routing
+"""
+
+from app.workers.dag import VIDEO_PIPELINE
+from app.workers.resource_classes import (
+    AI, ENCODE, INGEST, PUBLISH, RESOURCE_CLASSES, resource_class
+)
+
+
+class TestResourceClasses:
+    """Test stage routing"""
+
+    def test_video_pipeline_stages(self):
+        routed = {name: resource_class(stage.job_type) for name, stage in VIDEO_PIPELINE.stages.items()}
+        assert routed == {
+            "download": INGEST,
+            "cut": ENCODE,
+            "verticalize": ENCODE,
+            "ai": AI,
+            "publish": PUBLISH,
+        }
+
+    def test_unknown_job_type_is_an_encode(self):
+        assert resource_class("something_new") == ENCODE
+        assert resource_class(None) == ENCODE
+
+    def test_classes_are_distinct_queues(self):
+        assert len(set(RESOURCE_CLASSES)) == 4
@@ -0,0 +1,27 @@
+"""
+Test suite for job retry policies
+"""
+
+from app.workers.retry_policy import (
+    DEFAULT_RETRY_POLICY, PermanentJobError, RetryPolicy, is_retryable, policy_for
+)
+
+
+class TestRetryPolicy:
+    """Test backoff and failure classification"""
+
+    def test_delay_bounds(self):
+        policy = RetryPolicy(max_retries=3, base_delay=10, max_delay=60)
+        for attempt in range(6):
+            delay = policy.delay(attempt)
+            assert 10 <= delay <= 70
+
+    def test_known_and_unknown_job_types(self):
+        assert policy_for("instagram_upload").max_retries == 5
+        assert policy_for("no_such_job") is DEFAULT_RETRY_POLICY
+
+    def test_is_retryable(self):
+        assert is_retryable(RuntimeError("ffmpeg exited 1"))
+        assert is_retryable(TimeoutError())
+        assert not is_retryable(PermanentJobError("video deleted"))
+        assert not is_retryable(KeyError("chunk_id"))
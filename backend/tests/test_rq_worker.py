@@ -0,0 +1,48 @@
+"""
+Test suite for job re-queues in the RQ worker
+"""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("rq")
+
+from app.services import gemini_service
+from app.services.gemini_client import GeminiQuotaExceeded
+from app.workers import rq_worker
+from app.workers.resource_classes import AI
+
+
+@pytest.fixture
+def quota_exhausted(monkeypatch):
+    """Gemini always out of quota; re-queues recorded instead of enqueued"""
+    calls = {"remembered": [], "enqueued": []}
+
+    class ExhaustedService:
+        async def generate_metadata(self, *args, **kwargs):
+            raise GeminiQuotaExceeded("429")
+
+    monkeypatch.setattr(gemini_service, "GeminiAIService", ExhaustedService)
+    monkeypatch.setattr(rq_worker, "update_job_status", lambda *args, **kwargs: None)
+    monkeypatch.setattr(rq_worker, "_remember_call", lambda job_id, spec: calls["remembered"].append((job_id, spec)))
+    monkeypatch.setattr(rq_worker, "_enqueue_call", lambda spec, delay=0: calls["enqueued"].append((spec, delay)))
+    return calls
+
+
+class TestQuotaRequeue:
+    """Test that a quota re-queue goes through the stored-call path"""
+
+    def test_requeue_stores_and_enqueues_the_next_attempt(self, quota_exhausted):
+        reels = [{'chunk_number': 1, 'duration': 30}]
+        asyncio.run(rq_worker.process_ai_generation_job(7, reels, transcript="hello", attempt=1))
+
+        [(job_id, stored)] = quota_exhausted["remembered"]
+        [(spec, delay)] = quota_exhausted["enqueued"]
+        assert job_id == 7 and stored == spec
+        assert spec['queue'] == AI and spec['job_id'] == 7
+        assert spec['func'] == "app.workers.rq_worker.run_job"
+        job_type, args_job_id, kwargs = spec['args']
+        assert (job_type, args_job_id, kwargs['attempt']) == ("ai_generation", 7, 2)
+        policy = rq_worker.QUOTA_REQUEUE_POLICY
+        assert policy.base_delay <= delay <= policy.base_delay + policy.base_delay * 2
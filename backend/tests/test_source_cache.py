@@ -0,0 +1,82 @@
+"""
+Test suite for the single-flight source cache
+"""
+
+import os
+import threading
+import time
+
+from app.services.source_cache import SourceCache
+
+
+def _fake_download(calls, delay=0.0):
+    """Downloader that writes a media file and a subtitle sidecar"""
+    def download(work_dir):
+        calls.append(work_dir)
+        time.sleep(delay)
+        (work_dir / "abc.en.vtt").write_text("WEBVTT\n")
+        media = work_dir / "abc.mp4"
+        media.write_bytes(b"x" * 1024)
+        return media
+    return download
+
+
+class TestSourceCache:
+    """Test cache hits, hardlinks and concurrent downloads"""
+
+    def test_second_fetch_is_a_hardlinked_hit(self, tmp_path):
+        cache = SourceCache(str(tmp_path / "cache"))
+        calls = []
+
+        first, hit1 = cache.fetch("abc", "136+140", tmp_path / "a" / "abc.mp4", _fake_download(calls))
+        second, hit2 = cache.fetch("abc", "136+140", tmp_path / "b" / "video.mp4", _fake_download(calls))
+
+        assert (hit1, hit2) == (False, True)
+        assert len(calls) == 1
+        assert os.path.samefile(first, second)
+        assert os.path.samefile(second, cache.entry_path("abc", "136+140"))
+
+    def test_sidecars_are_linked_next_to_media(self, tmp_path):
+        cache = SourceCache(str(tmp_path / "cache"))
+        cache.fetch("abc", "best", tmp_path / "a" / "abc.mp4", _fake_download([]))
+
+        dest, _ = cache.fetch("abc", "best", tmp_path / "b" / "abc.mp4", _fake_download([]))
+
+        assert (dest.parent / "abc.en.vtt").exists()
+
+    def test_formats_are_cached_separately(self, tmp_path):
+        cache = SourceCache(str(tmp_path / "cache"))
+        calls = []
+
+        cache.fetch("abc", "136+140", tmp_path / "a.mp4", _fake_download(calls))
+        cache.fetch("abc", "137+140", tmp_path / "b.mp4", _fake_download(calls))
+
+        assert len(calls) == 2
+
+    def test_concurrent_requests_share_one_download(self, tmp_path):
+        """Racing requests wait on the lock instead of downloading again"""
+        cache = SourceCache(str(tmp_path / "cache"))
+        calls = []
+        results = []
+
+        def worker(i):
+            results.append(cache.fetch("abc", "best", tmp_path / f"w{i}" / "abc.mp4", _fake_download(calls, delay=0.3)))
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len(calls) == 1
+        assert sorted(hit for _, hit in results) == [False, True, True, True]
+
+    def test_invalidate_clears_verification(self, tmp_path):
+        cache = SourceCache(str(tmp_path / "cache"))
+        cache.fetch("abc", "best", tmp_path / "a" / "abc.mp4", _fake_download([]))
+        cache.mark_verified("abc", "best")
+        assert cache.is_verified("abc", "best")
+
+        cache.invalidate("abc", "best")
+        assert not cache.is_verified("abc", "best")
+        assert not cache.entry_path("abc", "best").exists()
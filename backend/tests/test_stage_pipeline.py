@@ -0,0 +1,92 @@
+"""
+Test suite for the stage pipeline and chunk window planning
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from app.services.stage_pipeline import PipelineStage, run_pipeline
+from app.services.video_processor import VideoProcessor
+
+
+def sleeper(seconds: float, log=None, name: str = ""):
+    async def handler(item):
+        if log is not None:
+            log.append((name, item))
+        await asyncio.sleep(seconds)
+        return item
+    return handler
+
+
+class TestRunPipeline:
+    """Test stage overlap, bounds and errors"""
+
+    def test_passes_items_through_every_stage(self):
+        async def double(x):
+            return x * 2
+
+        async def inc(x):
+            return x + 1
+
+        stages = [PipelineStage("double", double), PipelineStage("inc", inc)]
+        assert asyncio.run(run_pipeline([1, 2, 3], stages)) == [3, 5, 7]
+
+    def test_stages_overlap(self):
+        # Sequentially: 5 items x 3 stages x 50 ms = 750 ms; pipelined ~ (5 + 2) x 50 ms
+        stages = [PipelineStage(str(i), sleeper(0.05)) for i in range(3)]
+        started = time.perf_counter()
+        assert len(asyncio.run(run_pipeline(range(5), stages))) == 5
+        assert time.perf_counter() - started < 0.6
+
+    def test_workers_run_a_stage_concurrently(self):
+        stages = [PipelineStage("cut", sleeper(0.1), workers=4)]
+        started = time.perf_counter()
+        assert sorted(asyncio.run(run_pipeline(range(4), stages))) == [0, 1, 2, 3]
+        assert time.perf_counter() - started < 0.3
+
+    def test_buffer_bounds_a_fast_stage(self):
+        log = []
+        stages = [
+            PipelineStage("fast", sleeper(0, log, "fast")),
+            PipelineStage("slow", sleeper(0.02, log, "slow")),
+        ]
+        asyncio.run(run_pipeline(range(10), stages, buffer=1))
+        # The fast stage never gets more than buffer + in-flight items ahead
+        fast_done = slow_started = 0
+        for name, _ in log:
+            if name == "fast":
+                fast_done += 1
+            else:
+                slow_started += 1
+            assert fast_done - slow_started <= 3
+
+    def test_first_error_is_raised_and_stops_the_rest(self):
+        log = []
+
+        async def fail(item):
+            if item == 1:
+                raise ValueError("bad chunk")
+            return item
+
+        stages = [PipelineStage("fail", fail), PipelineStage("slow", sleeper(0.05, log, "slow"))]
+        with pytest.raises(ValueError, match="bad chunk"):
+            asyncio.run(run_pipeline(range(20), stages))
+        assert len(log) < 20
+
+    def test_empty_input(self):
+        stages = [PipelineStage("a", sleeper(0), workers=2), PipelineStage("b", sleeper(0))]
+        assert asyncio.run(run_pipeline([], stages)) == []
+
+
+class TestPlanRange:
+    """Test chunk windows"""
+
+    def test_sequential_windows_drop_short_tail(self):
+        processor = VideoProcessor(chunk_duration=30, min_chunk_duration=10)
+        assert processor.plan_range(0, 65) == [(0, 0, 30), (1, 30, 60)]
+
+    def test_index_offset(self):
+        processor = VideoProcessor(chunk_duration=30, min_chunk_duration=10)
+        assert processor.plan_range(100, 150, index_offset=3) == [(3, 100, 130), (4, 130, 150)]
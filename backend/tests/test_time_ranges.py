@@ -0,0 +1,50 @@
+"""
+Test suite for partial-download time ranges
+"""
+
+from app.services.time_ranges import (
+    TimeRange,
+    normalize_ranges,
+    pad_ranges,
+    parse_ranges,
+    total_duration,
+)
+
+
+class TestNormalizeRanges:
+    """Test clamping, ordering and merging"""
+
+    def test_merges_overlapping_and_sorts(self):
+        ranges = [TimeRange(100, 160), TimeRange(0, 30), TimeRange(150, 200)]
+        assert normalize_ranges(ranges) == [TimeRange(0, 30), TimeRange(100, 200)]
+
+    def test_clamps_to_source_duration(self):
+        ranges = [TimeRange(-5, 20), TimeRange(550, 700), TimeRange(800, 900)]
+        assert normalize_ranges(ranges, duration=600) == [TimeRange(0, 20), TimeRange(550, 600)]
+
+    def test_parse_round_trip(self):
+        ranges = [TimeRange(10.0, 40.0)]
+        assert parse_ranges([r.to_list() for r in ranges]) == ranges
+
+
+class TestPadRanges:
+    """Test keyframe padding of download sections"""
+
+    def test_pads_each_side_within_source(self):
+        sections = pad_ranges([TimeRange(2, 60)], padding=5, duration=62)
+        padded, requested = sections[0]
+        assert padded == TimeRange(0, 62)
+        assert requested == [TimeRange(2, 60)]
+
+    def test_nearby_ranges_share_a_section(self):
+        """Padded spans that touch are downloaded once"""
+        sections = pad_ranges([TimeRange(100, 130), TimeRange(138, 170)], padding=5)
+        assert len(sections) == 1
+        padded, requested = sections[0]
+        assert padded == TimeRange(95, 175)
+        assert requested == [TimeRange(100, 130), TimeRange(138, 170)]
+
+    def test_distant_ranges_stay_separate(self):
+        sections = pad_ranges([TimeRange(0, 30), TimeRange(3600, 3660)], padding=5)
+        assert [p for p, _ in sections] == [TimeRange(0, 35), TimeRange(3595, 3665)]
+        assert total_duration(p for p, _ in sections) == 105
@@ -0,0 +1,101 @@
+"""
+Test suite for timed transcript index and VTT parsing
+"""
+
+import pytest
+from app.services.transcript_index import TranscriptIndex
+from app.services.youtube_downloader import TranscriptExtractor
+
+
+# YouTube pads cues with whitespace-only lines; keep them explicit here
+ROLLING_VTT = "\n".join([
+    "WEBVTT",
+    "Kind: captions",
+    "Language: en",
+    "",
+    "00:00:00.000 --> 00:00:02.500 align:start position:0%",
+    " ",
+    "hello<00:00:00.500><c> world</c>",
+    "",
+    "00:00:02.500 --> 00:00:02.510 align:start position:0%",
+    "hello world",
+    " ",
+    "",
+    "00:00:02.510 --> 00:00:05.000 align:start position:0%",
+    "hello world",
+    "this<00:00:03.000><c> is</c><00:00:03.300><c> a test</c>",
+    "",
+    "00:00:05.000 --> 00:00:05.010 align:start position:0%",
+    "this is a test",
+    " ",
+    "",
+    "00:00:05.010 --> 00:00:08.000 align:start position:0%",
+    "this is a test",
+    "final line",
+    "",
+])
+
+
+@pytest.fixture
+def index():
+    return TranscriptIndex.from_segments([
+        (0.0, 10.0, "first"),
+        (10.0, 20.0, "second"),
+        (20.0, 30.0, "third"),
+        (30.0, 40.0, "fourth"),
+    ])
+
+
+class TestTranscriptIndex:
+    """Test segment storage and slicing"""
+
+    def test_slice_returns_only_overlapping_segments(self, index):
+        """A reel window should only see its own segments"""
+        assert index.slice(10.0, 30.0) == "second third"
+        assert index.slice(0.0, 10.0) == "first"
+        assert index.slice(35.0, 60.0) == "fourth"
+
+    def test_partial_overlap_includes_segment(self, index):
+        """Segments partially inside the window are included"""
+        assert index.slice(15.0, 25.0) == "second third"
+
+    def test_empty_window(self, index):
+        """Windows outside the transcript return empty text"""
+        assert index.slice(100.0, 130.0) == ""
+        assert TranscriptIndex().slice(0.0, 10.0) == ""
+
+    def test_round_trip_dict(self, index):
+        """Stored form should restore an identical index"""
+        restored = TranscriptIndex.from_dict(index.to_dict())
+        assert restored.segments() == index.segments()
+        assert restored.slice(10.0, 30.0) == "second third"
+
+    def test_from_text_spans_whole_duration(self):
+        """Untimed transcripts become a single segment"""
+        index = TranscriptIndex.from_text("whole thing", 120.0)
+        assert len(index) == 1
+        assert index.slice(60.0, 90.0) == "whole thing"
+
+
+class TestVttParsing:
+    """Test WebVTT parsing with rolling auto-captions"""
+
+    def test_rolling_lines_are_deduplicated(self, tmp_path):
+        """Each caption line should appear exactly once with its cue timing"""
+        vtt = tmp_path / "video.en.vtt"
+        vtt.write_text(ROLLING_VTT, encoding="utf-8")
+
+        segments = TranscriptExtractor()._parse_vtt(str(vtt))
+
+        assert [s[2] for s in segments] == ["hello world", "this is a test", "final line"]
+        assert segments[0][0] == 0.0
+        assert segments[2][1] == 8.0
+
+    def test_transcript_index_from_directory(self, tmp_path):
+        """Extractor should build a sliceable index from a video directory"""
+        (tmp_path / "video.en.vtt").write_text(ROLLING_VTT, encoding="utf-8")
+
+        index = TranscriptExtractor().get_transcript_index(str(tmp_path))
+
+        assert index.plain_text == "hello world this is a test final line"
+        assert index.slice(2.6, 5.0) == "this is a test"
@@ -0,0 +1,132 @@
+"""
+Test suite for streaming windowed transcription
+"""
+
+import asyncio
+import math
+import threading
+import time
+from array import array
+
+import pytest
+
+from app.services.transcription import (
+    SAMPLE_RATE,
+    OfflineBackend,
+    StreamingTranscriber,
+    TranscriptionBackend,
+    get_backend,
+    iter_pcm_windows,
+)
+
+
+def _pcm(seconds: float, amplitude: int = 0) -> bytes:
+    """Generate s16le PCM: a 440 Hz tone, or silence when amplitude is 0"""
+    count = int(seconds * SAMPLE_RATE)
+    samples = array("h", (
+        int(amplitude * math.sin(2 * math.pi * 440 * i / SAMPLE_RATE)) for i in range(count)
+    ))
+    return samples.tobytes()
+
+
+class CountingBackend(TranscriptionBackend):
+    """Backend that records how many windows run at once"""
+
+    name = "counting"
+
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def transcribe(self, pcm, sample_rate=SAMPLE_RATE):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.02)
+        with self.lock:
+            self.active -= 1
+        return [(0.0, 1.0, f"window of {len(pcm)} bytes")]
+
+
+class TestOfflineBackend:
+    """Test the local stand-in backend"""
+
+    def test_detects_voiced_region(self):
+        """Tone between silences should become one timed segment"""
+        pcm = _pcm(1.0) + _pcm(1.0, amplitude=8000) + _pcm(1.0)
+
+        segments = OfflineBackend().transcribe(pcm)
+
+        assert len(segments) == 1
+        start, end, text = segments[0]
+        assert abs(start - 1.0) < 0.05
+        assert abs(end - 2.0) < 0.05
+        assert text == "[speech]"
+
+    def test_registry_returns_offline_backend(self):
+        """Backends should be selectable by name"""
+        assert isinstance(get_backend("offline"), OfflineBackend)
+
+    def test_base_backend_is_abstract(self):
+        with pytest.raises(TypeError):
+            TranscriptionBackend()
+
+
+class TestStreamingTranscriber:
+    """Test window scheduling and timestamp offsets"""
+
+    def test_segments_are_offset_by_window_start(self):
+        """Segment times should be absolute, not window-relative"""
+        windows = iter([
+            (0.0, _pcm(2.0)),
+            (2.0, _pcm(0.5) + _pcm(1.0, amplitude=8000) + _pcm(0.5)),
+        ])
+        transcriber = StreamingTranscriber(OfflineBackend(), max_parallel=2)
+
+        index = asyncio.run(transcriber.transcribe_windows(windows))
+
+        assert len(index) == 1
+        start, end, _ = index.segment(0)
+        assert abs(start - 2.5) < 0.05
+        assert abs(end - 3.5) < 0.05
+
+    def test_parallelism_is_bounded(self):
+        """No more than max_parallel windows should be in flight"""
+        backend = CountingBackend()
+        windows = ((float(i), b"\x00\x00" * 100) for i in range(12))
+        transcriber = StreamingTranscriber(backend, max_parallel=3)
+
+        index = asyncio.run(transcriber.transcribe_windows(windows))
+
+        assert len(index) == 12
+        assert 1 < backend.peak <= 3
+
+
+def fake_ffmpeg(tmp_path, script: str) -> str:
+    """An executable standing in for ffmpeg"""
+    path = tmp_path / "ffmpeg"
+    path.write_text(f"#!/bin/sh\n{script}\n")
+    path.chmod(0o755)
+    return str(path)
+
+
+class TestIterPcmWindows:
+    """Test the FFmpeg PCM stream"""
+
+    def test_fixed_windows_with_offsets(self, tmp_path):
+        ffmpeg = fake_ffmpeg(tmp_path, f"head -c {SAMPLE_RATE * 2 * 3} /dev/zero")
+        windows = list(iter_pcm_windows("in.mp4", ffmpeg, window_seconds=2))
+        assert [offset for offset, _ in windows] == [0.0, 2.0]
+        assert [len(pcm) for _, pcm in windows] == [SAMPLE_RATE * 4, SAMPLE_RATE * 2]
+
+    def test_invalid_input_raises(self, tmp_path):
+        ffmpeg = fake_ffmpeg(tmp_path, 'echo "missing.mp4: No such file or directory" >&2; exit 1')
+        with pytest.raises(RuntimeError, match="No such file"):
+            list(iter_pcm_windows("missing.mp4", ffmpeg))
+
+    def test_closing_early_is_not_an_error(self, tmp_path):
+        ffmpeg = fake_ffmpeg(tmp_path, "cat /dev/zero")
+        windows = iter_pcm_windows("in.mp4", ffmpeg, window_seconds=1)
+        next(windows)
+        windows.close()
@@ -0,0 +1,153 @@
+"""
+Test suite for the video routes
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("yt_dlp")
+redis = pytest.importorskip("redis")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import app.models  # noqa: F401 - registers every table
+from app.api import video as video_api
+from app.api.deps import get_current_user, get_stream_user
+from app.db.base import Base
+from app.db.database import SessionLocal, engine, get_db
+from app.models.user import User
+from app.models.video import Video
+from app.services.youtube_service import YouTubeService
+from app.workers import job_engine, rq_worker
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(engine)
+
+
+@pytest.fixture
+def user(db):
+    user = User(email="owner@example.com", username="owner", hashed_password="x")
+    db.add(user)
+    db.commit()
+    return user
+
+
+@pytest.fixture
+def client(db, user, monkeypatch):
+    async def probe_video(self, url, youtube_id):
+        return {"title": "Match", "duration": 600, "availability": "public", "live_status": "not_live"}
+
+    monkeypatch.setattr(YouTubeService, "probe_video", probe_video)
+    api = FastAPI()
+    api.include_router(video_api.router)
+    api.dependency_overrides[get_db] = lambda: db
+    api.dependency_overrides[get_current_user] = lambda: user
+    api.dependency_overrides[get_stream_user] = lambda: user
+    return TestClient(api)
+
+
+@pytest.fixture
+def started(monkeypatch):
+    """Records how the new video's processing was started"""
+    calls = {"dag": [], "inline": []}
+
+    def start_video_pipeline(video_id, user_id, media_seconds=None, **kwargs):
+        calls["dag"].append((video_id, user_id, media_seconds))
+        return 1
+
+    async def process_video_background(video_id):
+        calls["inline"].append(video_id)
+
+    monkeypatch.setattr(job_engine, "start_video_pipeline", start_video_pipeline)
+    monkeypatch.setattr(video_api, "process_video_background", process_video_background)
+    return calls
+
+
+class TestCreateVideo:
+    """Test video submission"""
+
+    def test_video_is_owned_by_the_submitter(self, client, db, user, started):
+        response = client.post("/videos/", json={"youtube_url": "https://youtu.be/dQw4w9WgXcQ"})
+        assert response.status_code == 200
+        assert db.get(Video, response.json()["video_id"]).user_id == user.id
+
+    def test_dag_backend_starts_the_stage_pipeline(self, client, user, started, monkeypatch):
+        monkeypatch.setattr(video_api.settings, "pipeline_backend", "dag")
+        response = client.post("/videos/", json={"youtube_url": "https://youtu.be/dQw4w9WgXcQ"})
+        assert response.status_code == 200
+        assert started["dag"] == [(response.json()["video_id"], user.id, 600)]
+        assert started["inline"] == []
+
+    def test_inline_backend_runs_in_process(self, client, started, monkeypatch):
+        monkeypatch.setattr(video_api.settings, "pipeline_backend", "inline")
+        response = client.post("/videos/", json={"youtube_url": "https://youtu.be/dQw4w9WgXcQ"})
+        assert started["inline"] == [response.json()["video_id"]]
+        assert started["dag"] == []
+
+    def test_requires_a_signed_in_user(self, client):
+        client.app.dependency_overrides.pop(get_current_user)
+        response = client.post("/videos/", json={"youtube_url": "https://youtu.be/dQw4w9WgXcQ"})
+        assert response.status_code == 401
+
+
+class TestListVideos:
+    """Test the paginated listing"""
+
+    def test_pages_newest_first(self, client, db):
+        now = datetime.utcnow()
+        for i in range(3):
+            db.add(Video(youtube_url=f"https://youtu.be/v{i}", youtube_video_id=f"v{i}",
+                         created_at=now + timedelta(minutes=i), updated_at=now))
+        db.commit()
+        first = client.get("/videos/", params={"limit": 2}).json()
+        rest = client.get("/videos/", params={"limit": 2, "offset": 2}).json()
+        assert [v["youtube_url"] for v in first + rest] == [f"https://youtu.be/v{i}" for i in (2, 1, 0)]
+
+
+class TestDeleteVideo:
+    """Test deletion"""
+
+    def test_delete_completes_when_redis_is_unreachable(self, client, db, monkeypatch):
+        monkeypatch.setattr(rq_worker, "redis_conn", redis.Redis(port=1))
+        monkeypatch.setattr(job_engine, "redis_conn", rq_worker.redis_conn)
+        video = Video(youtube_url="https://youtu.be/gone01", youtube_video_id="gone01")
+        db.add(video)
+        db.commit()
+        assert client.delete(f"/videos/{video.id}").status_code == 204
+        assert db.query(Video).count() == 0
+
+
+class TestVideoEvents:
+    """Test access to a video's progress stream"""
+
+    def test_other_users_video_is_not_found(self, client, db):
+        other = User(email="other@example.com", username="other", hashed_password="x")
+        db.add(other)
+        db.commit()
+        video = Video(youtube_url="https://youtu.be/theirs01", youtube_video_id="theirs01", user_id=other.id)
+        db.add(video)
+        db.commit()
+        assert client.get(f"/videos/{video.id}/events").status_code == 404
+
+    def test_requires_a_token(self, client, db, user):
+        client.app.dependency_overrides.pop(get_stream_user)
+        video = Video(youtube_url="https://youtu.be/mine01", youtube_video_id="mine01", user_id=user.id)
+        db.add(video)
+        db.commit()
+        assert client.get(f"/videos/{video.id}/events").status_code == 401
+
+    def test_token_may_come_from_the_query_string(self, db, user):
+        from jose import jwt
+        settings = video_api.settings
+        token = jwt.encode({"sub": str(user.id)}, settings.secret_key, algorithm=settings.algorithm)
+        assert get_stream_user(db, token=None, access_token=token).id == user.id
@@ -0,0 +1,102 @@
+"""
+Test suite for cut planning in the video orchestrator
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("yt_dlp")
+
+from app.services import video_orchestrator
+from app.services.highlight_ranker import Highlight
+from app.services.video_orchestrator import VideoOrchestrator
+from app.workers.cancellation import JobCancelled, run_process
+
+
+class FakeSession:
+    def commit(self):
+        pass
+
+
+class FakeRanker:
+    def __init__(self, outcome):
+        self.outcome = outcome
+
+    def rank(self, video_path, transcript, n):
+        if isinstance(self.outcome, Exception):
+            raise self.outcome
+        return self.outcome
+
+
+@pytest.fixture
+def orchestrator(monkeypatch):
+    monkeypatch.setattr(video_orchestrator.settings, "highlight_top_n", 3)
+    orchestrator = VideoOrchestrator(db=FakeSession())
+    monkeypatch.setattr(orchestrator.video_processor, "get_video_duration", lambda path: 65.0)
+    return orchestrator
+
+
+def plan(orchestrator, ranker_outcome):
+    orchestrator.highlight_ranker = FakeRanker(ranker_outcome)
+    video = SimpleNamespace(id=1, video_file_path="in.mp4", video_metadata=None)
+    return asyncio.run(orchestrator.plan_cuts(FakeSession(), video, {}, None)), video
+
+
+class TestPlanCuts:
+    """Test highlight cuts and their fallback to fixed windows"""
+
+    def test_highlight_windows_are_cut(self, orchestrator):
+        cuts, video = plan(orchestrator, [Highlight(30, 60, 1.0, 0, 0, 0)])
+        assert [(start, end) for _, _, start, end, _ in cuts] == [(30, 60)]
+        assert video.video_metadata['highlights'][0]['start'] == 30
+
+    def test_ranking_failure_falls_back_to_fixed_windows(self, orchestrator):
+        cuts, video = plan(orchestrator, RuntimeError("Output file #0 does not contain any stream"))
+        assert len(cuts) == len(orchestrator.video_processor.plan_range(0, 65.0)) > 0
+        assert video.video_metadata is None
+
+    def test_no_windows_falls_back_to_fixed_windows(self, orchestrator):
+        cuts, _ = plan(orchestrator, [])
+        assert len(cuts) == len(orchestrator.video_processor.plan_range(0, 65.0)) > 0
+
+    def test_cancellation_is_not_swallowed(self, orchestrator):
+        with pytest.raises(JobCancelled):
+            plan(orchestrator, JobCancelled("cancelled"))
+
+
+class TestCutChunks:
+    """Test stopping in-flight cuts when the pipeline fails"""
+
+    def test_save_error_stops_running_cuts(self, orchestrator, monkeypatch):
+        monkeypatch.setattr(video_orchestrator.settings, "pipeline_cut_workers", 2)
+        cuts = [("in.mp4", 0, 0, 30, 0), ("in.mp4", 1, 30, 60, 0)]
+        finished = []
+
+        async def plan_cuts(session, video, result, transcript_index):
+            return cuts
+
+        def cut_chunk(source_path, chunk_dir, chunk_index, start, end, time_offset):
+            try:
+                if chunk_index == 1:
+                    run_process(["sleep", "30"])  # A slow ffmpeg
+                return (f"{chunk_dir}/{chunk_index}.mp4", chunk_index, start, end)
+            finally:
+                finished.append(chunk_index)
+
+        async def save_chunk(chunk):
+            raise RuntimeError("database is locked")
+
+        monkeypatch.setattr(orchestrator, "plan_cuts", plan_cuts)
+        monkeypatch.setattr(orchestrator.video_processor, "cut_chunk", cut_chunk)
+        started = time.monotonic()
+        with pytest.raises(RuntimeError, match="database is locked"):
+            asyncio.run(orchestrator.cut_chunks(
+                FakeSession(), SimpleNamespace(), {"video_path": "/tmp/in.mp4"}, None, on_chunk=save_chunk
+            ))
+
+        assert sorted(finished) == [0, 1]  # The slow cut was stopped and waited for
+        assert time.monotonic() - started < 10